@@ -223,6 +223,80 @@ CACHE_TTL_SHORT = 60 * 5      # 5 minutes
 CACHE_TTL_MEDIUM = 60 * 30    # 30 minutes
 CACHE_TTL_LONG = 60 * 60 * 2  # 2 hours
 
+# Route optimization: persist road-network distances in DistanceCacheEntry (haversine
+# distances are cheaper to recompute than to read and are never cached). Entries older
+# than ROUTE_DISTANCE_CACHE_MAX_AGE_DAYS are removed by manage.py purge_distance_cache.
+ROUTE_DISTANCE_CACHE_ENABLED = os.getenv('ROUTE_DISTANCE_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+ROUTE_DISTANCE_CACHE_MAX_AGE_DAYS = int(os.getenv('ROUTE_DISTANCE_CACHE_MAX_AGE_DAYS', 90))
+
+# Optional offline road network (.osm extract or preprocessed .graph.npz) for
+# route distances; straight-line (haversine) distances are used when unset
+ROAD_NETWORK_PATH = os.getenv('ROAD_NETWORK_PATH') or None
+
+# Route schedule profiles (speed / service time per district, rush-hour factors),
+# see products/services/route_schedule.py
+ROUTE_SCHEDULE_PROFILES = {
+    'speed_kmh': 40,
+    'service_minutes': 10,
+    'districts': {
+        'Lefkoşa': {'speed_kmh': 30},
+        'Girne': {'speed_kmh': 30},
+        'Gazimağusa': {'speed_kmh': 35},
+    },
+    'hourly_speed_factor': {8: 0.75, 17: 0.75, 18: 0.85},
+}
+
+# Vehicle GPS pings (products/services/vehicle_tracking.py): pings are buffered in the
+# web process and bulk-inserted when the buffer holds max_rows or its oldest ping is
+# max_age_seconds old (flush_timer: a timer thread flushes buffers that stop receiving
+# pings); manage.py downsample_vehicle_pings thins out old pings
+VEHICLE_PING_BUFFER = {
+    'max_rows': 500,
+    'max_age_seconds': 10,
+    'flush_timer': True,
+}
+VEHICLE_PING_DOWNSAMPLE = {
+    'older_than_days': 7,
+    'interval_seconds': 60,
+}
+
+# Notification push channel (products/services/notification_stream.py): SSE at
+# /api/v1/notifications/stream/ and long-poll at /api/v1/notifications/poll/.
+# The stream is only served by the ASGI server (deployment/bekosirs-stream.service,
+# routed by nginx); the long-poll runs on the sync gunicorn workers and holds one
+# of them while it waits, so its wait is kept short.
+NOTIFICATION_STREAM = {
+    'poll_interval': 1.0,         # seconds between cache checks per listener
+    'heartbeat_seconds': 15,      # SSE keep-alive comment interval
+    'max_stream_seconds': 300,    # SSE connections are closed after this; clients reconnect
+    'long_poll_timeout': 5,       # max wait of a long-poll request (blocks a sync worker)
+}
+
+# Notification retention (manage.py purge_notifications): read notifications older
+# than the per-type age (days) are archived to gzip JSON lines and deleted in
+# primary-key batches. Unread ones are kept until 'unread_days' (None: forever).
+NOTIFICATION_RETENTION = {
+    'default_days': 180,
+    'types': {
+        'general': 90,
+        'recommendation': 60,
+        'price_drop': 90,
+        'restock': 90,
+        'service_update': 365,
+        'warranty_expiry': 365,
+    },
+    'unread_days': 365,
+    'archive_dir': os.getenv('NOTIFICATION_ARCHIVE_DIR', str(BASE_DIR / 'archive' / 'notifications')),
+    'batch_size': 500,
+}
+
+# Background jobs: 'worker' (manage.py run_background_jobs, see
+# deployment/bekosirs-worker.service), 'thread' (web process; development only:
+# gunicorn recycles workers and kills their threads) or 'sync'
+BACKGROUND_JOBS_MODE = os.getenv('BACKGROUND_JOBS_MODE', 'thread' if DEBUG else 'worker')
+# RUNNING jobs without a progress report for this long are marked FAILED
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 15 * 60))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -62,7 +62,7 @@ EOF
 
 # Step 8: Restart Gunicorn
 echo -e "\n${YELLOW}[8/10] Restarting Gunicorn...${NC}"
-sudo systemctl restart bekosirs
+sudo systemctl restart bekosirs bekosirs-stream
 
 # Step 9: Wait for service to start
 echo -e "\n${YELLOW}[9/10] Waiting for service to start...${NC}"
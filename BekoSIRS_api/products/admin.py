@@ -3,7 +3,7 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     CustomUser, Category, Product, ProductOwnership, UserActivity,
     Wishlist, WishlistItem, ViewHistory, Review,
-    ServiceRequest, ServiceQueue, Notification, Recommendation
+    ServiceRequest, ServiceQueue, Notification, Recommendation, BackgroundJob
 )
 
 
@@ -114,9 +114,28 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('user__username', 'title', 'message')
 
+    def save_model(self, request, obj, form, change):
+        from products.services.notification_counters import notification_changed
+
+        super().save_model(request, obj, form, change)
+        if change:
+            # form.initial holds the stored values the form was opened with
+            notification_changed({
+                'user_id': form.initial.get('user'),
+                'notification_type': form.initial.get('notification_type'),
+                'is_read': form.initial.get('is_read'),
+            }, obj)
+
 
 @admin.register(Recommendation)
 class RecommendationAdmin(admin.ModelAdmin):
     list_display = ('customer', 'product', 'score', 'reason', 'is_shown', 'clicked', 'created_at')
     list_filter = ('is_shown', 'clicked', 'created_at')
     search_fields = ('customer__username', 'product__name', 'reason')
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'job_type', 'status', 'progress', 'best_objective', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('job_type', 'status', 'created_at')
+    readonly_fields = ('payload', 'checkpoint', 'result', 'error', 'started_at', 'finished_at')
@@ -0,0 +1,82 @@
+"""
+Rota optimizasyonu benchmark'ı (sentetik KKTC teslimat günleri).
+
+Kullanım:
+    python manage.py benchmark_routes
+    python manage.py benchmark_routes --sizes 10 100 500 --variants plain capacity
+    python manage.py benchmark_routes --json > benchmark.json
+    python manage.py benchmark_routes --baseline benchmark.json   # regresyon varsa hata ile çıkar
+
+Deploy öncesi CI'da --baseline ile çalıştırılarak rota kalitesi (km, hizmet
+edilemeyen durak) veya hızdaki gerilemeler yakalanır.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services.route_benchmark import (
+    DEFAULT_SIZES, VARIANTS, compare_to_baseline, run_benchmark
+)
+
+COLUMNS = ('size', 'variant', 'algorithm', 'km', 'runtime_ms', 'peak_kb', 'served', 'unserved', 'vehicles', 'iterations')
+
+
+class Command(BaseCommand):
+    help = 'Route optimizer benchmark: tur uzunluğu, süre ve bellek ölçümü'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                            help='Durak sayıları (default: 10 50 100 200 500 1000)')
+        parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS),
+                            help='plain, capacity, time_windows')
+        parser.add_argument('--seed', type=int, default=0, help='Örnek üretimi için seed')
+        parser.add_argument('--time-limit', type=float, default=10.0, help='Çözüm başına süre sınırı (saniye)')
+        parser.add_argument('--max-iterations', type=int, default=None, help='Çözüm başına hamle sınırı')
+        parser.add_argument('--no-memory', action='store_true', help='tracemalloc ölçümünü atla')
+        parser.add_argument('--json', action='store_true', help='Tablo yerine JSON yaz')
+        parser.add_argument('--baseline', help='Karşılaştırılacak önceki JSON çıktısı')
+        parser.add_argument('--max-km-increase', type=float, default=1.0,
+                            help='İzin verilen km artışı, %% (default: 1)')
+        parser.add_argument('--max-slowdown', type=float, default=1.5,
+                            help='İzin verilen süre oranı (default: 1.5x)')
+
+    def handle(self, *args, **options):
+        rows = run_benchmark(
+            sizes=options['sizes'],
+            variants=options['variants'],
+            seed=options['seed'],
+            time_limit=options['time_limit'],
+            max_iterations=options['max_iterations'],
+            measure_memory=not options['no_memory'],
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            self._write_table(rows)
+
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as handle:
+                    baseline = json.load(handle)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Baseline okunamadı: {exc}')
+
+            problems = compare_to_baseline(
+                rows, baseline, options['max_km_increase'], options['max_slowdown']
+            )
+            for problem in problems:
+                self.stderr.write(self.style.ERROR(f'  ✗ {problem}'))
+            if problems:
+                raise CommandError(f'{len(problems)} regresyon bulundu')
+            self.stderr.write(self.style.SUCCESS('✓ Baseline ile karşılaştırma temiz'))
+
+    def _write_table(self, rows):
+        widths = {
+            column: max(len(column), *(len(str(row[column])) for row in rows)) if rows else len(column)
+            for column in COLUMNS
+        }
+        self.stdout.write('  '.join(column.ljust(widths[column]) for column in COLUMNS))
+        self.stdout.write('  '.join('-' * widths[column] for column in COLUMNS))
+        for row in rows:
+            self.stdout.write('  '.join(str(row[column]).ljust(widths[column]) for column in COLUMNS))
@@ -11,6 +11,7 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from products.models import ProductOwnership, Notification
+from products.services.notification_counters import notifications_created
 
 
 class Command(BaseCommand):
@@ -83,6 +84,7 @@ class Command(BaseCommand):
         
         if notifications:
             Notification.objects.bulk_create(notifications)
+            notifications_created(notifications)
             self.stdout.write(self.style.SUCCESS(f'{len(notifications)} bildirim başarıyla oluşturuldu.'))
         else:
             self.stdout.write('Gönderilecek bildirim yok.')
@@ -0,0 +1,39 @@
+"""
+Eski araç GPS konumlarını (VehiclePing) seyreltir.
+
+Kullanım:
+    python manage.py downsample_vehicle_pings
+    python manage.py downsample_vehicle_pings --older-than-days 3 --interval 120
+
+Belirtilen günden eski konumlar için her rota ve her zaman aralığında sadece
+ilk konum tutulur, diğerleri silinir. Varsayılanlar settings.VEHICLE_PING_DOWNSAMPLE
+ayarından gelir; komut günlük cron ile çalıştırılabilir.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services.vehicle_tracking import downsample_pings
+
+
+class Command(BaseCommand):
+    help = 'Eski araç konumlarını rota ve zaman aralığı başına bir kayda seyreltir'
+
+    def add_arguments(self, parser):
+        defaults = settings.VEHICLE_PING_DOWNSAMPLE
+        parser.add_argument(
+            '--older-than-days', type=int, default=defaults['older_than_days'],
+            help='Bu günden eski konumlar seyreltilir'
+        )
+        parser.add_argument(
+            '--interval', type=int, default=defaults['interval_seconds'],
+            help='Saniye cinsinden aralık; her aralıkta bir konum tutulur'
+        )
+
+    def handle(self, *args, **options):
+        if options['interval'] < 1:
+            raise CommandError('--interval en az 1 olmalıdır')
+
+        deleted = downsample_pings(timedelta(days=options['older_than_days']), options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{deleted} konum silindi.'))
@@ -1,17 +1,25 @@
 from django.core.management.base import BaseCommand
 import pandas as pd
 from products.models import Product, Category
+from products.services.restock_notifier import PRODUCT_CHUNK_SIZE, is_restock, notify_restocked
 import os
 from decimal import Decimal, InvalidOperation
 
+# Stock of new products when the sheet has no stock column
+DEFAULT_STOCK = 10
+
+
 class Command(BaseCommand):
     help = 'Imports products from bekoproducts.xls'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default='bekoproducts.xls', help='Excel price list to import')
+
     def handle(self, *args, **kwargs):
-        file_path = 'bekoproducts.xls'
+        file_path = kwargs['file']
         # Check absolute path if relative fails
         if not os.path.exists(file_path):
-            file_path = os.path.join(os.getcwd(), 'bekoproducts.xls')
+            file_path = os.path.join(os.getcwd(), file_path)
             
         if not os.path.exists(file_path):
             self.stdout.write(self.style.ERROR(f'File not found: {file_path}'))
@@ -21,7 +29,9 @@ class Command(BaseCommand):
         df = pd.read_excel(file_path, header=None) # using header=None to easier detect section headers
 
         current_category = None
+        stock_col = None  # index of a "Stok" column, if the sheet has one
         imported_count = 0
+        rows = []  # (model_code, defaults), saved after parsing
         
         # Iterate through all rows
         for index, row in df.iterrows():
@@ -34,6 +44,9 @@ class Command(BaseCommand):
             
             if 'EK GARANTİ KODU' in col0 or 'EK GARANTİ KODU' in col1:
                 # Potential Header Row or Column Title Row
+                for col, title in row.items():
+                    if str(title).strip().lower().startswith('stok'):
+                        stock_col = col
                 # If Col 1 has substantive text (longer than small code), it's likely a Category
                 if len(col1) > 10 and 'Fiyat' not in col1:
                     cat_name = col1
@@ -71,24 +84,49 @@ class Command(BaseCommand):
                 if not current_category:
                     current_category, _ = Category.objects.get_or_create(name="Genel")
                 
-                # Create/Update Product
-                Product.objects.update_or_create(
-                    model_code=model_code,
-                    defaults={
-                        'name': f"{model_code} - {current_category.name}",
-                        'category': current_category,
-                        'description': description,
-                        'warranty_code': warranty_code,
-                        'price': price_cash,
-                        'price_cash': price_cash,
-                        'price_list': price_list,
-                        'campaign_tag': campaign,
-                        'stock': 10 # Default
-                    }
-                )
+                defaults = {
+                    'name': f"{model_code} - {current_category.name}",
+                    'category': current_category,
+                    'description': description,
+                    'warranty_code': warranty_code,
+                    'price': price_cash,
+                    'price_cash': price_cash,
+                    'price_list': price_list,
+                    'campaign_tag': campaign,
+                }
+                # Stock is only written when the sheet states it
+                if stock_col is not None and not pd.isna(row[stock_col]):
+                    defaults['stock'] = int(float(row[stock_col]))
+                rows.append((model_code, defaults))
                 imported_count += 1
                 
             except (ValueError, InvalidOperation, IndexError):
                 continue
-                
+
+        restocked = self.save_products(rows)
+        notified = notify_restocked(restocked)
+
         self.stdout.write(self.style.SUCCESS(f'Successfully imported {imported_count} products'))
+        if restocked:
+            self.stdout.write(f"{len(restocked)} products back in stock, {notified} restock notifications sent")
+
+    def save_products(self, rows):
+        """
+        Create/update the parsed products. Existing products keep their stock
+        unless the sheet has a stock column; new ones start at DEFAULT_STOCK.
+        Returns the existing products whose imported stock went from 0 to positive.
+        """
+        restocked = []
+        for start in range(0, len(rows), PRODUCT_CHUNK_SIZE):
+            chunk = rows[start:start + PRODUCT_CHUNK_SIZE]
+            old_stock = dict(
+                Product.objects.filter(model_code__in=[model_code for model_code, _ in chunk])
+                .values_list('model_code', 'stock')
+            )
+            for model_code, defaults in chunk:
+                if model_code not in old_stock:
+                    defaults = {'stock': DEFAULT_STOCK, **defaults}
+                product, created = Product.objects.update_or_create(model_code=model_code, defaults=defaults)
+                if not created and 'stock' in defaults and is_restock(old_stock[model_code], product.stock):
+                    restocked.append(product)
+        return restocked
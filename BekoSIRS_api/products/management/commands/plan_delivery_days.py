@@ -0,0 +1,55 @@
+"""
+Tarihi belirlenmemiş bekleyen teslimatları önümüzdeki günlere dağıtır.
+
+Kullanım:
+    python manage.py plan_delivery_days --days 5 --capacity 20
+    python manage.py plan_delivery_days --days 3 --capacity 20 --vehicles 2 --start 2026-01-08
+    python manage.py plan_delivery_days --days 5 --capacity 20 --dry-run
+
+Birbirine yakın müşteriler aynı güne toplanır (kapasiteli kümeleme);
+günlük araç kapasitesi ve teslimat zaman aralıkları aşılmaz.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services.day_planner import plan_unscheduled_deliveries
+
+
+class Command(BaseCommand):
+    help = 'Tarihsiz bekleyen teslimatlara scheduled_date atar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=5, help='Planlama ufku, gün (default: 5)')
+        parser.add_argument('--capacity', type=float, required=True, help='Araç başına günlük kapasite (adet)')
+        parser.add_argument('--vehicles', type=int, default=1, help='Günlük araç sayısı (default: 1)')
+        parser.add_argument('--start', help='İlk planlama günü, YYYY-MM-DD (default: yarın)')
+        parser.add_argument('--dry-run', action='store_true', help='Planı yazdır, kaydetme')
+
+    def handle(self, *args, **options):
+        start_date = None
+        if options['start']:
+            try:
+                start_date = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Geçersiz tarih formatı (YYYY-MM-DD)')
+
+        summary = plan_unscheduled_deliveries(
+            days=options['days'],
+            vehicle_capacity=options['capacity'],
+            vehicles_per_day=options['vehicles'],
+            start_date=start_date,
+            dry_run=options['dry_run'],
+        )
+
+        for day in summary['days']:
+            self.stdout.write(
+                f"{day['date']}: {day['deliveries']} teslimat, yük {day['load']:.0f}/{day['capacity']:.0f}"
+            )
+        if summary['unplanned_ids']:
+            self.stdout.write(self.style.WARNING(f"Sığmayan teslimat: {len(summary['unplanned_ids'])}"))
+        if summary['missing_coordinates_ids']:
+            self.stdout.write(self.style.WARNING(f"Koordinatı eksik: {len(summary['missing_coordinates_ids'])}"))
+
+        suffix = ' (dry-run, kaydedilmedi)' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f"{summary['planned']} teslimat planlandı{suffix}."))
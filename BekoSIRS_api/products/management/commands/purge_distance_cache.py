@@ -0,0 +1,34 @@
+"""
+Eski rota mesafe önbelleği kayıtlarını (DistanceCacheEntry) siler.
+
+Kullanım:
+    python manage.py purge_distance_cache
+    python manage.py purge_distance_cache --older-than-days 30
+
+Belirtilen günden eski kayıtlar silinir ve bir sonraki optimizasyonda yol
+ağından yeniden hesaplanır. Varsayılan settings.ROUTE_DISTANCE_CACHE_MAX_AGE_DAYS
+ayarından gelir; komut günlük cron ile çalıştırılabilir.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services.distance_cache import purge_stale
+
+
+class Command(BaseCommand):
+    help = 'Eski rota mesafe önbelleği kayıtlarını siler'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.ROUTE_DISTANCE_CACHE_MAX_AGE_DAYS,
+            help='Bu günden eski kayıtlar silinir'
+        )
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 0:
+            raise CommandError('--older-than-days negatif olamaz')
+
+        deleted = purge_stale(timedelta(days=options['older_than_days']))
+        self.stdout.write(self.style.SUCCESS(f'{deleted} mesafe kaydı silindi.'))
@@ -0,0 +1,57 @@
+"""
+Saklama süresi dolan bildirimleri arşivler ve siler.
+
+Kullanım:
+    python manage.py purge_notifications
+    python manage.py purge_notifications --dry-run
+    python manage.py purge_notifications --batch-size 1000 --pause 0.2
+    python manage.py purge_notifications --no-archive
+
+Saklama süreleri settings.NOTIFICATION_RETENTION ayarından gelir (tip bazında
+gün). Süresi dolan bildirimler gzip JSON-lines dosyasına yazılır ve birincil
+anahtar aralıkları halinde, her parti kendi kısa transaction'ında silinir.
+Komut günlük cron ile çalıştırılabilir.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import Notification
+from products.services.notification_retention import purge_notifications, retention_filter
+
+
+class Command(BaseCommand):
+    help = 'Saklama süresi dolan bildirimleri arşivler ve partiler halinde siler'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Parti başına id aralığı (varsayılan: ayardaki değer)')
+        parser.add_argument('--archive-dir', help='Arşiv klasörü (varsayılan: ayardaki değer)')
+        parser.add_argument('--no-archive', action='store_true', help='Arşivlemeden sil')
+        parser.add_argument('--pause', type=float, default=0.0, help='Partiler arası bekleme (saniye)')
+        parser.add_argument('--dry-run', action='store_true', help='Silmeden sadece say')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size en az 1 olmalıdır')
+
+        if options['dry_run']:
+            count = Notification.objects.filter(retention_filter()).count()
+            self.stdout.write(self.style.WARNING(f'DRY RUN: {count} bildirimin saklama süresi dolmuş.'))
+            return
+
+        def report(totals):
+            self.stdout.write(
+                f"  parti {totals['batches']}: {totals['deleted']} silindi ({totals['rows_per_second']} satır/sn)"
+            )
+
+        totals = purge_notifications(
+            batch_size=options['batch_size'],
+            archive_dir=options['archive_dir'],
+            archive=not options['no_archive'],
+            pause_seconds=options['pause'],
+            on_batch=report if options['verbosity'] > 1 else None,
+        )
+        if totals['archive_path']:
+            self.stdout.write(f"Arşiv: {totals['archive_path']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{totals['deleted']} bildirim {totals['batches']} partide silindi "
+            f"({totals['seconds']} sn, {totals['rows_per_second']} satır/sn)."
+        ))
@@ -0,0 +1,24 @@
+"""
+Müşteri, teslimat ve depo kayıtlarının konum hücrelerini (geo_cell) yeniden hesaplar.
+
+Kullanım:
+    python manage.py rebuild_geo_cells
+
+geo_cell normalde kayıt sırasında (pre_save) güncellenir; bulk_create,
+bulk_update veya QuerySet.update ile koordinatı değişen kayıtlar ya da
+GEO_CELL_DEGREES değişikliği sonrası bu komut çalıştırılmalıdır.
+"""
+from django.core.management.base import BaseCommand
+
+from products.services.spatial_index import SPATIAL_FIELDS, rebuild_geo_cells
+
+
+class Command(BaseCommand):
+    help = 'Konum hücrelerini (geo_cell) yeniden hesaplar'
+
+    def handle(self, *args, **options):
+        for model in SPATIAL_FIELDS:
+            changed = rebuild_geo_cells(model)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {changed} kayıt güncellendi')
+
+        self.stdout.write(self.style.SUCCESS('Tamamlandı.'))
@@ -0,0 +1,28 @@
+"""
+Önbellekteki okunmamış bildirim sayaçlarını bildirim tablosundan yeniden hesaplar.
+
+Kullanım:
+    python manage.py reconcile_notification_counters
+    python manage.py reconcile_notification_counters --user 42 --user 43
+
+Sayaçlar bildirim oluşturma / okuma / silme işlemlerinde güncellenir; bu komut
+geri alınan işlemler veya önbellek kayıpları gibi nedenlerle oluşabilecek
+sapmaları düzeltir. Periyodik (örn. saatlik cron) çalıştırılabilir.
+"""
+from django.core.management.base import BaseCommand
+
+from products.services.notification_counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Okunmamış bildirim sayaçlarını bildirim tablosuyla eşitler'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='Sadece bu kullanıcının sayacını eşitle (birden çok verilebilir)'
+        )
+
+    def handle(self, *args, **options):
+        written = reconcile(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'{written} kullanıcı sayacı güncellendi.'))
@@ -0,0 +1,45 @@
+"""
+Bekleyen arka plan işlerini (BackgroundJob) çalıştıran worker.
+
+Kullanım:
+    python manage.py run_background_jobs            # sürekli çalışır
+    python manage.py run_background_jobs --once     # bekleyenleri çalıştırıp çıkar
+
+settings.BACKGROUND_JOBS_MODE = 'worker' (production varsayılanı) ise işler
+web sürecinde değil bu komutla çalıştırılır (gunicorn timeout'undan bağımsız,
+bkz. deployment/bekosirs-worker.service). Her turda JOB_STALE_SECONDS boyunca
+ilerleme bildirmeyen RUNNING işler FAILED olarak işaretlenir.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.services.jobs import run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Bekleyen arka plan işlerini çalıştırır'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Bekleyen işleri çalıştırıp çık'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Kuyruk kontrol aralığı, saniye (default: 2)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            executed = run_pending_jobs()
+            if executed:
+                self.stdout.write(f'{executed} iş çalıştırıldı.')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Tamamlandı.'))
@@ -9,6 +9,40 @@ Usage:
 from django.core.management.base import BaseCommand
 from products.models import District, Area
 
+# KKTC Districts with center coords and their Areas
+KKTC_LOCATIONS = {
+    'Güzelyurt': {
+        'center_lat': 35.2042,
+        'center_lng': 33.0144,
+        'areas': ['Kalkanlı', 'Gaziveren', 'Akdeniz', 'Yedidalga', 'Bostancı', 'Yayla']
+    },
+    'Lefkoşa': {
+        'center_lat': 35.1856,
+        'center_lng': 33.3823,
+        'areas': ['Gönyeli', 'Hamitköy', 'Ortaköy', 'Değirmenlik', 'Haspolat', 'Geçitkale']
+    },
+    'Girne': {
+        'center_lat': 35.3387,
+        'center_lng': 33.3176,
+        'areas': ['Alsancak', 'Lapta', 'Karaoğlanoğlu', 'Esentepe', 'Çatalköy', 'Bellapais']
+    },
+    'Gazimağusa': {
+        'center_lat': 35.1264,
+        'center_lng': 33.9384,
+        'areas': ['Tuzla', 'Salamis', 'Yeni Boğaziçi', 'Boğaz', 'Kumyalı']
+    },
+    'İskele': {
+        'center_lat': 35.2886,
+        'center_lng': 33.9082,
+        'areas': ['Long Beach', 'Bafra', 'Mehmetçik', 'Yeniceköy', 'Büyükkonuk']
+    },
+    'Lefke': {
+        'center_lat': 35.1085,
+        'center_lng': 32.8516,
+        'areas': ['Gemikonağı', 'Yeşilyurt', 'Aplıç', 'Dörtyol']
+    },
+}
+
 
 class Command(BaseCommand):
     help = 'Seed KKTC Districts and Areas (Idempotent)'
@@ -19,46 +53,12 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS('=' * 60))
         self.stdout.write('')
 
-        # KKTC Districts with center coords and their Areas
-        locations_data = {
-            'Güzelyurt': {
-                'center_lat': 35.2042,
-                'center_lng': 33.0144,
-                'areas': ['Kalkanlı', 'Gaziveren', 'Akdeniz', 'Yedidalga', 'Bostancı', 'Yayla']
-            },
-            'Lefkoşa': {
-                'center_lat': 35.1856,
-                'center_lng': 33.3823,
-                'areas': ['Gönyeli', 'Hamitköy', 'Ortaköy', 'Değirmenlik', 'Haspolat', 'Geçitkale']
-            },
-            'Girne': {
-                'center_lat': 35.3387,
-                'center_lng': 33.3176,
-                'areas': ['Alsancak', 'Lapta', 'Karaoğlanoğlu', 'Esentepe', 'Çatalköy', 'Bellapais']
-            },
-            'Gazimağusa': {
-                'center_lat': 35.1264,
-                'center_lng': 33.9384,
-                'areas': ['Tuzla', 'Salamis', 'Yeni Boğaziçi', 'Boğaz', 'Kumyalı']
-            },
-            'İskele': {
-                'center_lat': 35.2886,
-                'center_lng': 33.9082,
-                'areas': ['Long Beach', 'Bafra', 'Mehmetçik', 'Yeniceköy', 'Büyükkonuk']
-            },
-            'Lefke': {
-                'center_lat': 35.1085,
-                'center_lng': 32.8516,
-                'areas': ['Gemikonağı', 'Yeşilyurt', 'Aplıç', 'Dörtyol']
-            },
-        }
-
         districts_created = 0
         districts_exists = 0
         areas_created = 0
         areas_exists = 0
 
-        for district_name, district_data in locations_data.items():
+        for district_name, district_data in KKTC_LOCATIONS.items():
             # Get or create district with center coordinates
             district, created = District.objects.get_or_create(
                 name=district_name,
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_add_depot_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistanceCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(help_text='Örn: haversine, road', max_length=30, verbose_name='Kaynak')),
+                ('origin', models.CharField(help_text="'enlem,boylam' (5 ondalık)", max_length=32, verbose_name='Başlangıç')),
+                ('destination', models.CharField(help_text="'enlem,boylam' (5 ondalık)", max_length=32, verbose_name='Varış')),
+                ('distance_km', models.FloatField(verbose_name='Mesafe (km)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Mesafe Önbelleği',
+                'verbose_name_plural': 'Mesafe Önbelleği',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='distancecacheentry',
+            constraint=models.UniqueConstraint(fields=('source', 'origin', 'destination'), name='distance_cache_pair_uniq'),
+        ),
+    ]
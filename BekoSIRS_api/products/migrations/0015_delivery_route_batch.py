@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_distance_cache_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='batch_id',
+            field=models.CharField(blank=True, help_text='Delivery.route_batch_id ile aynı', max_length=50, null=True, unique=True, verbose_name='Rota Batch ID'),
+        ),
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='depot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='routes', to='products.depotlocation', verbose_name='Depo'),
+        ),
+        migrations.AlterField(
+            model_name='deliveryroute',
+            name='date',
+            field=models.DateField(db_index=True, verbose_name='Tarih'),
+        ),
+    ]
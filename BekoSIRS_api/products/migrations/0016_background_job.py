@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_delivery_route_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_type', models.CharField(choices=[('route_optimize', 'Rota Optimizasyonu')], max_length=30, verbose_name='İş Tipi')),
+                ('status', models.CharField(choices=[('PENDING', 'Sırada'), ('RUNNING', 'Çalışıyor'), ('SUCCEEDED', 'Tamamlandı'), ('FAILED', 'Başarısız'), ('CANCELLED', 'İptal Edildi')], default='PENDING', max_length=20, verbose_name='Durum')),
+                ('payload', models.JSONField(default=dict, verbose_name='Parametreler')),
+                ('progress', models.FloatField(default=0.0, verbose_name='İlerleme (0-1)')),
+                ('best_objective', models.FloatField(blank=True, null=True, verbose_name='En İyi Amaç Değeri')),
+                ('checkpoint', models.JSONField(blank=True, null=True, verbose_name='Son Çözüm (Checkpoint)')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Sonuç')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Hata')),
+                ('cancel_requested', models.BooleanField(default=False, verbose_name='İptal İstendi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Oluşturan')),
+            ],
+            options={
+                'verbose_name': 'Arka Plan İşi',
+                'verbose_name_plural': 'Arka Plan İşleri',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='job_status_created_idx')],
+            },
+        ),
+    ]
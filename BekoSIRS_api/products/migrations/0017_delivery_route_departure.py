@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_background_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='planned_departure',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Planlanan Çıkış'),
+        ),
+    ]
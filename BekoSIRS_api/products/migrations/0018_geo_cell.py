@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:46
+
+import math
+
+from django.db import migrations, models
+
+# Must match products/services/spatial_index.py at the time of this migration
+GEO_CELL_DEGREES = 0.02
+
+COORDINATE_FIELDS = {
+    'CustomUser': ('address_lat', 'address_lng'),
+    'Delivery': ('address_lat', 'address_lng'),
+    'DepotLocation': ('latitude', 'longitude'),
+}
+
+
+def backfill_geo_cells(apps, schema_editor):
+    for model_name, (lat_field, lng_field) in COORDINATE_FIELDS.items():
+        model = apps.get_model('products', model_name)
+        rows = model.objects.exclude(**{f'{lat_field}__isnull': True}).exclude(**{f'{lng_field}__isnull': True})
+        batch = []
+        for pk, lat, lng in rows.values_list('pk', lat_field, lng_field).iterator(chunk_size=1000):
+            cell = f"{math.floor(float(lat) / GEO_CELL_DEGREES)}:{math.floor(float(lng) / GEO_CELL_DEGREES)}"
+            batch.append(model(pk=pk, geo_cell=cell))
+        model.objects.bulk_update(batch, ['geo_cell'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0017_delivery_route_departure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Grid hücresi (products/services/spatial_index.py)', max_length=16, null=True, verbose_name='Konum Hücresi'),
+        ),
+        migrations.AddField(
+            model_name='delivery',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Grid hücresi (products/services/spatial_index.py)', max_length=16, null=True, verbose_name='Konum Hücresi'),
+        ),
+        migrations.AddField(
+            model_name='depotlocation',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Grid hücresi (products/services/spatial_index.py)', max_length=16, null=True, verbose_name='Konum Hücresi'),
+        ),
+        migrations.RunPython(backfill_geo_cells, migrations.RunPython.noop),
+    ]
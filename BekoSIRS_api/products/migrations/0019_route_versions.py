@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='geometry_version',
+            field=models.PositiveIntegerField(default=1, help_text="route_polyline'ın son değiştiği sürüm", verbose_name='Geometri Sürümü'),
+        ),
+        migrations.AddField(
+            model_name='deliveryroute',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Rota veya durakları her değiştiğinde artar', verbose_name='Sürüm'),
+        ),
+        migrations.AddField(
+            model_name='deliveryroutestop',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Durağın son değiştiği rota sürümü', verbose_name='Sürüm'),
+        ),
+    ]
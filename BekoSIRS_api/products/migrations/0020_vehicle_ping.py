@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_route_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VehiclePing',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(verbose_name='Konum Zamanı')),
+                ('lat', models.FloatField(verbose_name='Enlem')),
+                ('lng', models.FloatField(verbose_name='Boylam')),
+                ('speed_kmh', models.FloatField(blank=True, null=True, verbose_name='Hız (km/sa)')),
+                ('heading', models.SmallIntegerField(blank=True, null=True, verbose_name='Yön (derece)')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pings', to='products.deliveryroute', verbose_name='Rota')),
+            ],
+            options={
+                'verbose_name': 'Araç Konumu',
+                'verbose_name_plural': 'Araç Konumları',
+                'indexes': [models.Index(fields=['route', 'recorded_at'], name='products_ve_route_i_47d504_idx')],
+            },
+        ),
+    ]
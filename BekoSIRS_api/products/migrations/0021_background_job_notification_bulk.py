@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0020_vehicle_ping'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='job_type',
+            field=models.CharField(choices=[('route_optimize', 'Rota Optimizasyonu'), ('notification_bulk', 'Toplu Bildirim')], max_length=30, verbose_name='İş Tipi'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0021_background_job_notification_bulk'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='distancecacheentry',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
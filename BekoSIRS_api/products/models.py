@@ -116,6 +116,10 @@ class CustomUser(AbstractUser):
         help_text="Ev/Apartman numarası, cadde, sokak vb."
     )
     geocoded_at = models.DateTimeField(null=True, blank=True, verbose_name="Son Geocode Tarihi")
+    geo_cell = models.CharField(
+        max_length=16, null=True, blank=True, db_index=True, editable=False,
+        verbose_name="Konum Hücresi", help_text="Grid hücresi (products/services/spatial_index.py)"
+    )
 
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -524,8 +528,21 @@ class PasswordResetToken(models.Model):
 # 🔹 Delivery Route (Günlük Rota)
 # -------------------------------
 class DeliveryRoute(models.Model):
-    """Belirli bir gün için optimize edilmiş teslimat rotası."""
-    date = models.DateField(unique=True, verbose_name="Tarih")
+    """Belirli bir gün için optimize edilmiş teslimat rotası (araç/batch başına bir kayıt)."""
+    date = models.DateField(db_index=True, verbose_name="Tarih")
+    batch_id = models.CharField(
+        max_length=50, unique=True, null=True, blank=True,
+        verbose_name="Rota Batch ID",
+        help_text="Delivery.route_batch_id ile aynı"
+    )
+    depot = models.ForeignKey(
+        'DepotLocation',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='routes',
+        verbose_name="Depo"
+    )
     
     # Mağaza (başlangıç noktası) koordinatları
     store_address = models.TextField(
@@ -552,12 +569,23 @@ class DeliveryRoute(models.Model):
         null=True, blank=True,
         verbose_name="Toplam Süre (dk)"
     )
+    planned_departure = models.DateTimeField(null=True, blank=True, verbose_name="Planlanan Çıkış")
     # Google Maps Polyline
     route_polyline = models.TextField(blank=True, null=True, verbose_name="Rota Polyline")
     
     is_optimized = models.BooleanField(default=False, verbose_name="Optimize Edildi")
     optimized_at = models.DateTimeField(null=True, blank=True, verbose_name="Optimizasyon Tarihi")
 
+    # Sürücü paketi (bundle) delta güncellemeleri için sürüm numaraları
+    version = models.PositiveIntegerField(
+        default=1, verbose_name="Sürüm",
+        help_text="Rota veya durakları her değiştiğinde artar"
+    )
+    geometry_version = models.PositiveIntegerField(
+        default=1, verbose_name="Geometri Sürümü",
+        help_text="route_polyline'ın son değiştiği sürüm"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -593,6 +621,10 @@ class DeliveryRouteStop(models.Model):
         verbose_name="Önceki Noktadan Süre (dk)"
     )
     estimated_arrival = models.DateTimeField(null=True, blank=True, verbose_name="Tahmini Varış")
+    version = models.PositiveIntegerField(
+        default=1, verbose_name="Sürüm",
+        help_text="Durağın son değiştiği rota sürümü"
+    )
     
     class Meta:
         ordering = ['stop_order']
@@ -604,6 +636,31 @@ class DeliveryRouteStop(models.Model):
         return f"Stop {self.stop_order}: {self.delivery.customer.username}"
 
 
+class VehiclePing(models.Model):
+    """Rotadaki aracın GPS konumu (zaman serisi; toplu yazılır, eski kayıtlar seyreltilir)."""
+    route = models.ForeignKey(
+        DeliveryRoute,
+        on_delete=models.CASCADE,
+        related_name='pings',
+        verbose_name="Rota"
+    )
+    recorded_at = models.DateTimeField(verbose_name="Konum Zamanı")
+    lat = models.FloatField(verbose_name="Enlem")
+    lng = models.FloatField(verbose_name="Boylam")
+    speed_kmh = models.FloatField(null=True, blank=True, verbose_name="Hız (km/sa)")
+    heading = models.SmallIntegerField(null=True, blank=True, verbose_name="Yön (derece)")
+
+    class Meta:
+        verbose_name = "Araç Konumu"
+        verbose_name_plural = "Araç Konumları"
+        indexes = [
+            models.Index(fields=['route', 'recorded_at']),
+        ]
+
+    def __str__(self):
+        return f"Rota #{self.route_id} @ {self.recorded_at:%H:%M:%S} ({self.lat:.5f}, {self.lng:.5f})"
+
+
 # -------------------------------
 # 🔹 Product Assignment (Satış / Ürün Atama)
 # -------------------------------
@@ -679,6 +736,10 @@ class DepotLocation(models.Model):
         decimal_places=7,
         verbose_name="Boylam"
     )
+    geo_cell = models.CharField(
+        max_length=16, null=True, blank=True, db_index=True, editable=False,
+        verbose_name="Konum Hücresi", help_text="Grid hücresi (products/services/spatial_index.py)"
+    )
     is_default = models.BooleanField(
         default=False,
         verbose_name="Varsayılan Depo",
@@ -740,6 +801,10 @@ class Delivery(models.Model):
     address = models.TextField(null=True, blank=True, verbose_name="Teslimat Adresi")
     address_lat = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True, verbose_name="Enlem")
     address_lng = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True, verbose_name="Boylam")
+    geo_cell = models.CharField(
+        max_length=16, null=True, blank=True, db_index=True, editable=False,
+        verbose_name="Konum Hücresi", help_text="Grid hücresi (products/services/spatial_index.py)"
+    )
     
     status = models.CharField(
         max_length=20, 
@@ -799,3 +864,83 @@ class Delivery(models.Model):
     def customer(self):
         """Shortcut to get customer from assignment"""
         return self.assignment.customer if self.assignment else None
+
+
+# -------------------------------
+# 🔹 Distance Cache (Mesafe Önbelleği)
+# -------------------------------
+class DistanceCacheEntry(models.Model):
+    """Koordinat çifti arasındaki hesaplanmış mesafe (rota optimizasyonu için)."""
+    source = models.CharField(max_length=30, verbose_name="Kaynak", help_text="Örn: haversine, road")
+    origin = models.CharField(max_length=32, verbose_name="Başlangıç", help_text="'enlem,boylam' (5 ondalık)")
+    destination = models.CharField(max_length=32, verbose_name="Varış", help_text="'enlem,boylam' (5 ondalık)")
+    distance_km = models.FloatField(verbose_name="Mesafe (km)")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Mesafe Önbelleği"
+        verbose_name_plural = "Mesafe Önbelleği"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'origin', 'destination'], name='distance_cache_pair_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.origin} → {self.destination} ({self.source}): {self.distance_km:.2f} km"
+
+
+# -------------------------------
+# 🔹 Background Job (Arka Plan İşi)
+# -------------------------------
+class BackgroundJob(models.Model):
+    """HTTP isteği dışında çalışan uzun işler (örn. rota optimizasyonu)."""
+    TYPE_CHOICES = [
+        ('route_optimize', 'Rota Optimizasyonu'),
+        ('notification_bulk', 'Toplu Bildirim'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Sırada'),
+        ('RUNNING', 'Çalışıyor'),
+        ('SUCCEEDED', 'Tamamlandı'),
+        ('FAILED', 'Başarısız'),
+        ('CANCELLED', 'İptal Edildi'),
+    ]
+    FINISHED_STATUSES = ('SUCCEEDED', 'FAILED', 'CANCELLED')
+
+    job_type = models.CharField(max_length=30, choices=TYPE_CHOICES, verbose_name="İş Tipi")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Durum")
+    payload = models.JSONField(default=dict, verbose_name="Parametreler")
+    progress = models.FloatField(default=0.0, verbose_name="İlerleme (0-1)")
+    best_objective = models.FloatField(null=True, blank=True, verbose_name="En İyi Amaç Değeri")
+    checkpoint = models.JSONField(null=True, blank=True, verbose_name="Son Çözüm (Checkpoint)")
+    result = models.JSONField(null=True, blank=True, verbose_name="Sonuç")
+    error = models.TextField(blank=True, default='', verbose_name="Hata")
+    cancel_requested = models.BooleanField(default=False, verbose_name="İptal İstendi")
+    created_by = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs',
+        verbose_name="Oluşturan"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Arka Plan İşi"
+        verbose_name_plural = "Arka Plan İşleri"
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_job_type_display()} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATUSES
@@ -531,8 +531,8 @@ class DeliveryRouteSerializer(serializers.ModelSerializer):
     class Meta:
         model = DeliveryRoute
         fields = [
-            'id', 'date', 'store_address', 'total_distance_km', 
-            'total_duration_min', 'is_optimized', 'optimized_at', 'stops'
+            'id', 'date', 'batch_id', 'depot', 'store_address', 'total_distance_km', 
+            'total_duration_min', 'planned_departure', 'route_polyline', 'version', 'is_optimized', 'optimized_at', 'stops'
         ]
 
 
@@ -0,0 +1,238 @@
+"""
+Multi-day planner for unscheduled deliveries.
+
+WAITING deliveries without a scheduled_date are spread over the next days
+so that geographically close customers land on the same day (shorter daily
+routes) while every day stays within its truck capacity:
+
+1. Use the fewest leading days whose capacity covers the pending demand.
+2. Seed one centre per day with k-means on projected coordinates.
+3. Capacitated assignment: deliveries with the largest regret (extra
+   distance if they miss their nearest centre) pick first; each goes to the
+   nearest day with room left, also respecting a per-day limit on stops
+   sharing the same time window.
+4. Move centres to the assigned deliveries and repeat until stable.
+
+Distances are vectorized (numpy) and the clustering is scikit-learn's
+KMeans, so thousands of deliveries are planned in well under a second.
+Results are written with one bulk_update plus one UPDATE per id chunk.
+"""
+import math
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from sklearn.cluster import KMeans
+
+from products.models import Delivery, ProductAssignment
+from products.services.route_persistence import BATCH_SIZE, _chunks
+
+# Assignment / centre update rounds after the k-means seed
+MAX_PLANNING_ROUNDS = 10
+
+# Stops one truck can serve per hour of a customer time window
+WINDOW_STOPS_PER_VEHICLE_HOUR = 3
+
+KM_PER_DEGREE_LAT = 110.57
+KM_PER_DEGREE_LNG_EQUATOR = 111.32
+
+
+def _project(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Equirectangular projection to km, accurate enough at island scale."""
+    scale = math.cos(math.radians(float(np.mean(lats))))
+    return np.column_stack((lats * KM_PER_DEGREE_LAT, lngs * KM_PER_DEGREE_LNG_EQUATOR * scale))
+
+
+def _capacitated_assign(
+    dist: np.ndarray,
+    demands: np.ndarray,
+    capacities: np.ndarray,
+    buckets: np.ndarray,
+    bucket_capacities: np.ndarray
+) -> np.ndarray:
+    """Greedy regret assignment of points to centres under capacity limits (-1 = no room)."""
+    n, k = dist.shape
+    preferences = np.argsort(dist, axis=1)
+    ranked = np.take_along_axis(dist, preferences, axis=1)
+    regret = ranked[:, 1] - ranked[:, 0] if k > 1 else np.zeros(n)
+    order = np.lexsort((-demands, -regret))
+
+    remaining = capacities.astype(float).copy()
+    bucket_left = np.tile(bucket_capacities.astype(float), (k, 1))
+    labels = np.full(n, -1)
+    for i in order:
+        bucket = buckets[i]
+        for day in preferences[i]:
+            if remaining[day] >= demands[i] and (bucket < 0 or bucket_left[day, bucket] >= 1):
+                labels[i] = day
+                remaining[day] -= demands[i]
+                if bucket >= 0:
+                    bucket_left[day, bucket] -= 1
+                break
+    return labels
+
+
+def plan_days(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    demands: Sequence[float],
+    capacities: Sequence[float],
+    buckets: Optional[Sequence[int]] = None,
+    bucket_capacities: Optional[Sequence[float]] = None,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Assign deliveries to days.
+
+    Args:
+        lats, lngs: Delivery coordinates
+        demands: Capacity used by each delivery (e.g. product quantity)
+        capacities: Capacity of each planning day, in day order
+        buckets: Time-window bucket per delivery (-1 for no window)
+        bucket_capacities: Per-day stop limit for each bucket
+
+    Returns:
+        Day index per delivery, -1 where nothing fits
+    """
+    n = len(lats)
+    if n == 0 or not len(capacities):
+        return np.full(n, -1)
+
+    points = _project(np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float))
+    demands = np.asarray(demands, dtype=float)
+    capacities = np.asarray(capacities, dtype=float)
+    buckets = np.full(n, -1) if buckets is None else np.asarray(buckets, dtype=int)
+    bucket_capacities = np.zeros(0) if bucket_capacities is None else np.asarray(bucket_capacities, dtype=float)
+
+    # Fewest leading days that can hold everything; add days while stops are left over
+    days = int(np.searchsorted(np.cumsum(capacities), demands.sum())) + 1
+    days = max(1, min(days, len(capacities), n))
+    while True:
+        labels = _cluster(points, demands, capacities[:days], buckets, bucket_capacities, seed)
+        if (labels >= 0).all() or days >= min(len(capacities), n):
+            return labels
+        days += 1
+
+
+def _cluster(points, demands, capacities, buckets, bucket_capacities, seed) -> np.ndarray:
+    k = len(capacities)
+    centres = KMeans(n_clusters=k, n_init=3, random_state=seed).fit(
+        points, sample_weight=np.maximum(demands, 1)
+    ).cluster_centers_
+
+    labels = None
+    for _ in range(MAX_PLANNING_ROUNDS):
+        dist = np.sqrt(((points[:, None, :] - centres[None, :, :]) ** 2).sum(axis=2))
+        new_labels = _capacitated_assign(dist, demands, capacities, buckets, bucket_capacities)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for day in range(k):
+            members = labels == day
+            if members.any():
+                centres[day] = np.average(points[members], axis=0, weights=demands[members])
+    return labels
+
+
+def _window_buckets(deliveries: List[Delivery], vehicles_per_day: int):
+    """Time-window bucket per delivery and the per-day stop limit of each bucket."""
+    index: Dict[tuple, int] = {}
+    capacities: List[float] = []
+    buckets = []
+    for delivery in deliveries:
+        start, end = delivery.time_window_start, delivery.time_window_end
+        if start is None or end is None:
+            buckets.append(-1)
+            continue
+        key = (start, end)
+        if key not in index:
+            hours = max((end.hour * 60 + end.minute - start.hour * 60 - start.minute) / 60, 1 / WINDOW_STOPS_PER_VEHICLE_HOUR)
+            index[key] = len(capacities)
+            capacities.append(max(1, math.floor(hours * WINDOW_STOPS_PER_VEHICLE_HOUR * vehicles_per_day)))
+        buckets.append(index[key])
+    return buckets, capacities
+
+
+def plan_unscheduled_deliveries(
+    days: int,
+    vehicle_capacity: float,
+    vehicles_per_day: int = 1,
+    start_date: Optional[date] = None,
+    daily_capacities: Optional[Sequence[float]] = None,
+    dry_run: bool = False
+) -> Dict:
+    """
+    Give every unscheduled WAITING delivery a scheduled_date in the next `days` days.
+
+    Args:
+        days: Planning horizon
+        vehicle_capacity: Units (ProductAssignment.quantity) per truck per day
+        vehicles_per_day: Trucks available each day
+        start_date: First planning day (default: tomorrow)
+        daily_capacities: Per-day capacity overriding vehicles x capacity
+        dry_run: Compute the plan without writing it
+
+    Returns:
+        Summary with per-day counts and the deliveries that did not fit
+    """
+    start_date = start_date or timezone.localdate() + timedelta(days=1)
+    capacities = list(daily_capacities or [vehicle_capacity * vehicles_per_day] * days)[:days]
+
+    pending = list(
+        Delivery.objects.filter(status='WAITING', scheduled_date__isnull=True)
+        .select_related('assignment__customer')
+        .order_by('id')
+    )
+    located, missing = [], []
+    for delivery in pending:
+        customer = delivery.assignment.customer if delivery.assignment else None
+        lat = customer.address_lat if customer and customer.address_lat is not None else delivery.address_lat
+        lng = customer.address_lng if customer and customer.address_lng is not None else delivery.address_lng
+        if lat is None or lng is None:
+            missing.append(delivery.id)
+        else:
+            located.append((delivery, float(lat), float(lng)))
+
+    deliveries = [row[0] for row in located]
+    demands = np.array([d.assignment.quantity if d.assignment else 1 for d in deliveries], dtype=float)
+    buckets, bucket_capacities = _window_buckets(deliveries, vehicles_per_day)
+    labels = plan_days(
+        [row[1] for row in located], [row[2] for row in located], demands, capacities, buckets, bucket_capacities
+    )
+
+    planned = []
+    for delivery, label in zip(deliveries, labels):
+        if label >= 0:
+            delivery.scheduled_date = start_date + timedelta(days=int(label))
+            delivery.updated_at = timezone.now()
+            planned.append(delivery)
+
+    if not dry_run and planned:
+        with transaction.atomic():
+            Delivery.objects.bulk_update(planned, ['scheduled_date', 'updated_at'], batch_size=BATCH_SIZE)
+            assignment_ids = [d.assignment_id for d in planned if d.assignment_id]
+            for chunk in _chunks(assignment_ids):
+                ProductAssignment.objects.filter(id__in=chunk, status='PLANNED').update(status='SCHEDULED')
+
+    assigned = labels >= 0
+    counts = np.bincount(labels[assigned], minlength=len(capacities))
+    loads = np.bincount(labels[assigned], weights=demands[assigned], minlength=len(capacities))
+    per_day = [
+        {
+            'date': start_date + timedelta(days=offset),
+            'deliveries': int(counts[offset]),
+            'load': float(loads[offset]),
+            'capacity': float(capacities[offset]),
+        }
+        for offset in range(len(capacities))
+    ]
+
+    return {
+        'planned': len(planned),
+        'unplanned_ids': [d.id for d, label in zip(deliveries, labels) if label < 0],
+        'missing_coordinates_ids': missing,
+        'days': per_day,
+        'dry_run': dry_run,
+    }
@@ -0,0 +1,133 @@
+"""
+Delivery status transitions.
+
+ALLOWED_TRANSITIONS lists the statuses a delivery may move to from each
+status and ASSIGNMENT_STATUS the ProductAssignment status that follows from
+a delivery status. bulk_transition() validates a whole batch up front and
+applies it set-based in one transaction: one UPDATE per (status read,
+target status) pair and id chunk for the deliveries and one per target for
+their assignments, so closing a 60-stop day costs a handful of queries.
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import Delivery, ProductAssignment
+from products.services.route_bundle import mark_stops_changed
+from products.services.route_persistence import _chunks
+from products.services.vehicle_tracking import forget_deliveries
+
+ALLOWED_TRANSITIONS = {
+    'WAITING': ('OUT_FOR_DELIVERY', 'DELIVERED', 'FAILED'),
+    'OUT_FOR_DELIVERY': ('DELIVERED', 'FAILED', 'WAITING'),
+    'FAILED': ('WAITING', 'OUT_FOR_DELIVERY'),
+    'DELIVERED': (),
+}
+
+ASSIGNMENT_STATUS = {
+    'WAITING': 'SCHEDULED',
+    'OUT_FOR_DELIVERY': 'OUT_FOR_DELIVERY',
+    'DELIVERED': 'DELIVERED',
+    'FAILED': 'SCHEDULED',
+}
+
+MAX_BULK_CHANGES = 1000
+
+
+class StatusTransitionError(Exception):
+    """Raised when a batch cannot be applied; nothing is written."""
+
+    def __init__(self, message: str, errors: List[Dict] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def sync_assignments(assignment_ids: Iterable[int], delivery_status: str) -> int:
+    """Move the given (not cancelled) assignments to the status matching `delivery_status`."""
+    updated = 0
+    for chunk in _chunks(list(assignment_ids)):
+        updated += ProductAssignment.objects.filter(id__in=chunk).exclude(status='CANCELLED').update(
+            status=ASSIGNMENT_STATUS[delivery_status]
+        )
+    return updated
+
+
+def bulk_transition(changes: Dict[int, str], user=None) -> Dict:
+    """
+    Apply many delivery status changes at once.
+
+    Args:
+        changes: Target status per delivery id
+        user: Staff member recorded as delivered_by for DELIVERED
+
+    Raises:
+        StatusTransitionError: Unknown ids or statuses, transitions that are
+            not allowed, or deliveries changed concurrently
+
+    Returns:
+        Dict with the number of updated deliveries, the ids already in the
+        target status and the count per target status
+    """
+    if not changes:
+        raise StatusTransitionError('En az bir teslimat gereklidir')
+    if len(changes) > MAX_BULK_CHANGES:
+        raise StatusTransitionError(f'Tek istekte en fazla {MAX_BULK_CHANGES} teslimat güncellenebilir')
+
+    current = {}
+    for chunk in _chunks(list(changes)):
+        current.update(
+            (delivery_id, (status, assignment_id))
+            for delivery_id, status, assignment_id in Delivery.objects.filter(id__in=chunk).values_list(
+                'id', 'status', 'assignment_id'
+            )
+        )
+
+    errors = []
+    by_target = defaultdict(list)
+    unchanged = []
+    for delivery_id, target in changes.items():
+        if target not in ALLOWED_TRANSITIONS:
+            errors.append({'id': delivery_id, 'error': f'Geçersiz durum: {target}'})
+        elif delivery_id not in current:
+            errors.append({'id': delivery_id, 'error': 'Teslimat bulunamadı'})
+        elif current[delivery_id][0] == target:
+            unchanged.append(delivery_id)
+        elif target not in ALLOWED_TRANSITIONS[current[delivery_id][0]]:
+            errors.append({
+                'id': delivery_id,
+                'error': f'{current[delivery_id][0]} → {target} geçişine izin verilmiyor'
+            })
+        else:
+            by_target[target].append(delivery_id)
+    if errors:
+        raise StatusTransitionError('Geçersiz durum değişiklikleri', errors)
+
+    now = timezone.now()
+    changed = [delivery_id for ids in by_target.values() for delivery_id in ids]
+    with transaction.atomic():
+        updated = 0
+        for target, ids in by_target.items():
+            fields = {'status': target, 'updated_at': now}
+            if target == 'DELIVERED':
+                fields.update(delivered_at=now, delivered_by=user)
+            by_source = defaultdict(list)
+            for delivery_id in ids:
+                by_source[current[delivery_id][0]].append(delivery_id)
+            for source, source_ids in by_source.items():
+                for chunk in _chunks(source_ids):
+                    # Only rows still in the status that was validated are updated:
+                    # a concurrent change makes the count below come up short
+                    updated += Delivery.objects.filter(id__in=chunk, status=source).update(**fields)
+            sync_assignments([current[i][1] for i in ids if current[i][1]], target)
+        if updated != len(changed):
+            raise StatusTransitionError('Teslimatlar bu sırada değişti, lütfen tekrar deneyin')
+        mark_stops_changed(changed)
+    forget_deliveries(changed)
+
+    return {
+        'updated': updated,
+        'unchanged_ids': unchanged,
+        'by_status': {target: len(ids) for target, ids in by_target.items()},
+    }
@@ -0,0 +1,162 @@
+"""
+Persistent distance cache for route optimization.
+
+Pairwise distances are stored in DistanceCacheEntry keyed by coordinates
+rounded to 5 decimals, so re-optimizing a day after a single change only
+computes the pairs that involve the new stop. Only costly sources (road
+networks) are wrapped: a haversine matrix is computed faster than its pairs
+can be read back. Entries are evicted by age (purge_stale(), run by
+manage.py purge_distance_cache), which also picks up road network updates.
+"""
+from datetime import timedelta
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from products.models import DistanceCacheEntry
+from products.services.polyline import route_geometry
+from products.services.route_optimizer import HaversineDistanceProvider, coordinate_key
+
+# Keys per IN-clause: 2 x 500 keys stays well under the MSSQL 2100 parameter limit
+LOOKUP_CHUNK_SIZE = 500
+WRITE_BATCH_SIZE = 1000
+# ids per DELETE when purging (IN-clause limit, see route_persistence)
+DELETE_BATCH_SIZE = 500
+
+
+def _unique_points(lats, lngs):
+    """Deduplicate coordinates by key. Returns (keys, lats, lngs, index per input point)."""
+    positions: Dict[str, int] = {}
+    keys, unique_lats, unique_lngs, index = [], [], [], []
+    for lat, lng in zip(lats, lngs):
+        key = coordinate_key(float(lat), float(lng))
+        if key not in positions:
+            positions[key] = len(keys)
+            keys.append(key)
+            unique_lats.append(float(lat))
+            unique_lngs.append(float(lng))
+        index.append(positions[key])
+    return keys, unique_lats, unique_lngs, np.array(index, dtype=int)
+
+
+class CachedDistanceProvider:
+    """
+    Wraps a distance provider with a DB-backed pair cache.
+
+    matrix() reads known pairs in bulk, asks the wrapped provider only for
+    the rows/columns that still have gaps and stores the new pairs.
+    """
+
+    def __init__(self, base=None):
+        self.base = base or HaversineDistanceProvider()
+        self.source = self.base.source
+        self.computed_pairs = 0  # pairs computed by the last matrix() call
+
+    def matrix(self, lats, lngs, to_lats=None, to_lngs=None) -> np.ndarray:
+        origin_keys, o_lats, o_lngs, rows = _unique_points(lats, lngs)
+        if to_lats is None:
+            dest_keys, d_lats, d_lngs, cols = origin_keys, o_lats, o_lngs, rows
+        else:
+            dest_keys, d_lats, d_lngs, cols = _unique_points(to_lats, to_lngs)
+
+        known = np.full((len(origin_keys), len(dest_keys)), np.nan)
+        self._load(known, origin_keys, dest_keys)
+        dest_pos = {key: j for j, key in enumerate(dest_keys)}
+        for i, key in enumerate(origin_keys):
+            if key in dest_pos:
+                known[i, dest_pos[key]] = 0.0
+
+        missing = np.isnan(known)
+        self.computed_pairs = 0
+        if missing.any():
+            miss_rows = np.flatnonzero(missing.any(axis=1))
+            miss_cols = np.flatnonzero(missing.any(axis=0))
+            computed = self.base.matrix(
+                [o_lats[i] for i in miss_rows], [o_lngs[i] for i in miss_rows],
+                [d_lats[j] for j in miss_cols], [d_lngs[j] for j in miss_cols],
+            )
+            block = known[np.ix_(miss_rows, miss_cols)]
+            gaps = np.isnan(block)
+            block[gaps] = computed[gaps]
+            known[np.ix_(miss_rows, miss_cols)] = block
+
+            gap_rows, gap_cols = np.nonzero(gaps)
+            self._store([
+                (origin_keys[miss_rows[r]], dest_keys[miss_cols[c]], float(computed[r, c]))
+                for r, c in zip(gap_rows, gap_cols)
+            ])
+            self.computed_pairs = len(gap_rows)
+
+        return known[np.ix_(rows, cols)]
+
+    def geometry(self, lats, lngs):
+        """Route geometry of the wrapped provider (not cached)."""
+        return route_geometry(self.base, lats, lngs)
+
+    def _load(self, known: np.ndarray, origin_keys: List[str], dest_keys: List[str]):
+        """Fill `known` with cached distances, chunking both key lists."""
+        origin_pos = {key: i for i, key in enumerate(origin_keys)}
+        dest_pos = {key: j for j, key in enumerate(dest_keys)}
+        for o_start in range(0, len(origin_keys), LOOKUP_CHUNK_SIZE):
+            origin_chunk = origin_keys[o_start:o_start + LOOKUP_CHUNK_SIZE]
+            for d_start in range(0, len(dest_keys), LOOKUP_CHUNK_SIZE):
+                dest_chunk = dest_keys[d_start:d_start + LOOKUP_CHUNK_SIZE]
+                entries = DistanceCacheEntry.objects.filter(
+                    source=self.source, origin__in=origin_chunk, destination__in=dest_chunk
+                ).values_list('origin', 'destination', 'distance_km')
+                for origin, destination, distance in entries:
+                    known[origin_pos[origin], dest_pos[destination]] = distance
+
+    def _store(self, pairs):
+        DistanceCacheEntry.objects.bulk_create(
+            [
+                DistanceCacheEntry(source=self.source, origin=o, destination=d, distance_km=km)
+                for o, d, km in pairs if o != d
+            ],
+            batch_size=WRITE_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+@lru_cache(maxsize=2)
+def _load_road_graph(path: str):
+    from products.services.road_network import RoadGraph
+
+    return RoadGraph.from_file(path)
+
+
+def get_distance_provider():
+    """
+    Distance provider configured for this deployment: road distances when
+    ROAD_NETWORK_PATH points to an OSM extract (behind the DB pair cache
+    unless ROUTE_DISTANCE_CACHE_ENABLED is off), haversine otherwise.
+    """
+    road_network_path = getattr(settings, 'ROAD_NETWORK_PATH', None)
+    if not road_network_path:
+        return HaversineDistanceProvider()
+
+    from products.services.road_network import RoadNetworkDistanceProvider
+
+    provider = RoadNetworkDistanceProvider(_load_road_graph(road_network_path))
+    if getattr(settings, 'ROUTE_DISTANCE_CACHE_ENABLED', True):
+        return CachedDistanceProvider(provider)
+    return provider
+
+
+def purge_stale(max_age: timedelta) -> int:
+    """
+    Delete cached distances older than `max_age`.
+
+    Returns:
+        Number of entries deleted
+    """
+    stale_ids = list(
+        DistanceCacheEntry.objects.filter(created_at__lt=timezone.now() - max_age).values_list('id', flat=True)
+    )
+    deleted = 0
+    for start in range(0, len(stale_ids), DELETE_BATCH_SIZE):
+        deleted += DistanceCacheEntry.objects.filter(id__in=stale_ids[start:start + DELETE_BATCH_SIZE]).delete()[0]
+    return deleted
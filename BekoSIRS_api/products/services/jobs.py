@@ -0,0 +1,191 @@
+"""
+Background job runner backed by the BackgroundJob table.
+
+Jobs are created with enqueue_job() and executed by the
+`run_background_jobs` management command (BACKGROUND_JOBS_MODE='worker',
+the production default), in a thread of the web process ('thread', for
+development) or inline ('sync').
+
+A RUNNING job whose row has not been touched for JOB_STALE_SECONDS lost
+its runner (worker restart, gunicorn recycling the web process that ran
+the thread): recover_stale_jobs() marks it FAILED so pollers stop waiting.
+Running jobs refresh updated_at with every progress report.
+
+Handlers are looked up in JOB_HANDLERS and called as handler(job, context).
+They return a JSON-serializable result; long-running handlers pass
+context.on_progress to the solver so progress, the best objective and a
+checkpoint of the incumbent are stored and cancellation is honoured.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from products.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {
+    'route_optimize': 'products.views.delivery_views.run_route_optimization_job',
+    'notification_bulk': 'products.services.notification_fanout.run_bulk_notification_job',
+}
+
+
+class JobContext:
+    """Progress reporting and cancellation for a running job."""
+
+    def __init__(self, job: BackgroundJob):
+        self.job_id = job.pk
+        self.cancelled = False
+        # Optional: converts a solver incumbent into a JSON checkpoint
+        self.map_solution = None
+
+    def check_cancelled(self) -> bool:
+        if not self.cancelled:
+            self.cancelled = BackgroundJob.objects.filter(
+                pk=self.job_id, cancel_requested=True
+            ).exists()
+        return self.cancelled
+
+    def update(self, **fields):
+        BackgroundJob.objects.filter(pk=self.job_id).update(updated_at=timezone.now(), **fields)
+
+    def on_progress(self, budget):
+        """SearchBudget callback: store progress/incumbent, stop on cancel."""
+        fields = {'progress': round(budget.progress, 4)}
+        if budget.best_objective is not None:
+            fields['best_objective'] = round(budget.best_objective, 3)
+        if budget.incumbent is not None and self.map_solution is not None:
+            fields['checkpoint'] = self.map_solution(budget.incumbent)
+        self.update(**fields)
+        if self.check_cancelled():
+            budget.cancel()
+
+
+def enqueue_job(job_type: str, payload: dict, user=None) -> BackgroundJob:
+    """Create a job and start it according to BACKGROUND_JOBS_MODE."""
+    if job_type not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job type: {job_type}")
+
+    job = BackgroundJob.objects.create(job_type=job_type, payload=payload, created_by=user)
+    mode = getattr(settings, 'BACKGROUND_JOBS_MODE', 'worker')
+    if mode == 'sync':
+        run_job(job.pk)
+        job.refresh_from_db()
+    elif mode == 'thread':
+        transaction.on_commit(lambda: threading.Thread(
+            target=_run_in_thread, args=(job.pk,), daemon=True
+        ).start())
+    return job
+
+
+def job_payload(job: BackgroundJob) -> dict:
+    """API representation of a job (status polling responses)."""
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'best_objective': job.best_objective,
+        'checkpoint': job.checkpoint,
+        'result': job.result,
+        'error': job.error or None,
+        'cancel_requested': job.cancel_requested,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def request_cancel(job: BackgroundJob) -> BackgroundJob:
+    """Ask a job to stop. Pending jobs are cancelled immediately."""
+    BackgroundJob.objects.filter(pk=job.pk).update(cancel_requested=True, updated_at=timezone.now())
+    BackgroundJob.objects.filter(pk=job.pk, status='PENDING').update(
+        status='CANCELLED', finished_at=timezone.now()
+    )
+    job.refresh_from_db()
+    return job
+
+
+def recover_stale_jobs(job_ids=None) -> int:
+    """
+    Mark RUNNING jobs without a progress report for JOB_STALE_SECONDS as FAILED.
+
+    Args:
+        job_ids: Only look at these jobs (all running jobs if omitted)
+
+    Returns:
+        Number of jobs marked as failed
+    """
+    now = timezone.now()
+    stale = BackgroundJob.objects.filter(
+        status='RUNNING', updated_at__lt=now - timedelta(seconds=settings.JOB_STALE_SECONDS)
+    )
+    if job_ids is not None:
+        stale = stale.filter(pk__in=job_ids)
+    recovered = stale.update(
+        status='FAILED', error='İş yanıt vermeyi bıraktı (çalıştıran süreç durdu)',
+        finished_at=now, updated_at=now
+    )
+    if recovered:
+        logger.warning("Marked %s stale background job(s) as failed", recovered)
+    return recovered
+
+
+def check_stale(job: BackgroundJob) -> BackgroundJob:
+    """Fail `job` if its runner died, for status polling."""
+    if job.status == 'RUNNING' and recover_stale_jobs([job.pk]):
+        job.refresh_from_db()
+    return job
+
+
+def run_job(job_id: int) -> bool:
+    """
+    Claim and execute a pending job.
+
+    Returns:
+        False if the job was already claimed by another runner
+    """
+    claimed = BackgroundJob.objects.filter(pk=job_id, status='PENDING').update(
+        status='RUNNING', started_at=timezone.now(), updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+
+    job = BackgroundJob.objects.get(pk=job_id)
+    context = JobContext(job)
+    try:
+        result = import_string(JOB_HANDLERS[job.job_type])(job, context)
+    except Exception as exc:
+        logger.exception("Background job %s failed", job_id)
+        context.update(status='FAILED', error=str(exc), finished_at=timezone.now())
+    else:
+        context.update(
+            status='CANCELLED' if context.cancelled else 'SUCCEEDED',
+            progress=1.0,
+            result=result,
+            finished_at=timezone.now()
+        )
+    return True
+
+
+def run_pending_jobs(limit: int = None) -> int:
+    """Run pending jobs oldest first. Returns the number of jobs executed."""
+    recover_stale_jobs()
+    executed = 0
+    pending = BackgroundJob.objects.filter(status='PENDING').order_by('created_at').values_list('pk', flat=True)
+    for job_id in list(pending[:limit] if limit else pending):
+        if run_job(job_id):
+            executed += 1
+    return executed
+
+
+def _run_in_thread(job_id: int):
+    try:
+        run_job(job_id)
+    finally:
+        connections.close_all()
+
@@ -0,0 +1,177 @@
+"""
+Per-user unread notification counters.
+
+The unread count of every user is kept in the cache so that the polled
+/notifications/unread-count/ endpoint does not query the notifications
+table. Writers keep it up to date:
+
+- single creates through the Notification post_save signal,
+- bulk_create paths by calling notifications_created() with the new rows,
+- mark-read by calling notifications_read(), delete by notification_deleted(),
+- edits of saved rows (API update, admin) by notification_changed() with the
+  previous state,
+- read-all by calling all_read(), clear-all by cleared().
+
+Counters are only adjusted while cached: a missing counter is rebuilt from
+the table on the next read. Counters expire after COUNTER_TTL seconds and
+`manage.py reconcile_notification_counters` rewrites them from the table,
+which bounds any drift (e.g. a rolled back insert). The same calls keep the
+admin statistics snapshot current (notification_stats), and every change is
+published to the user's listeners (notification_stream).
+"""
+from collections import Counter
+from typing import Iterable, Optional
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from products.models import CustomUser, Notification
+from products.services import notification_stats, notification_stream
+
+COUNTER_TTL = 24 * 60 * 60
+
+# users per reconcile query (IN-clause limit, see route_persistence)
+RECONCILE_BATCH_SIZE = 500
+
+
+def _counter_key(user_id: int) -> str:
+    return f'notifications:unread:{user_id}'
+
+
+def _adjust(user_id: int, delta: int):
+    try:
+        cache.incr(_counter_key(user_id), delta)
+    except ValueError:
+        pass  # not cached: rebuilt from the table on the next read
+
+
+def unread_count(user_id: int) -> int:
+    """Unread notifications of a user, counted in the table only on a cache miss."""
+    count = cache.get(_counter_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+        cache.add(_counter_key(user_id), count, COUNTER_TTL)
+    return max(count, 0)
+
+
+def notifications_created(notifications: Iterable[Notification]):
+    """Count new unread notifications (e.g. the rows of a bulk_create)."""
+    notifications = list(notifications)
+    created = Counter(n.user_id for n in notifications)
+    for user_id, count in created.items():
+        _adjust(user_id, count)
+    notification_stats.record_created(n.notification_type for n in notifications)
+    notification_stream.publish(created)
+
+
+def notifications_read(user_id: int, count: int = 1):
+    """Unread notifications of a user were marked as read."""
+    if count:
+        _adjust(user_id, -count)
+        notification_stats.record_read(count)
+        notification_stream.publish([user_id])
+
+
+def notifications_unread(user_id: int, count: int = 1):
+    """Read notifications of a user were marked as unread again."""
+    if count:
+        _adjust(user_id, count)
+        notification_stats.record_read(-count)
+        notification_stream.publish([user_id])
+
+
+def notification_deleted(notification: Notification):
+    if not notification.is_read:
+        _adjust(notification.user_id, -1)
+        notification_stream.publish([notification.user_id])
+    notification_stats.record_deleted(notification.notification_type, notification.is_read)
+
+
+def all_read(user_id: int, count: int):
+    """All `count` unread notifications of the user were marked as read."""
+    cache.set(_counter_key(user_id), 0, COUNTER_TTL)
+    notification_stats.record_read(count)
+    notification_stream.publish([user_id])
+
+
+def cleared(user_id: int):
+    """All notifications of the user were deleted."""
+    cache.set(_counter_key(user_id), 0, COUNTER_TTL)
+    notification_stats.invalidate()
+    notification_stream.publish([user_id])
+
+
+def notification_state(notification: Notification) -> dict:
+    """What notification_changed() needs to know about a row before it is edited."""
+    return {
+        'user_id': notification.user_id,
+        'notification_type': notification.notification_type,
+        'is_read': notification.is_read,
+    }
+
+
+def notification_changed(previous: dict, notification: Notification):
+    """
+    A saved notification was edited; only read-state, owner and type changes count.
+
+    Args:
+        previous: notification_state() before the edit
+        notification: The saved notification
+    """
+    if previous['user_id'] != notification.user_id or previous['notification_type'] != notification.notification_type:
+        notification_moved(previous, notification)
+    elif previous['is_read'] != notification.is_read:
+        if notification.is_read:
+            notifications_read(notification.user_id)
+        else:
+            notifications_unread(notification.user_id)
+
+
+def notification_moved(previous: dict, notification: Notification):
+    """A saved notification changed owner or type (see notification_changed)."""
+    forget(previous['user_id'])
+    forget(notification.user_id)
+    notification_stats.record_deleted(previous['notification_type'], previous['is_read'])
+    notification_stats.record_created([notification.notification_type])
+    if notification.is_read:
+        notification_stats.record_read(1)
+
+
+def forget(user_id: int):
+    """Drop the counter of a user; it is recounted on the next read."""
+    cache.delete(_counter_key(user_id))
+    notification_stream.publish([user_id])
+
+
+def reconcile(user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Rewrite counters from the notifications table.
+
+    Args:
+        user_ids: Users to reconcile (all users if omitted)
+
+    Returns:
+        Number of counters written
+    """
+    if user_ids is None:
+        user_ids = CustomUser.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=RECONCILE_BATCH_SIZE)
+
+    written = 0
+    batch = []
+    for user_id in user_ids:
+        batch.append(user_id)
+        if len(batch) == RECONCILE_BATCH_SIZE:
+            written += _reconcile_batch(batch)
+            batch = []
+    if batch:
+        written += _reconcile_batch(batch)
+    return written
+
+
+def _reconcile_batch(user_ids):
+    counts = dict(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .order_by().values('user_id').annotate(unread=Count('id')).values_list('user_id', 'unread')
+    )
+    cache.set_many({_counter_key(user_id): counts.get(user_id, 0) for user_id in user_ids}, COUNTER_TTL)
+    return len(user_ids)
@@ -0,0 +1,88 @@
+"""
+Bulk notification fan-out.
+
+Recipient ids are streamed from the database (values_list + iterator) and
+notifications are inserted in fixed-size batches, so memory use and the
+size of each INSERT stay constant however many users are targeted. Large
+sends run as a 'notification_bulk' background job (see services/jobs.py)
+that reports progress after every batch and can be cancelled between
+batches.
+"""
+from typing import Callable, Optional
+
+from products.models import CustomUser, Notification
+from products.services.notification_counters import notifications_created
+
+# ids fetched per round trip while streaming recipients
+FANOUT_CHUNK_SIZE = 2000
+
+# 8 columns per row: one INSERT stays under MSSQL's 2100 parameters
+INSERT_BATCH_SIZE = 250
+
+TARGETS = ('all', 'customers')
+
+
+def recipient_ids(target: str):
+    """Ids of the users that receive a general announcement for `target`."""
+    users = CustomUser.objects.filter(notify_general=True)
+    if target == 'customers':
+        users = users.filter(role='customer')
+    return users.order_by('id').values_list('id', flat=True)
+
+
+def send_bulk_notification(
+    title: str,
+    message: str,
+    notification_type: str = 'general',
+    target: str = 'customers',
+    on_batch: Optional[Callable[[int, int], bool]] = None
+) -> int:
+    """
+    Create one notification per recipient, batch by batch.
+
+    Args:
+        title: Notification title
+        message: Notification body
+        notification_type: Notification.NOTIFICATION_TYPE_CHOICES value
+        target: 'customers' or 'all'
+        on_batch: Called as on_batch(sent, total) after every inserted
+            batch; returning True stops the fan-out
+
+    Returns:
+        Number of notifications created
+    """
+    ids = recipient_ids(target)
+    total = ids.count() if on_batch else 0
+    sent = 0
+    batch = []
+
+    def flush() -> bool:
+        nonlocal sent, batch
+        Notification.objects.bulk_create(batch)
+        notifications_created(batch)
+        sent += len(batch)
+        batch = []
+        return bool(on_batch and on_batch(sent, total))
+
+    for user_id in ids.iterator(chunk_size=FANOUT_CHUNK_SIZE):
+        batch.append(Notification(
+            user_id=user_id, notification_type=notification_type, title=title, message=message
+        ))
+        if len(batch) >= INSERT_BATCH_SIZE and flush():
+            return sent
+    if batch:
+        flush()
+    return sent
+
+
+def run_bulk_notification_job(job, context):
+    """BackgroundJob handler for 'notification_bulk'."""
+    def on_batch(sent, total):
+        context.update(progress=round(sent / total, 4) if total else 1.0, checkpoint={'sent': sent})
+        return context.check_cancelled()
+
+    payload = job.payload
+    sent = send_bulk_notification(
+        payload['title'], payload['message'], payload['notification_type'], payload['target'], on_batch=on_batch
+    )
+    return {'count': sent}
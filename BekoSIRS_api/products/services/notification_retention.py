@@ -0,0 +1,129 @@
+"""
+Notification retention: archive and purge old notifications.
+
+Which rows expire is configured in settings.NOTIFICATION_RETENTION: read
+notifications older than the age set for their type (or 'default_days'),
+and unread ones older than 'unread_days'. purge_notifications() walks the
+expired rows in primary-key windows of 'batch_size' ids; every window is
+read, appended to a gzip JSON-lines archive and deleted by id in its own
+short transaction, so locks stay small and the job can be stopped at any
+point without losing archived data.
+"""
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from products.models import Notification
+from products.services import notification_counters, notification_stats
+
+# ids per DELETE (IN-clause limit, see route_persistence)
+DELETE_BATCH_SIZE = 500
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'notification_type', 'title', 'message', 'is_read', 'created_at',
+    'related_product_id', 'related_service_request_id',
+)
+
+
+def retention_filter(now=None) -> Q:
+    """Q matching the notifications that are past their retention period."""
+    config = settings.NOTIFICATION_RETENTION
+    now = now or timezone.now()
+    types = config.get('types', {})
+
+    expired = Q(pk__in=[])
+    for notification_type, days in types.items():
+        expired |= Q(notification_type=notification_type, created_at__lt=now - timedelta(days=days))
+    expired |= ~Q(notification_type__in=list(types)) & Q(created_at__lt=now - timedelta(days=config['default_days']))
+    expired &= Q(is_read=True)
+
+    if config.get('unread_days') is not None:
+        expired |= Q(is_read=False, created_at__lt=now - timedelta(days=config['unread_days']))
+    return expired
+
+
+def _archive_path(archive_dir: str, now) -> str:
+    os.makedirs(archive_dir, exist_ok=True)
+    return os.path.join(archive_dir, f"notifications-{now.strftime('%Y%m%d-%H%M%S')}.jsonl.gz")
+
+
+def purge_notifications(
+    batch_size: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    archive: bool = True,
+    pause_seconds: float = 0.0,
+    on_batch: Optional[Callable[[Dict], None]] = None,
+    now=None
+) -> Dict:
+    """
+    Archive and delete expired notifications in primary-key batches.
+
+    Args:
+        batch_size: Ids per window (settings value if omitted)
+        archive_dir: Directory of the gzip archive (settings value if omitted)
+        archive: False deletes without writing an archive
+        pause_seconds: Sleep between batches to leave room for other writers
+        on_batch: Called with the running totals after every window
+        now: Reference time for the retention ages
+
+    Returns:
+        Dict with the deleted count, batches, elapsed seconds, rows per
+        second and the archive path (None if nothing was archived)
+    """
+    config = settings.NOTIFICATION_RETENTION
+    batch_size = batch_size or config['batch_size']
+    now = now or timezone.now()
+    expired = Notification.objects.filter(retention_filter(now)).order_by()
+
+    bounds = expired.aggregate(low=Min('id'), high=Max('id'))
+    started = time.monotonic()
+    totals = {'deleted': 0, 'batches': 0, 'seconds': 0.0, 'rows_per_second': 0.0, 'archive_path': None}
+    if bounds['low'] is None:
+        return totals
+
+    archive_file = None
+    unread_users = set()
+    try:
+        for low in range(bounds['low'], bounds['high'] + 1, batch_size):
+            rows = list(expired.filter(id__gte=low, id__lt=low + batch_size).values(*ARCHIVE_FIELDS))
+            if not rows:
+                continue
+            if archive:
+                if archive_file is None:
+                    totals['archive_path'] = _archive_path(archive_dir or config['archive_dir'], now)
+                    archive_file = gzip.open(totals['archive_path'], 'at', encoding='utf-8')
+                archive_file.writelines(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+                archive_file.flush()
+
+            # Delete exactly the archived rows (others may have expired meanwhile)
+            ids = [row['id'] for row in rows]
+            with transaction.atomic():
+                for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                    totals['deleted'] += Notification.objects.filter(id__in=ids[start:start + DELETE_BATCH_SIZE]).delete()[0]
+            unread_users.update(row['user_id'] for row in rows if not row['is_read'])
+
+            totals['batches'] += 1
+            totals['seconds'] = round(time.monotonic() - started, 3)
+            totals['rows_per_second'] = round(totals['deleted'] / totals['seconds'], 1) if totals['seconds'] else 0.0
+            if on_batch:
+                on_batch(totals)
+            if pause_seconds:
+                time.sleep(pause_seconds)
+    finally:
+        if archive_file is not None:
+            archive_file.close()
+        for user_id in unread_users:
+            notification_counters.forget(user_id)
+        if totals['deleted']:
+            notification_stats.invalidate()
+
+    return totals
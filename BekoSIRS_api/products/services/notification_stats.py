@@ -0,0 +1,105 @@
+"""
+Notification statistics for the admin panel.
+
+compute_stats() reads everything in one grouped, conditionally aggregated
+query. The result is kept in the cache as separate counters (total, read,
+unread and one per type) for STATS_TTL seconds; writers adjust the cached
+counters with atomic increments (see notification_counters), so the admin
+page reads the snapshot without scanning the notifications table. A
+missing counter makes the next read recompute the whole snapshot.
+"""
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from products.models import Notification
+
+STATS_TTL = 60
+
+STAT_TYPES = ('general', 'price_drop', 'restock', 'service_update', 'recommendation', 'warranty_expiry')
+
+_KEY_PREFIX = 'notifications:stats:'
+
+
+def _type_key(notification_type: str) -> str:
+    return f'{_KEY_PREFIX}type:{notification_type}'
+
+
+_TOTAL_KEY = f'{_KEY_PREFIX}total'
+_READ_KEY = f'{_KEY_PREFIX}read'
+_UNREAD_KEY = f'{_KEY_PREFIX}unread'
+_KEYS = [_TOTAL_KEY, _READ_KEY, _UNREAD_KEY] + [_type_key(t) for t in STAT_TYPES]
+
+
+def compute_stats() -> Dict:
+    """Statistics straight from the table (one query)."""
+    rows = Notification.objects.order_by().values('notification_type').annotate(
+        total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+    )
+    total = unread = 0
+    by_type = dict.fromkeys(STAT_TYPES, 0)
+    for row in rows:
+        total += row['total']
+        unread += row['unread']
+        if row['notification_type'] in by_type:
+            by_type[row['notification_type']] = row['total']
+    return {'total': total, 'read': total - unread, 'unread': unread, 'by_type': by_type}
+
+
+def notification_stats() -> Dict:
+    """Cached statistics snapshot, recomputed when it expired."""
+    cached = cache.get_many(_KEYS)
+    if len(cached) == len(_KEYS):
+        return {
+            'total': cached[_TOTAL_KEY],
+            'read': cached[_READ_KEY],
+            'unread': cached[_UNREAD_KEY],
+            'by_type': {t: cached[_type_key(t)] for t in STAT_TYPES},
+        }
+
+    stats = compute_stats()
+    snapshot = {_TOTAL_KEY: stats['total'], _READ_KEY: stats['read'], _UNREAD_KEY: stats['unread']}
+    snapshot.update({_type_key(t): count for t, count in stats['by_type'].items()})
+    cache.set_many(snapshot, STATS_TTL)
+    return stats
+
+
+def _adjust(key: str, delta: int):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass  # snapshot expired: recomputed on the next read
+
+
+def record_created(notification_types: Iterable[str]):
+    """New unread notifications of these types (one entry per notification)."""
+    created = 0
+    by_type = {}
+    for notification_type in notification_types:
+        created += 1
+        by_type[notification_type] = by_type.get(notification_type, 0) + 1
+    _adjust(_TOTAL_KEY, created)
+    _adjust(_UNREAD_KEY, created)
+    for notification_type, count in by_type.items():
+        if notification_type in STAT_TYPES:
+            _adjust(_type_key(notification_type), count)
+
+
+def record_read(count: int):
+    _adjust(_UNREAD_KEY, -count)
+    _adjust(_READ_KEY, count)
+
+
+def record_deleted(notification_type: str, was_read: bool):
+    _adjust(_TOTAL_KEY, -1)
+    _adjust(_READ_KEY if was_read else _UNREAD_KEY, -1)
+    if notification_type in STAT_TYPES:
+        _adjust(_type_key(notification_type), -1)
+
+
+def invalidate():
+    """Drop the snapshot (changes whose breakdown is unknown)."""
+    cache.delete_many(_KEYS)
@@ -0,0 +1,131 @@
+"""
+Push channel for new notifications (SSE stream and long-poll).
+
+Every user has a notification version in the cache that is bumped whenever
+their notifications change (created, read, cleared; see
+notification_counters). Listeners remember the version, wait until it
+changes and only then read what is new, so a connected client costs one
+cache read per NOTIFICATION_STREAM['poll_interval'] and no database query
+while nothing happens.
+
+The cache is the pub-sub medium, which works across processes with Redis
+and in-process with the local memory cache. Waiters in the publishing
+process are also woken immediately through a condition variable.
+"""
+import asyncio
+import threading
+import time
+from typing import Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from products.models import Notification
+
+VERSION_TTL = 24 * 60 * 60
+
+# New notifications returned per event
+MAX_EVENT_NOTIFICATIONS = 50
+
+_changed = threading.Condition()
+
+
+def _version_key(user_id: int) -> str:
+    return f'notifications:version:{user_id}'
+
+
+def stream_config() -> Dict:
+    return settings.NOTIFICATION_STREAM
+
+
+def current_version(user_id: int) -> int:
+    return cache.get(_version_key(user_id), 0)
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        key = _version_key(user_id)
+        cache.add(key, 0, VERSION_TTL)
+        try:
+            cache.incr(key)
+        except ValueError:  # expired in between
+            cache.set(key, 1, VERSION_TTL)
+    with _changed:
+        _changed.notify_all()
+
+
+def publish(user_ids: Iterable[int]):
+    """Wake the listeners of these users once the current transaction commits."""
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+def wait_for_change(user_id: int, version: int, timeout: float) -> bool:
+    """Block until the user's version differs from `version` or `timeout` passes."""
+    deadline = time.monotonic() + timeout
+    interval = stream_config()['poll_interval']
+    while current_version(user_id) == version:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        with _changed:
+            _changed.wait(min(interval, remaining))
+    return True
+
+
+async def await_change(user_id: int, version: int, timeout: float) -> bool:
+    """wait_for_change for async views: polls the cache without holding a thread."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    interval = stream_config()['poll_interval']
+    while await cache.aget(_version_key(user_id), 0) == version:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return False
+        await asyncio.sleep(min(interval, remaining))
+    return True
+
+
+def latest_id(user_id: int) -> int:
+    """Cursor for a client that only wants notifications from now on."""
+    return Notification.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def snapshot(user_id: int, after_id: int = 0) -> Dict:
+    """
+    What a listener needs to catch up.
+
+    Args:
+        user_id: Listening user
+        after_id: Last notification id the client has seen
+
+    Returns:
+        Dict with the notifications newer than `after_id` (oldest first),
+        the cursor for the next call and the unread count
+    """
+    from products.services.notification_counters import unread_count
+
+    notifications = list(
+        Notification.objects.filter(user_id=user_id, id__gt=after_id).order_by('id').values(
+            'id', 'notification_type', 'title', 'created_at'
+        )[:MAX_EVENT_NOTIFICATIONS]
+    )
+    return {
+        'notifications': notifications,
+        'last_id': notifications[-1]['id'] if notifications else after_id,
+        'unread_count': unread_count(user_id),
+    }
+
+
+def long_poll(user_id: int, after_id: int, timeout: float) -> Dict:
+    """
+    Answer at once if there is something new, otherwise wait up to `timeout`
+    seconds for a change.
+    """
+    version = current_version(user_id)
+    result = snapshot(user_id, after_id)
+    if not result['notifications'] and wait_for_change(user_id, version, timeout):
+        result = snapshot(user_id, after_id)
+    return result
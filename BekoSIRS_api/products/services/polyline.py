@@ -0,0 +1,71 @@
+"""
+Google encoded polyline format for route geometry.
+
+Coordinates are rounded to 1e-5 degrees, delta-encoded against the previous
+point and written as 5-bit chunks of printable ASCII, so a route of a few
+hundred points takes a few kilobytes instead of a JSON array of floats.
+See https://developers.google.com/maps/documentation/utilities/polylinealgorithm
+
+route_geometry() asks the distance provider for the path between stops:
+straight segments for haversine, road geometry for the road network
+provider. Like route_optimizer, this module has no Django imports.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+POLYLINE_PRECISION = 5
+
+
+def encode_polyline(points: Sequence[Tuple[float, float]], precision: int = POLYLINE_PRECISION) -> str:
+    """Encode [(lat, lng), ...] as a Google polyline string."""
+    if not len(points):
+        return ''
+    coords = np.round(np.asarray(points, dtype=float) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    # Zig-zag: sign goes to the lowest bit
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chars = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return ''.join(chars)
+
+
+def decode_polyline(encoded: str, precision: int = POLYLINE_PRECISION) -> List[Tuple[float, float]]:
+    """Decode a Google polyline string into [(lat, lng), ...]."""
+    values = []
+    value = shift = 0
+    for char in encoded:
+        chunk = ord(char) - 63
+        value |= (chunk & 0x1f) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+
+    if not values:
+        return []
+    coords = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return [(lat, lng) for lat, lng in coords.tolist()]
+
+
+def route_geometry(distance_provider, lats: Sequence[float], lngs: Sequence[float]) -> List[Tuple[float, float]]:
+    """
+    Points to draw for a route visiting (lats[i], lngs[i]) in order.
+
+    Providers with a geometry(lats, lngs) method (road network) return the
+    road path; otherwise stops are joined by straight segments.
+    """
+    geometry = getattr(distance_provider, 'geometry', None)
+    if geometry is not None and len(lats) > 1:
+        return geometry(lats, lngs)
+    return [(float(lat), float(lng)) for lat, lng in zip(lats, lngs)]
+
+
+def route_polyline(distance_provider, lats: Sequence[float], lngs: Sequence[float]) -> str:
+    """Encoded polyline of a route (see route_geometry)."""
+    return encode_polyline(route_geometry(distance_provider, lats, lngs))
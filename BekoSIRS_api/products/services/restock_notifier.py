@@ -0,0 +1,150 @@
+"""
+Restock notifications for wishlist subscribers.
+
+A product is restocked when its stock goes from 0 (or below) to a positive
+value. Every write path that changes stock (product update, bulk stock
+update, Excel import) passes the products that crossed that line to
+notify_restocked(). Subscribers (wishlist items with notify_on_restock whose
+owner has notify_restock enabled) are read with one join query per chunk of
+products and notified with batched bulk_create.
+
+A product notifies at most once per RESTOCK_DEBOUNCE_SECONDS: a stock that
+flaps between 0 and 1 neither spams users nor re-runs the subscriber query.
+The debounce is a cache.add() marker, so it holds across processes when the
+cache is shared (Redis); it is dropped again if sending fails.
+"""
+from typing import Dict, Iterable
+
+from django.core.cache import cache
+from django.db import transaction
+
+from products.models import Notification, Product, WishlistItem
+from products.services.notification_counters import notifications_created
+from products.services.notification_fanout import FANOUT_CHUNK_SIZE, INSERT_BATCH_SIZE
+
+RESTOCK_DEBOUNCE_SECONDS = 6 * 60 * 60
+
+# product ids per IN clause
+PRODUCT_CHUNK_SIZE = 500
+
+MAX_STOCK_CHANGES = 1000
+
+
+class StockUpdateError(Exception):
+    """Invalid bulk stock update; nothing was written."""
+
+
+def is_restock(old_stock, new_stock) -> bool:
+    return (old_stock or 0) <= 0 < (new_stock or 0)
+
+
+def _debounce_key(product_id: int) -> str:
+    return f'restock:notified:{product_id}'
+
+
+def notify_restocked(products: Iterable[Product]) -> int:
+    """
+    Notify the subscribers of restocked products.
+
+    Args:
+        products: Products whose stock just went from 0 to positive
+            (only id and name are used)
+
+    Returns:
+        Number of notifications created
+    """
+    due = {product.id: product for product in products if cache.add(_debounce_key(product.id), 1, RESTOCK_DEBOUNCE_SECONDS)}
+    if not due:
+        return 0
+    try:
+        return _send_restock_notifications(due)
+    except Exception:
+        # Nothing (or not everything) was sent: let the next restock try again
+        cache.delete_many([_debounce_key(product_id) for product_id in due])
+        raise
+
+
+def _send_restock_notifications(due: Dict[int, Product]) -> int:
+    sent = 0
+    batch = []
+
+    def flush():
+        nonlocal sent, batch
+        Notification.objects.bulk_create(batch)
+        notifications_created(batch)
+        sent += len(batch)
+        batch = []
+
+    product_ids = list(due)
+    for start in range(0, len(product_ids), PRODUCT_CHUNK_SIZE):
+        subscribers = WishlistItem.objects.filter(
+            product_id__in=product_ids[start:start + PRODUCT_CHUNK_SIZE],
+            notify_on_restock=True,
+            wishlist__customer__notify_restock=True,
+            wishlist__customer__is_active=True,
+        ).order_by().values_list('product_id', 'wishlist__customer_id')
+
+        for product_id, user_id in subscribers.iterator(chunk_size=FANOUT_CHUNK_SIZE):
+            product = due[product_id]
+            batch.append(Notification(
+                user_id=user_id,
+                notification_type='restock',
+                title='Stok Geldi!',
+                message=f'İstek listenizdeki {product.name} ürünü tekrar stokta.',
+                related_product_id=product_id,
+            ))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                flush()
+    if batch:
+        flush()
+    return sent
+
+
+def update_stock(changes: Dict[int, int]) -> Dict:
+    """
+    Set the stock of many products and notify the restocked ones.
+
+    Args:
+        changes: {product_id: new_stock}
+
+    Returns:
+        {'updated': n, 'restocked': [product ids], 'notified': n}
+
+    Raises:
+        StockUpdateError: Too many changes, negative stock or unknown ids
+    """
+    if len(changes) > MAX_STOCK_CHANGES:
+        raise StockUpdateError(f'Tek istekte en fazla {MAX_STOCK_CHANGES} ürün güncellenebilir')
+    if any(stock < 0 for stock in changes.values()):
+        raise StockUpdateError('Stok negatif olamaz')
+
+    product_ids = list(changes)
+    restocked = []
+    with transaction.atomic():
+        products = []
+        for start in range(0, len(product_ids), PRODUCT_CHUNK_SIZE):
+            products.extend(
+                Product.objects.select_for_update()
+                .filter(id__in=product_ids[start:start + PRODUCT_CHUNK_SIZE])
+                .only('id', 'name', 'stock')
+            )
+        missing = set(changes) - {product.id for product in products}
+        if missing:
+            raise StockUpdateError(f'Ürün bulunamadı: {sorted(missing)}')
+
+        changed = []
+        for product in products:
+            new_stock = changes[product.id]
+            if new_stock == product.stock:
+                continue
+            if is_restock(product.stock, new_stock):
+                restocked.append(product)
+            product.stock = new_stock
+            changed.append(product)
+        Product.objects.bulk_update(changed, ['stock'], batch_size=PRODUCT_CHUNK_SIZE)
+
+    return {
+        'updated': len(changed),
+        'restocked': sorted(product.id for product in restocked),
+        'notified': notify_restocked(restocked),
+    }
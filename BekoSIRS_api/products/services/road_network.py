@@ -0,0 +1,270 @@
+"""
+Offline road-network distances from a local OpenStreetMap extract.
+
+A .osm XML extract (e.g. North Cyprus from Geofabrik, converted with
+`osmium cat north-cyprus.osm.pbf -o north-cyprus.osm`) is parsed once into
+a compact graph and cached next to the source as `<file>.graph.npz`.
+Stops are snapped to the nearest routable node with a KD-tree and
+many-to-many distances come from multi-source Dijkstra on the sparse graph
+(scipy.sparse.csgraph), restricted to the largest strongly connected
+component so every snapped pair is reachable.
+
+Road distances are directional (one-way streets); the local search in
+route_optimizer accounts for asymmetric matrices.
+
+Like route_optimizer, this module has no Django imports.
+"""
+import os
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from scipy.spatial import cKDTree
+
+from products.services.route_optimizer import EARTH_RADIUS_KM, HaversineDistanceProvider
+
+# Way types a delivery truck can use
+ROUTABLE_HIGHWAYS = {
+    'motorway', 'trunk', 'primary', 'secondary', 'tertiary', 'unclassified', 'residential',
+    'motorway_link', 'trunk_link', 'primary_link', 'secondary_link', 'tertiary_link',
+    'living_street', 'service', 'road',
+}
+
+# Sources per Dijkstra call; bounds memory at DIJKSTRA_CHUNK x node count floats
+DIJKSTRA_CHUNK = 64
+
+# Used when two stops are not connected in the graph
+UNREACHABLE_DETOUR_FACTOR = 1.4
+
+GRAPH_CACHE_SUFFIX = '.graph.npz'
+GRAPH_CACHE_VERSION = 1
+
+
+def _parse_osm(path: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Stream an .osm XML file into node coordinates and directed edges.
+
+    Returns:
+        Tuple of (node lats, node lngs, edge sources, edge targets) with
+        edges as indices into the node arrays
+    """
+    coords: Dict[int, Tuple[float, float]] = {}
+    ways: List[Tuple[List[int], int]] = []  # (node refs, direction: 1, -1 or 0 for both)
+
+    for _, elem in ET.iterparse(path, events=('end',)):
+        if elem.tag == 'node':
+            coords[int(elem.get('id'))] = (float(elem.get('lat')), float(elem.get('lon')))
+            elem.clear()
+        elif elem.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+            if tags.get('highway') in ROUTABLE_HIGHWAYS and tags.get('access') not in ('no', 'private'):
+                oneway = tags.get('oneway')
+                if oneway in ('yes', 'true', '1') or tags.get('junction') == 'roundabout':
+                    direction = 1
+                elif oneway == '-1':
+                    direction = -1
+                else:
+                    direction = 0
+                ways.append(([int(nd.get('ref')) for nd in elem.iter('nd')], direction))
+            elem.clear()
+
+    index: Dict[int, int] = {}
+    sources, targets = [], []
+    for refs, direction in ways:
+        refs = [ref for ref in refs if ref in coords]
+        ids = [index.setdefault(ref, len(index)) for ref in refs]
+        for u, v in zip(ids[:-1], ids[1:]):
+            if direction >= 0:
+                sources.append(u)
+                targets.append(v)
+            if direction <= 0:
+                sources.append(v)
+                targets.append(u)
+
+    lats = np.empty(len(index))
+    lngs = np.empty(len(index))
+    for ref, i in index.items():
+        lats[i], lngs[i] = coords[ref]
+    return lats, lngs, np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+
+
+class RoadGraph:
+    """Directed road graph with edge lengths in km."""
+
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, sources: np.ndarray, targets: np.ndarray):
+        self.lats = np.asarray(lats, dtype=float)
+        self.lngs = np.asarray(lngs, dtype=float)
+        self.sources = np.asarray(sources, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+
+        lengths = _edge_lengths(self.lats, self.lngs, self.sources, self.targets)
+        n = len(self.lats)
+        # Duplicate edges keep the shortest length
+        order = np.lexsort((lengths, self.targets, self.sources))
+        pairs = np.stack((self.sources[order], self.targets[order]), axis=1)
+        keep = np.ones(len(order), dtype=bool)
+        keep[1:] = np.any(pairs[1:] != pairs[:-1], axis=1)
+        self.csgraph = csr_matrix(
+            (lengths[order][keep], (pairs[keep, 0], pairs[keep, 1])), shape=(n, n)
+        )
+
+        # Snap only to the largest strongly connected component
+        _, labels = connected_components(self.csgraph, directed=True, connection='strong')
+        main = np.argmax(np.bincount(labels)) if n else 0
+        self.snap_nodes = np.flatnonzero(labels == main)
+        self._scale = float(np.cos(np.radians(np.mean(self.lats)))) if n else 1.0
+        self.tree = cKDTree(self._project(self.lats[self.snap_nodes], self.lngs[self.snap_nodes]))
+
+    @property
+    def node_count(self) -> int:
+        return len(self.lats)
+
+    def _project(self, lats, lngs) -> np.ndarray:
+        """Equirectangular projection; good enough for nearest-node search on an island."""
+        return np.column_stack((np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float) * self._scale))
+
+    def snap(self, lats, lngs) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest routable node for every point.
+
+        Returns:
+            Tuple of (node indices, off-road distance to the node in km)
+        """
+        _, nearest = self.tree.query(self._project(lats, lngs))
+        nodes = self.snap_nodes[np.atleast_1d(nearest)]
+        off_road = _pairwise_km(np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float), self.lats[nodes], self.lngs[nodes])
+        return nodes, off_road
+
+    def shortest_paths(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Road distances (km) from every source node to every target node."""
+        unique_sources, source_rows = np.unique(sources, return_inverse=True)
+        result = np.empty((len(unique_sources), len(targets)))
+        for start in range(0, len(unique_sources), DIJKSTRA_CHUNK):
+            chunk = unique_sources[start:start + DIJKSTRA_CHUNK]
+            distances = dijkstra(self.csgraph, directed=True, indices=chunk)
+            result[start:start + len(chunk)] = distances[:, targets]
+        return result[source_rows]
+
+    def paths(self, sources: np.ndarray, targets: np.ndarray) -> List[Optional[np.ndarray]]:
+        """
+        Node sequence of the shortest path for every (source, target) pair.
+
+        Returns:
+            One array of node indices per pair, None where unreachable
+        """
+        unique_sources, source_rows = np.unique(sources, return_inverse=True)
+        result: List[Optional[np.ndarray]] = [None] * len(sources)
+        for start in range(0, len(unique_sources), DIJKSTRA_CHUNK):
+            chunk = unique_sources[start:start + DIJKSTRA_CHUNK]
+            _, predecessors = dijkstra(self.csgraph, directed=True, indices=chunk, return_predecessors=True)
+            for pair in np.flatnonzero((source_rows >= start) & (source_rows < start + len(chunk))):
+                result[pair] = _walk_back(predecessors[source_rows[pair] - start], sources[pair], targets[pair])
+        return result
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path, version=GRAPH_CACHE_VERSION,
+            lats=self.lats, lngs=self.lngs, sources=self.sources, targets=self.targets
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'RoadGraph':
+        with np.load(path) as data:
+            if int(data['version']) != GRAPH_CACHE_VERSION:
+                raise ValueError(f"Outdated road graph cache: {path}")
+            return cls(data['lats'], data['lngs'], data['sources'], data['targets'])
+
+    @classmethod
+    def from_file(cls, path: str, cache_path: Optional[str] = None) -> 'RoadGraph':
+        """
+        Load a graph from an .osm extract (cached as .graph.npz) or from a
+        previously saved .npz file.
+        """
+        if path.endswith('.npz'):
+            return cls.load(path)
+
+        cache_path = cache_path or path + GRAPH_CACHE_SUFFIX
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            try:
+                return cls.load(cache_path)
+            except (OSError, ValueError, KeyError):
+                pass  # stale or corrupt cache: rebuild
+
+        graph = cls(*_parse_osm(path))
+        try:
+            graph.save(cache_path)
+        except OSError:
+            pass  # read-only location: keep working without the cache
+        return graph
+
+
+def _walk_back(predecessors: np.ndarray, source: int, target: int) -> Optional[np.ndarray]:
+    path = [target]
+    node = target
+    while node != source:
+        node = predecessors[node]
+        if node < 0:
+            return None
+        path.append(node)
+    return np.asarray(path[::-1])
+
+
+def _pairwise_km(lats1, lngs1, lats2, lngs2) -> np.ndarray:
+    """Element-wise haversine distance between two arrays of points."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lats1, lngs1, lats2, lngs2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def _edge_lengths(lats, lngs, sources, targets) -> np.ndarray:
+    # Zero-length edges would be dropped by the sparse matrix
+    return np.maximum(_pairwise_km(lats[sources], lngs[sources], lats[targets], lngs[targets]), 1e-6)
+
+
+class RoadNetworkDistanceProvider:
+    """
+    Distance provider (see route_optimizer.HaversineDistanceProvider) using
+    shortest road paths. Off-road legs to the snapped nodes are added at
+    both ends; unreachable pairs fall back to a detoured straight line.
+    """
+    source = 'road'
+
+    def __init__(self, graph: RoadGraph):
+        self.graph = graph
+        self.fallback = HaversineDistanceProvider()
+
+    def matrix(self, lats, lngs, to_lats=None, to_lngs=None) -> np.ndarray:
+        if to_lats is None:
+            to_lats, to_lngs = lats, lngs
+        straight = self.fallback.matrix(lats, lngs, to_lats, to_lngs)
+        if not len(lats) or not len(to_lats):
+            return straight
+
+        from_nodes, from_off = self.graph.snap(lats, lngs)
+        to_nodes, to_off = self.graph.snap(to_lats, to_lngs)
+        road = self.graph.shortest_paths(from_nodes, to_nodes)
+        distances = from_off[:, None] + road + to_off[None, :]
+
+        # Points snapped to the same node: the road detour is meaningless
+        same_node = from_nodes[:, None] == to_nodes[None, :]
+        distances = np.where(same_node, straight, distances)
+        distances = np.where(np.isfinite(distances), distances, straight * UNREACHABLE_DETOUR_FACTOR)
+        # Never shorter than the straight line
+        return np.maximum(distances, straight)
+
+    def geometry(self, lats, lngs) -> List[Tuple[float, float]]:
+        """
+        Road path through the points in order: each stop, the road nodes
+        between consecutive stops, the next stop. Legs without a road path
+        are drawn straight.
+        """
+        nodes, _ = self.graph.snap(lats, lngs)
+        legs = self.graph.paths(nodes[:-1], nodes[1:])
+        points = [(float(lats[0]), float(lngs[0]))]
+        for i, leg in enumerate(legs):
+            if leg is not None and len(leg) > 1:
+                points.extend(zip(self.graph.lats[leg].tolist(), self.graph.lngs[leg].tolist()))
+            points.append((float(lats[i + 1]), float(lngs[i + 1])))
+        return points
@@ -0,0 +1,176 @@
+"""
+Benchmark suite for the route optimizer.
+
+Generates reproducible synthetic delivery days clustered around the KKTC
+district centres and runs every solver on them, recording tour length,
+runtime and peak memory. Used by `manage.py benchmark_routes`.
+"""
+import math
+import random
+import time
+import tracemalloc
+from typing import Dict, List, Optional
+
+from products.management.commands.seed_kktc_locations import KKTC_LOCATIONS
+from products.services.route_optimizer import RouteOptimizer
+
+DEFAULT_SIZES = (10, 50, 100, 200, 500, 1000)
+
+# Spread of stops around a district centre (degrees, ~3 km)
+CLUSTER_SPREAD = 0.03
+# Share of deliveries per district, roughly by population
+DISTRICT_WEIGHTS = {
+    'Lefkoşa': 0.35, 'Girne': 0.2, 'Gazimağusa': 0.2,
+    'Güzelyurt': 0.1, 'İskele': 0.1, 'Lefke': 0.05,
+}
+VEHICLE_CAPACITY = 40
+
+# Instance variant -> algorithms run on it
+VARIANTS = {
+    'plain': ('nearest_neighbor', 'two_opt', 'or_opt'),
+    'capacity': ('cvrp',),
+    'time_windows': ('vrptw',),
+}
+
+
+def make_instance(size: int, seed: int = 0, time_windows: bool = False, capacity: bool = False) -> Dict:
+    """
+    Synthetic delivery day with `size` stops, deterministic for a seed.
+
+    Returns:
+        Dict with 'depot' (lat, lng), 'deliveries' and solver 'options'
+    """
+    rng = random.Random(f"{size}-{seed}-{time_windows}-{capacity}")
+    names = list(DISTRICT_WEIGHTS)
+    weights = [DISTRICT_WEIGHTS[name] for name in names]
+
+    deliveries = []
+    for index in range(size):
+        centre = KKTC_LOCATIONS[rng.choices(names, weights)[0]]
+        delivery = {
+            'id': index + 1,
+            'lat': rng.gauss(centre['center_lat'], CLUSTER_SPREAD),
+            'lng': rng.gauss(centre['center_lng'], CLUSTER_SPREAD),
+            'demand': rng.randint(1, 3) if capacity else 1,
+        }
+        if time_windows and rng.random() < 0.5:
+            start = rng.choice(range(9 * 60, 16 * 60, 60))
+            delivery['window_start'], delivery['window_end'] = start, start + 120
+        deliveries.append(delivery)
+
+    options = {}
+    if capacity:
+        options['vehicle_capacity'] = VEHICLE_CAPACITY
+        options['vehicle_count'] = math.ceil(sum(d['demand'] for d in deliveries) / VEHICLE_CAPACITY) + 1
+    if time_windows:
+        # A 9-hour shift serves roughly 25 stops per truck
+        options['vehicle_count'] = max(1, math.ceil(size / 25))
+
+    lefkosa = KKTC_LOCATIONS['Lefkoşa']
+    return {
+        'depot': (lefkosa['center_lat'], lefkosa['center_lng']),
+        'deliveries': deliveries,
+        'options': options,
+    }
+
+
+def _solve(instance: Dict, algorithm: str, time_limit: float, max_iterations: Optional[int]) -> Dict:
+    optimizer = RouteOptimizer(*instance['depot'])
+    # The optimizer annotates delivery dicts, so every run gets fresh copies
+    deliveries = [dict(d) for d in instance['deliveries']]
+    return optimizer.optimize(
+        deliveries, algorithm, time_limit=time_limit, max_iterations=max_iterations, **instance['options']
+    )
+
+
+def run_case(
+    instance: Dict,
+    algorithm: str,
+    time_limit: float,
+    max_iterations: Optional[int] = None,
+    measure_memory: bool = True
+) -> Dict:
+    """Solve one instance and return its metrics (memory is measured in a separate run)."""
+    started = time.perf_counter()
+    result = _solve(instance, algorithm, time_limit, max_iterations)
+    runtime_ms = (time.perf_counter() - started) * 1000
+
+    peak_kb = None
+    if measure_memory:
+        tracemalloc.start()
+        try:
+            _solve(instance, algorithm, time_limit, max_iterations)
+            peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+
+    routes = result.get('routes', [result])
+    served = sum(len(route['optimized_deliveries']) for route in routes)
+    return {
+        'km': result['total_km'],
+        'runtime_ms': round(runtime_ms, 1),
+        'peak_kb': round(peak_kb, 1) if peak_kb is not None else None,
+        'served': served,
+        'unserved': len(instance['deliveries']) - served,
+        'vehicles': len(routes),
+        'iterations': result['iterations'],
+    }
+
+
+def run_benchmark(
+    sizes=DEFAULT_SIZES,
+    variants=tuple(VARIANTS),
+    seed: int = 0,
+    time_limit: float = 10.0,
+    max_iterations: Optional[int] = None,
+    measure_memory: bool = True
+) -> List[Dict]:
+    """
+    Run every algorithm of every variant on every instance size.
+
+    Returns:
+        One row per (size, variant, algorithm)
+    """
+    rows = []
+    for size in sizes:
+        for variant in variants:
+            instance = make_instance(
+                size, seed,
+                time_windows=variant == 'time_windows',
+                capacity=variant == 'capacity'
+            )
+            for algorithm in VARIANTS[variant]:
+                row = {'size': size, 'variant': variant, 'algorithm': algorithm}
+                row.update(run_case(instance, algorithm, time_limit, max_iterations, measure_memory))
+                rows.append(row)
+    return rows
+
+
+def compare_to_baseline(
+    rows: List[Dict],
+    baseline: List[Dict],
+    max_km_increase_pct: float = 1.0,
+    max_slowdown: float = 1.5
+) -> List[str]:
+    """
+    Regressions of `rows` against a previous run.
+
+    Returns:
+        Human-readable descriptions, empty if nothing regressed
+    """
+    key = lambda row: (row['size'], row['variant'], row['algorithm'])
+    previous = {key(row): row for row in baseline}
+    problems = []
+    for row in rows:
+        old = previous.get(key(row))
+        if old is None:
+            continue
+        label = f"{row['algorithm']} n={row['size']} ({row['variant']})"
+        if row['unserved'] > old['unserved']:
+            problems.append(f"{label}: unserved {old['unserved']} -> {row['unserved']}")
+        if old['km'] and row['km'] > old['km'] * (1 + max_km_increase_pct / 100):
+            problems.append(f"{label}: km {old['km']} -> {row['km']}")
+        # Ignore noise on runs that are fast anyway
+        if old['runtime_ms'] >= 50 and row['runtime_ms'] > old['runtime_ms'] * max_slowdown:
+            problems.append(f"{label}: runtime {old['runtime_ms']} ms -> {row['runtime_ms']} ms")
+    return problems
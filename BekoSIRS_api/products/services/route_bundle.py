@@ -0,0 +1,156 @@
+"""
+Compact, versioned route bundle for drivers.
+
+A route's `version` grows every time the route or one of its stops changes,
+and each stop remembers the version it last changed in. The bundle of a
+route is built from one stop query (joined with delivery, customer and
+product); with `since_version` only the stops changed after that version
+are sent, plus the current stop order so the app can drop removed stops.
+The polyline is only sent when it changed (`geometry_version`).
+
+Writers call bump_versions() once per change, after which the stops they
+write carry the returned version.
+"""
+from typing import Dict, Iterable, Optional
+
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import DeliveryRoute, DeliveryRouteStop
+from products.services.route_optimizer import format_minutes
+
+# ids per IN-clause (see route_persistence)
+BATCH_SIZE = 500
+
+STOP_FIELDS = (
+    'delivery_id', 'stop_order', 'version', 'estimated_arrival', 'distance_from_previous_km',
+    'delivery__status', 'delivery__address_snapshot', 'delivery__address', 'delivery__customer_phone_snapshot',
+    'delivery__address_lat', 'delivery__address_lng', 'delivery__time_window_start', 'delivery__time_window_end',
+    'delivery__assignment__quantity', 'delivery__assignment__product__name',
+    'delivery__assignment__customer__first_name', 'delivery__assignment__customer__last_name',
+    'delivery__assignment__customer__phone_number', 'delivery__assignment__customer__address_lat',
+    'delivery__assignment__customer__address_lng',
+)
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bump_versions(route_ids: Iterable[int], geometry: bool = False) -> Dict[int, int]:
+    """
+    Increment the version of the given routes (and their geometry version).
+
+    Returns:
+        New version per route id
+    """
+    route_ids = list(route_ids)
+    changes = {'version': F('version') + 1}
+    if geometry:
+        changes['geometry_version'] = F('version') + 1
+    versions = {}
+    for chunk in _chunks(route_ids):
+        DeliveryRoute.objects.filter(id__in=chunk).update(**changes)
+        versions.update(DeliveryRoute.objects.filter(id__in=chunk).values_list('id', 'version'))
+    return versions
+
+
+def mark_stops_changed(delivery_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Bump the routes of the given deliveries and stamp their stops with the
+    new version (e.g. after a status change). Unrouted deliveries are ignored.
+
+    Returns:
+        New version per affected route id
+    """
+    stops = []
+    for chunk in _chunks(list(delivery_ids)):
+        stops.extend(DeliveryRouteStop.objects.filter(delivery_id__in=chunk).values_list('id', 'route_id'))
+    versions = bump_versions({route_id for _, route_id in stops})
+    by_route: Dict[int, list] = {}
+    for stop_id, route_id in stops:
+        by_route.setdefault(route_id, []).append(stop_id)
+    for route_id, stop_ids in by_route.items():
+        for chunk in _chunks(stop_ids):
+            DeliveryRouteStop.objects.filter(id__in=chunk).update(version=versions[route_id])
+    return versions
+
+
+def _stop_payload(row: Dict) -> Dict:
+    lat = row['delivery__assignment__customer__address_lat']
+    lng = row['delivery__assignment__customer__address_lng']
+    if lat is None or lng is None:
+        lat, lng = row['delivery__address_lat'], row['delivery__address_lng']
+    name = ' '.join(
+        part for part in (
+            row['delivery__assignment__customer__first_name'], row['delivery__assignment__customer__last_name']
+        ) if part
+    )
+    window_start, window_end = row['delivery__time_window_start'], row['delivery__time_window_end']
+    arrival = timezone.localtime(row['estimated_arrival']) if row['estimated_arrival'] else None
+    return {
+        'id': row['delivery_id'],
+        'seq': row['stop_order'],
+        'status': row['delivery__status'],
+        'name': name,
+        'phone': row['delivery__customer_phone_snapshot'] or row['delivery__assignment__customer__phone_number'],
+        'address': row['delivery__address_snapshot'] or row['delivery__address'],
+        'lat': float(lat) if lat is not None else None,
+        'lng': float(lng) if lng is not None else None,
+        'product': row['delivery__assignment__product__name'],
+        'qty': row['delivery__assignment__quantity'],
+        'window': (
+            f"{window_start:%H:%M}-{window_end:%H:%M}" if window_start and window_end else None
+        ),
+        'eta': format_minutes(arrival.hour * 60 + arrival.minute) if arrival else None,
+        'km': float(row['distance_from_previous_km']) if row['distance_from_previous_km'] is not None else None,
+    }
+
+
+def _depot_payload(route: DeliveryRoute) -> Dict:
+    """Start point of the route: store coordinates, else the depot's, else null."""
+    lat, lng = route.store_lat, route.store_lng
+    if (lat is None or lng is None) and route.depot_id:
+        lat, lng = route.depot.latitude, route.depot.longitude
+    return {
+        'name': route.store_address,
+        'lat': float(lat) if lat is not None else None,
+        'lng': float(lng) if lng is not None else None,
+    }
+
+
+def route_bundle(route: DeliveryRoute, since_version: Optional[int] = None) -> Dict:
+    """
+    Driver payload for a route.
+
+    Args:
+        route: Saved route
+        since_version: Version the app already has; None for the full bundle
+
+    Returns:
+        Dict with route header, stops (all, or changed since since_version),
+        'order' (delivery ids in stop order) and the polyline when it changed
+    """
+    full = since_version is None or since_version <= 0
+    bundle = {
+        'route_id': route.id,
+        'version': route.version,
+        'since_version': None if full else since_version,
+        'date': route.date,
+        'depot': _depot_payload(route),
+        'planned_departure': route.planned_departure,
+        'total_km': float(route.total_distance_km) if route.total_distance_km is not None else None,
+        'total_min': route.total_duration_min,
+    }
+    if not full and since_version >= route.version:
+        bundle.update(changed=False, stops=[])
+        return bundle
+
+    rows = DeliveryRouteStop.objects.filter(route=route).order_by('stop_order').values(*STOP_FIELDS)
+    bundle['changed'] = True
+    bundle['order'] = [row['delivery_id'] for row in rows]
+    bundle['stops'] = [_stop_payload(row) for row in rows if full or row['version'] > since_version]
+    if full or route.geometry_version > since_version:
+        bundle['polyline'] = route.route_polyline or ''
+    return bundle
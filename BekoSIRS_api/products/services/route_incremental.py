@@ -0,0 +1,250 @@
+"""
+Incremental changes to a saved delivery route.
+
+Adding or cancelling one delivery mid-day does not re-run the optimizer for
+the whole day: the new stop is placed by cheapest insertion into the
+route's existing tour (or the cancelled one is spliced out), followed by a
+bounded local repair around the changed position
+(route_optimizer.insert_stop / remove_stop). Stops already delivered or
+failed stay fixed. Only rows whose order, leg distance or ETA changed are
+written; the route's total distance and polyline are refreshed.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from products.models import Delivery, DeliveryRoute, DeliveryRouteStop
+from products.services.route_bundle import bump_versions
+from products.services.distance_cache import get_distance_provider
+from products.services.polyline import route_polyline
+from products.services.route_optimizer import SearchBudget, insert_stop, path_length, remove_stop
+from products.services.route_persistence import BATCH_SIZE, _chunks
+from products.services.route_schedule import reschedule_from
+
+# Local repair must keep a dispatcher request well under 100 ms
+REPAIR_TIME_LIMIT_SECONDS = 0.03
+
+# Stops of these deliveries are behind the truck and never move
+DONE_STATUSES = ('DELIVERED', 'FAILED')
+
+# Temporary stop_order shift so renumbering never hits the (route, stop_order) unique constraint
+ORDER_OFFSET = 100000
+
+
+class RouteChangeError(Exception):
+    """Raised when a stop cannot be inserted into / removed from a route."""
+
+
+def delivery_coordinates(delivery: Delivery) -> Optional[Tuple[float, float]]:
+    """Stop coordinates, customer address first (as in route optimization)."""
+    customer = delivery.assignment.customer if delivery.assignment else None
+    lat, lng = (customer.address_lat, customer.address_lng) if customer else (None, None)
+    if lat is None or lng is None:
+        lat, lng = delivery.address_lat, delivery.address_lng
+    if lat is None or lng is None:
+        return None
+    return float(lat), float(lng)
+
+
+def _load_stops(route: DeliveryRoute) -> List[DeliveryRouteStop]:
+    return list(
+        DeliveryRouteStop.objects.filter(route=route)
+        .select_related('delivery__assignment__customer')
+        .order_by('stop_order')
+    )
+
+
+def _matrix(route: DeliveryRoute, deliveries: List[Delivery], provider) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distance matrix with the route's depot at index 0 and deliveries at 1..n.
+
+    Returns:
+        Tuple of (matrix, (n + 1, 2) array of lat/lng per node)
+    """
+    points = [(float(route.store_lat), float(route.store_lng))]
+    for delivery in deliveries:
+        coords = delivery_coordinates(delivery)
+        if coords is None:
+            raise RouteChangeError(f'Teslimat #{delivery.id} için koordinat yok')
+        points.append(coords)
+    points = np.array(points)
+    return provider.matrix(points[:, 0], points[:, 1]), points
+
+
+def _first_free_position(stops: List[DeliveryRouteStop]) -> int:
+    """Lowest tour position that may change (after the last completed stop)."""
+    done = [index for index, stop in enumerate(stops, start=1) if stop.delivery.status in DONE_STATUSES]
+    return (done[-1] + 1) if done else 1
+
+
+def _apply_tour(
+    route: DeliveryRoute,
+    stops: List[DeliveryRouteStop],
+    tour: List[int],
+    matrix: np.ndarray,
+    points: np.ndarray,
+    provider,
+    new_stop: Optional[DeliveryRouteStop] = None
+) -> Tuple[int, List[int]]:
+    """
+    Write the changed stop orders / leg distances of a new tour.
+
+    Args:
+        stops: Existing stops; stops[i - 1] is tour node i
+        points: Coordinates per tour node (see _matrix)
+        provider: Distance provider, for the route geometry
+        new_stop: Unsaved stop for the node after the existing ones
+
+    Returns:
+        Tuple of (first changed position, ids of the updated deliveries)
+    """
+    nodes = {index: stop for index, stop in enumerate(stops, start=1)}
+    if new_stop is not None:
+        nodes[len(stops) + 1] = new_stop
+
+    changed = []
+    first_changed = len(tour)
+    now = timezone.now()
+    for position, (previous, node) in enumerate(zip(tour[:-1], tour[1:]), start=1):
+        stop = nodes[node]
+        distance = round(float(matrix[previous, node]), 2)
+        if stop is new_stop or stop.stop_order != position or float(stop.distance_from_previous_km or 0) != distance:
+            stop.stop_order = position
+            stop.distance_from_previous_km = distance
+            stop.delivery.delivery_order = position
+            stop.delivery.distance_km = distance
+            stop.delivery.updated_at = now
+            changed.append(stop)
+            first_changed = min(first_changed, position)
+
+    route.version = route.geometry_version = bump_versions([route.pk], geometry=True)[route.pk]
+    for stop in changed:
+        stop.version = route.version
+
+    existing = [stop for stop in changed if stop is not new_stop]
+    for chunk in _chunks([stop.pk for stop in existing]):
+        DeliveryRouteStop.objects.filter(pk__in=chunk).update(stop_order=F('stop_order') + ORDER_OFFSET)
+    DeliveryRouteStop.objects.bulk_update(
+        existing, ['stop_order', 'distance_from_previous_km', 'version'], batch_size=BATCH_SIZE
+    )
+    if new_stop is not None:
+        new_stop.save()
+
+    deliveries = [stop.delivery for stop in changed]
+    Delivery.objects.bulk_update(
+        deliveries, ['delivery_order', 'distance_km', 'route_batch_id', 'depot', 'updated_at'], batch_size=BATCH_SIZE
+    )
+
+    route.total_distance_km = round(path_length(matrix, tour), 2)
+    route.route_polyline = route_polyline(provider, points[tour, 0], points[tour, 1])
+    DeliveryRoute.objects.filter(pk=route.pk).update(
+        total_distance_km=route.total_distance_km, route_polyline=route.route_polyline
+    )
+    return first_changed, [delivery.id for delivery in deliveries]
+
+
+def _result(route: DeliveryRoute, started: float, first_changed: int, updated_ids: List[int], **extra) -> Dict:
+    stops = reschedule_from(route, first_changed)
+    updated = set(updated_ids) | {stop.delivery_id for stop in stops}
+    return {
+        'route_id': route.id,
+        'total_distance_km': float(route.total_distance_km),
+        'total_duration_min': route.total_duration_min,
+        'updated_delivery_ids': sorted(updated),
+        'elapsed_ms': int((time.perf_counter() - started) * 1000),
+        **extra,
+    }
+
+
+def insert_delivery(route: DeliveryRoute, delivery: Delivery) -> Dict:
+    """
+    Add a delivery to a saved route at its cheapest position. An unscheduled
+    delivery is scheduled for the route's date.
+
+    Raises:
+        RouteChangeError: Delivery is not waiting, scheduled for another day,
+            already routed or has no coordinates
+    """
+    started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            return _insert_delivery(route, delivery, started)
+    except IntegrityError:
+        # a concurrent insert of the same delivery won the one-stop-per-delivery constraint
+        raise RouteChangeError('Teslimat zaten bir rotada')
+
+
+def _insert_delivery(route: DeliveryRoute, delivery: Delivery, started: float) -> Dict:
+    # Lock the delivery and check its current state, so concurrent changes are serialized
+    current = Delivery.objects.select_for_update().filter(pk=delivery.pk).values('status', 'scheduled_date').first()
+    if current is None or current['status'] != 'WAITING':
+        raise RouteChangeError('Sadece bekleyen teslimatlar rotaya eklenebilir')
+    if current['scheduled_date'] is not None and current['scheduled_date'] != route.date:
+        raise RouteChangeError(f"Teslimat {current['scheduled_date']} tarihine planlı, rota tarihi {route.date}")
+    if DeliveryRouteStop.objects.filter(delivery=delivery).exists():
+        raise RouteChangeError('Teslimat zaten bir rotada')
+    if current['scheduled_date'] is None:
+        Delivery.objects.filter(pk=delivery.pk).update(scheduled_date=route.date)
+    delivery.scheduled_date = route.date
+
+    stops = _load_stops(route)
+    provider = get_distance_provider()
+    matrix, points = _matrix(route, [stop.delivery for stop in stops] + [delivery], provider)
+    node = len(stops) + 1
+    before = path_length(matrix, list(range(node)))
+
+    tour = insert_stop(
+        matrix, list(range(node)), node,
+        SearchBudget(time_limit=REPAIR_TIME_LIMIT_SECONDS),
+        first_position=_first_free_position(stops)
+    )
+
+    delivery.route_batch_id = route.batch_id
+    delivery.depot_id = route.depot_id
+    new_stop = DeliveryRouteStop(route=route, delivery=delivery)
+    first_changed, updated_ids = _apply_tour(route, stops, tour, matrix, points, provider, new_stop)
+    return _result(
+        route, started, first_changed, updated_ids,
+        stop_order=new_stop.stop_order,
+        added_km=round(path_length(matrix, tour) - before, 2),
+    )
+
+
+def remove_delivery(route: DeliveryRoute, delivery: Delivery) -> Dict:
+    """
+    Take a delivery off a saved route and close the gap.
+
+    Raises:
+        RouteChangeError: Delivery is not on the route or already completed
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        stops = _load_stops(route)
+        position = next((i for i, stop in enumerate(stops, start=1) if stop.delivery_id == delivery.id), None)
+        if position is None:
+            raise RouteChangeError('Teslimat bu rotada değil')
+        if stops[position - 1].delivery.status in DONE_STATUSES:
+            raise RouteChangeError('Tamamlanmış teslimat rotadan çıkarılamaz')
+
+        provider = get_distance_provider()
+        matrix, points = _matrix(route, [stop.delivery for stop in stops], provider)
+        before = path_length(matrix, list(range(len(stops) + 1)))
+        tour = remove_stop(
+            matrix, list(range(len(stops) + 1)), position,
+            SearchBudget(time_limit=REPAIR_TIME_LIMIT_SECONDS),
+            first_position=_first_free_position(stops)
+        )
+
+        stops[position - 1].delete()
+        Delivery.objects.filter(pk=delivery.pk).update(
+            route_batch_id=None, delivery_order=0, distance_km=None, eta_minutes=None, updated_at=timezone.now()
+        )
+        first_changed, updated_ids = _apply_tour(route, stops, tour, matrix, points, provider)
+        return _result(
+            route, started, min(first_changed, position), updated_ids + [delivery.id],
+            removed_km=round(before - path_length(matrix, tour), 2),
+        )
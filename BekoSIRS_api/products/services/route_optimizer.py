@@ -4,13 +4,79 @@ Route Optimization Service for Delivery Management.
 Implements:
 - Haversine distance calculation (great-circle distance)
 - Nearest Neighbor algorithm for TSP (Traveling Salesman Problem)
+- 2-opt and Or-opt local search over a precomputed distance matrix
+- Capacitated multi-vehicle routing (Clarke-Wright savings + local search)
+- Time-window-aware routing (VRPTW) with O(1) insertion feasibility checks
+- Multi-depot assignment with parallel per-depot optimization
+- Anytime multi-start search: randomized starts improved in parallel
+  worker processes that share the distance matrix
+- What-if comparison of several solver configurations on one matrix
 - Route optimization for delivery scheduling
+
+Routes are open paths: they start at the depot and end at the last stop.
+Tours are lists of matrix indices where 0 is the depot and i (1..n) is the
+i-th delivery of the input list.
+
+This module intentionally has no Django imports so that it can be used from
+worker processes and scripts without loading the project settings.
 """
+import itertools
 import math
+import os
+import time
 import uuid
-from typing import List, Dict, Tuple, Optional
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from multiprocessing import shared_memory
+from typing import Callable, List, Dict, Tuple, Optional
 from datetime import datetime, timedelta
 
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0
+
+# Local search defaults (kept small enough for a synchronous HTTP request)
+DEFAULT_TIME_LIMIT_SECONDS = 5.0
+DEFAULT_MAX_ITERATIONS = 10000
+
+# Largest time_limit accepted for a synchronous request (gunicorn timeout is 30 s)
+MAX_SYNC_TIME_LIMIT_SECONDS = 20.0
+# ... and for a background job (async=true)
+MAX_JOB_TIME_LIMIT_SECONDS = 600.0
+
+# Moves must improve the route by more than this to be applied (km)
+IMPROVEMENT_EPSILON = 1e-9
+
+# Savings candidates per stop when building multi-vehicle routes
+SAVINGS_NEIGHBORS = 40
+
+# Travel time model (shared with calculate_eta)
+DEFAULT_AVG_SPEED_KMH = 40.0
+DEFAULT_SERVICE_TIME_MINUTES = 10
+DEFAULT_DEPARTURE_MINUTES = 9 * 60  # 09:00
+
+# 'balanced' depot assignment lets a depot take this much more than its even share
+DEPOT_BALANCE_SLACK = 1.2
+
+# Minimum seconds between SearchBudget progress callbacks
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+# Coordinates are rounded to this many decimals (~1 m) when used as keys
+COORDINATE_PRECISION = 5
+
+# Fixed-point passes when travel speed depends on the time of day
+SCHEDULE_REFINEMENTS = 4
+
+# Stops on each side of a change that incremental repair may reorder
+REPAIR_RADIUS = 6
+
+# Multi-start: each construction step picks among this many nearest unvisited stops
+MULTI_START_CANDIDATES = 3
+
+# Default process pool size (multi_start, multi-depot, scenarios). These run
+# inside web requests: a pool per request must not claim every core.
+DEFAULT_POOL_WORKERS = min(4, os.cpu_count() or 1)
+
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
@@ -44,22 +110,1124 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return round(distance, 2)
 
 
+def haversine_matrix(
+    lats: np.ndarray,
+    lngs: np.ndarray,
+    to_lats: Optional[np.ndarray] = None,
+    to_lngs: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Vectorized pairwise great-circle distances.
+
+    Args:
+        lats, lngs: Origin coordinates (degrees)
+        to_lats, to_lngs: Destination coordinates (degrees), defaults to the origins
+
+    Returns:
+        (len(lats), len(to_lats)) matrix of distances in kilometers (unrounded)
+    """
+    lat1 = np.radians(np.asarray(lats, dtype=float))[:, None]
+    lng1 = np.radians(np.asarray(lngs, dtype=float))[:, None]
+    if to_lats is None:
+        lat2, lng2 = lat1.T, lng1.T
+    else:
+        lat2 = np.radians(np.asarray(to_lats, dtype=float))[None, :]
+        lng2 = np.radians(np.asarray(to_lngs, dtype=float))[None, :]
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def coordinate_key(lat: float, lng: float) -> str:
+    """Stable key for a coordinate pair, rounded to COORDINATE_PRECISION."""
+    return f"{lat:.{COORDINATE_PRECISION}f},{lng:.{COORDINATE_PRECISION}f}"
+
+
+class HaversineDistanceProvider:
+    """
+    Straight-line distances. Distance providers expose
+    matrix(lats, lngs, to_lats=None, to_lngs=None) with the same contract
+    as haversine_matrix, plus a `source` name used for caching.
+    """
+    source = 'haversine'
+
+    def matrix(self, lats, lngs, to_lats=None, to_lngs=None) -> np.ndarray:
+        return haversine_matrix(lats, lngs, to_lats, to_lngs)
+
+
+class MatrixDistanceProvider:
+    """
+    Serves sub-matrices of a precomputed matrix, looked up by coordinate.
+    Used to hand one shared matrix to worker processes.
+    """
+
+    def __init__(self, lats, lngs, matrix: np.ndarray, source: str = 'precomputed'):
+        self.index = {coordinate_key(lat, lng): i for i, (lat, lng) in enumerate(zip(lats, lngs))}
+        self.full_matrix = matrix
+        self.source = source
+
+    def _indices(self, lats, lngs) -> np.ndarray:
+        return np.array([self.index[coordinate_key(lat, lng)] for lat, lng in zip(lats, lngs)], dtype=int)
+
+    def matrix(self, lats, lngs, to_lats=None, to_lngs=None) -> np.ndarray:
+        rows = self._indices(lats, lngs)
+        cols = rows if to_lats is None else self._indices(to_lats, to_lngs)
+        return self.full_matrix[np.ix_(rows, cols)]
+
+
+class SearchBudget:
+    """
+    Wall-clock time limit and iteration cap for local search.
+
+    One iteration is one applied improving move. Solvers report their
+    incumbent through report(); an optional on_progress(budget) callback is
+    invoked at most every `progress_interval` seconds and may call cancel()
+    to stop the search cooperatively (the incumbent is still returned).
+    """
+
+    def __init__(
+        self,
+        time_limit: Optional[float] = None,
+        max_iterations: Optional[int] = None,
+        on_progress: Optional[Callable[['SearchBudget'], None]] = None,
+        progress_interval: float = PROGRESS_INTERVAL_SECONDS
+    ):
+        self.started = time.monotonic()
+        self.time_limit = time_limit
+        self.deadline = self.started + time_limit if time_limit else None
+        self.max_iterations = max_iterations
+        self.iterations = 0
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self.last_progress = self.started
+        self.cancelled = False
+        self.best_objective: Optional[float] = None
+        self.incumbent = None
+        self.fraction: Optional[float] = None
+
+    def exhausted(self) -> bool:
+        if self.cancelled:
+            return True
+        if self.max_iterations is not None and self.iterations >= self.max_iterations:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def tick(self):
+        self.iterations += 1
+        if self.on_progress is not None:
+            self._notify()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, objective: float, solution=None, fraction: Optional[float] = None, force: bool = False):
+        """
+        Record the solver's incumbent (the best solution it holds; for
+        time windows a later incumbent may be longer but serve more stops).
+
+        Args:
+            objective: Objective value of `solution` (km)
+            solution: Tour or list of routes (matrix indices)
+            fraction: Explicit progress in [0, 1] (derived from the budget if omitted)
+            force: Invoke on_progress regardless of the interval
+        """
+        self.best_objective = float(objective)
+        self.incumbent = solution
+        if fraction is not None:
+            self.fraction = fraction
+        if self.on_progress is not None:
+            self._notify(force)
+
+    def _notify(self, force: bool = False):
+        now = time.monotonic()
+        if force or now - self.last_progress >= self.progress_interval:
+            self.last_progress = now
+            self.on_progress(self)
+
+    @property
+    def progress(self) -> float:
+        """Share of the budget used so far (0..1)."""
+        if self.fraction is not None:
+            return self.fraction
+        shares = []
+        if self.deadline is not None:
+            shares.append((time.monotonic() - self.started) / self.time_limit)
+        if self.max_iterations:
+            shares.append(self.iterations / self.max_iterations)
+        return min(max(shares), 1.0) if shares else 0.0
+
+    @property
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+
+def is_symmetric(matrix: np.ndarray) -> bool:
+    """True if travelling i -> j costs the same as j -> i (haversine)."""
+    return bool(np.allclose(matrix, matrix.T))
+
+
+def path_length(matrix: np.ndarray, tour: List[int]) -> float:
+    """Length of an open path visiting `tour` in order (km)."""
+    if len(tour) < 2:
+        return 0.0
+    idx = np.asarray(tour)
+    return float(matrix[idx[:-1], idx[1:]].sum())
+
+
+def nearest_neighbor_tour(matrix: np.ndarray, start: int = 0) -> List[int]:
+    """
+    Greedy nearest neighbor tour over a distance matrix.
+
+    Returns:
+        Tour starting at `start` and visiting every other index once
+    """
+    n = matrix.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    tour = [start]
+    current = start
+
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, matrix[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        tour.append(current)
+
+    return tour
+
+
+def _open_path_matrix(matrix: np.ndarray) -> np.ndarray:
+    """
+    Extend the matrix with a zero-cost END node (last index).
+
+    Appending END to a tour turns the open path into a fixed-endpoint path,
+    so every move can be evaluated with the same four-edge delta formula.
+    """
+    n = matrix.shape[0]
+    ext = np.zeros((n + 1, n + 1))
+    ext[:n, :n] = matrix
+    return ext
+
+
+def _direction_prefix(ext: np.ndarray, path: np.ndarray) -> np.ndarray:
+    """
+    Prefix sums of (reverse - forward) edge costs along the path, so the
+    extra cost of reversing positions i..j is prefix[j] - prefix[i].
+    """
+    forward = ext[path[:-1], path[1:]]
+    backward = ext[path[1:], path[:-1]]
+    return np.concatenate(([0.0], np.cumsum(backward - forward)))
+
+
+def _two_opt_pass(ext: np.ndarray, path: np.ndarray, budget: SearchBudget, symmetric: bool = True) -> bool:
+    """
+    One 2-opt sweep. For each segment start, the deltas of every segment end
+    are evaluated at once and the best improving reversal is applied in place.
+    On asymmetric matrices (road networks) the cost change of the reversed
+    segment's inner edges is included.
+    """
+    improved = False
+    last = len(path) - 2  # last position that may be reversed (END is fixed)
+    reversal = None if symmetric else _direction_prefix(ext, path)
+
+    for i in range(1, last):
+        if budget.exhausted():
+            break
+        a, b = path[i - 1], path[i]
+        ends = path[i + 1:last + 1]
+        nexts = path[i + 2:last + 2]
+        delta = ext[a, ends] + ext[b, nexts] - ext[a, b] - ext[ends, nexts]
+        if reversal is not None:
+            delta = delta + reversal[i + 1:last + 1] - reversal[i]
+        k = int(np.argmin(delta))
+        if delta[k] < -IMPROVEMENT_EPSILON:
+            j = i + 1 + k
+            path[i:j + 1] = path[i:j + 1][::-1]
+            budget.tick()
+            improved = True
+            if reversal is not None:
+                reversal = _direction_prefix(ext, path)
+
+    return improved
+
+
+def _or_opt_pass(ext: np.ndarray, path: np.ndarray, budget: SearchBudget, max_segment: int = 3) -> bool:
+    """
+    One Or-opt sweep: move segments of 1..max_segment stops (optionally
+    reversed) to their cheapest position elsewhere in the path.
+    """
+    improved = False
+    end = len(path) - 1  # position of END
+
+    for length in range(1, max_segment + 1):
+        i = 1
+        while i + length <= end:
+            if budget.exhausted():
+                return improved
+            seg_first, seg_last = path[i], path[i + length - 1]
+            prev, nxt = path[i - 1], path[i + length]
+            removal_gain = ext[prev, seg_first] + ext[seg_last, nxt] - ext[prev, nxt]
+
+            rest = np.concatenate((path[:i], path[i + length:]))
+            u, v = rest[:-1], rest[1:]
+            base = ext[u, v]
+            forward = ext[u, seg_first] + ext[seg_last, v] - base
+            backward = ext[u, seg_last] + ext[seg_first, v] - base
+            # Re-inserting at the original place is not a move
+            forward[i - 1] = np.inf
+            backward[i - 1] = np.inf if length == 1 else backward[i - 1]
+
+            if length > 1:
+                # Inner edges of the segment are traversed the other way round
+                seg = path[i:i + length]
+                backward += ext[seg[1:], seg[:-1]].sum() - ext[seg[:-1], seg[1:]].sum()
+
+            k_fwd, k_bwd = int(np.argmin(forward)), int(np.argmin(backward))
+            if forward[k_fwd] <= backward[k_bwd]:
+                k, cost, segment = k_fwd, forward[k_fwd], path[i:i + length]
+            else:
+                k, cost, segment = k_bwd, backward[k_bwd], path[i:i + length][::-1]
+
+            if cost - removal_gain < -IMPROVEMENT_EPSILON:
+                path[:] = np.concatenate((rest[:k + 1], segment, rest[k + 1:]))
+                budget.tick()
+                improved = True
+            else:
+                i += 1
+
+    return improved
+
+
+def two_opt(matrix: np.ndarray, tour: List[int], budget: Optional[SearchBudget] = None) -> List[int]:
+    """
+    Improve an open tour with 2-opt segment reversals until no improving
+    move is left or the budget is exhausted. The first node stays fixed.
+    """
+    return improve_tour(matrix, tour, budget, use_or_opt=False)
+
+
+def or_opt(matrix: np.ndarray, tour: List[int], budget: Optional[SearchBudget] = None) -> List[int]:
+    """
+    Improve an open tour by alternating 2-opt and Or-opt sweeps until
+    neither finds an improving move or the budget is exhausted.
+    """
+    return improve_tour(matrix, tour, budget, use_or_opt=True)
+
+
+def improve_tour(
+    matrix: np.ndarray,
+    tour: List[int],
+    budget: Optional[SearchBudget] = None,
+    use_or_opt: bool = True,
+    report: bool = True,
+    symmetric: Optional[bool] = None
+) -> List[int]:
+    """
+    Local search driver shared by the 2-opt and Or-opt algorithms.
+
+    Args:
+        matrix: Square distance matrix (km)
+        tour: Starting open tour (first node is fixed)
+        budget: Time / iteration budget, unlimited if omitted
+        use_or_opt: Also apply Or-opt segment moves
+        report: Report the tour as the budget's incumbent after every round
+        symmetric: Whether matrix[i, j] == matrix[j, i] (checked if omitted)
+
+    Returns:
+        Improved tour (never longer than the input)
+    """
+    budget = budget or SearchBudget()
+    if len(tour) < 3:
+        return list(tour)
+
+    if symmetric is None:
+        symmetric = is_symmetric(matrix)
+    ext = _open_path_matrix(matrix)
+    path = np.asarray(list(tour) + [matrix.shape[0]])
+
+    while not budget.exhausted():
+        improved = _two_opt_pass(ext, path, budget, symmetric)
+        if use_or_opt:
+            improved = _or_opt_pass(ext, path, budget) or improved
+        if report:
+            budget.report(float(ext[path[:-1], path[1:]].sum()), [int(node) for node in path[:-1]])
+        if not improved:
+            break
+
+    return [int(node) for node in path[:-1]]
+
+
+def cheapest_insertion(matrix: np.ndarray, tour: List[int], node: int, first_position: int = 1) -> Tuple[int, float]:
+    """
+    Cheapest place to insert `node` into an open tour.
+
+    Args:
+        matrix: Square distance matrix (km)
+        tour: Open tour, tour[0] is the depot
+        node: Matrix index to insert
+        first_position: Lowest allowed position (stops before it are fixed)
+
+    Returns:
+        Tuple of (position in the new tour, added km)
+    """
+    idx = np.asarray(tour)
+    before = idx[first_position - 1:]
+    after = idx[first_position:]
+    # Inserting between consecutive stops, or appending after the last one
+    costs = np.append(
+        matrix[before[:-1], node] + matrix[node, after] - matrix[before[:-1], after],
+        matrix[before[-1], node]
+    )
+    k = int(np.argmin(costs))
+    return first_position + k, float(costs[k])
+
+
+def repair_window(
+    matrix: np.ndarray,
+    tour: List[int],
+    position: int,
+    budget: Optional[SearchBudget] = None,
+    radius: int = REPAIR_RADIUS,
+    first_position: int = 1
+) -> List[int]:
+    """
+    Bounded local repair around a changed position: 2-opt and Or-opt moves
+    restricted to the stops within `radius` positions; the rest of the tour
+    (and the stops just outside the window) stays where it is.
+
+    Returns:
+        Repaired tour (never longer than the input)
+    """
+    budget = budget or SearchBudget()
+    lo = max(first_position, position - radius, 1)
+    hi = min(len(tour) - 1, position + radius)
+    if hi - lo < 1:
+        return list(tour)
+
+    # Window plus its fixed anchors; without a stop after it the path end is free
+    nodes = list(tour[lo - 1:hi + 2])
+    sub = matrix[np.ix_(nodes, nodes)]
+    closed = hi + 1 < len(tour)
+    ext = sub if closed else _open_path_matrix(sub)
+    path = np.arange(len(nodes) + (0 if closed else 1))
+    symmetric = is_symmetric(sub)
+
+    while not budget.exhausted():
+        improved = _two_opt_pass(ext, path, budget, symmetric)
+        improved = _or_opt_pass(ext, path, budget) or improved
+        if not improved:
+            break
+
+    window = [nodes[i] for i in path[:len(nodes)]]
+    return list(tour[:lo - 1]) + window + list(tour[hi + 2:])
+
+
+def insert_stop(
+    matrix: np.ndarray,
+    tour: List[int],
+    node: int,
+    budget: Optional[SearchBudget] = None,
+    first_position: int = 1
+) -> List[int]:
+    """Insert `node` at its cheapest position, then repair the tour around it."""
+    position, _ = cheapest_insertion(matrix, tour, node, first_position)
+    tour = list(tour[:position]) + [node] + list(tour[position:])
+    return repair_window(matrix, tour, position, budget, first_position=first_position)
+
+
+def remove_stop(
+    matrix: np.ndarray,
+    tour: List[int],
+    node: int,
+    budget: Optional[SearchBudget] = None,
+    first_position: int = 1
+) -> List[int]:
+    """Splice `node` out of the tour, then repair the tour around the gap."""
+    position = list(tour).index(node)
+    tour = list(tour[:position]) + list(tour[position + 1:])
+    return repair_window(matrix, tour, min(position, len(tour) - 1), budget, first_position=first_position)
+
+
+def randomized_nearest_neighbor_tour(
+    matrix: np.ndarray,
+    rng: np.random.Generator,
+    candidates: int = MULTI_START_CANDIDATES,
+    start: int = 0
+) -> List[int]:
+    """
+    Nearest neighbor tour that moves to a random one of the `candidates`
+    closest unvisited stops at each step: a different start for every
+    seed that stays close to the greedy tour.
+    """
+    n = matrix.shape[0]
+    visited = np.zeros(n, dtype=bool)
+    visited[start] = True
+    tour = [start]
+    current = start
+
+    for step in range(n - 1):
+        row = np.where(visited, np.inf, matrix[current])
+        k = min(candidates, n - 1 - step)
+        nearest = np.argpartition(row, k - 1)[:k]
+        current = int(nearest[rng.integers(k)])
+        visited[current] = True
+        tour.append(current)
+
+    return tour
+
+
+# Per-process cache of attached shared-memory matrices (name -> (segment, array))
+_SHARED_MATRICES: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _attach_matrix(name: str, shape: Tuple[int, int]) -> np.ndarray:
+    """Worker side: view of the parent's matrix, without a copy."""
+    if name not in _SHARED_MATRICES:
+        segment = shared_memory.SharedMemory(name=name)
+        _SHARED_MATRICES[name] = (segment, np.ndarray(shape, dtype=np.float64, buffer=segment.buf))
+    return _SHARED_MATRICES[name][1]
+
+
+def _search_from_start(
+    matrix: np.ndarray, seed: int, deadline: float, symmetric: bool, max_iterations: Optional[int] = None
+) -> Dict:
+    """One multi-start run: randomized construction (greedy for seed 0) + local search."""
+    if seed == 0:
+        tour = nearest_neighbor_tour(matrix)
+    else:
+        tour = randomized_nearest_neighbor_tour(matrix, np.random.default_rng(seed))
+    budget = SearchBudget(time_limit=max(deadline - time.time(), 0.001), max_iterations=max_iterations)
+    tour = improve_tour(matrix, tour, budget, report=False, symmetric=symmetric)
+    return {'seed': seed, 'tour': tour, 'km': path_length(matrix, tour), 'iterations': budget.iterations}
+
+
+def _multi_start_worker(task: Tuple[str, Tuple[int, int], int, float, bool, Optional[int]]) -> Dict:
+    """Process pool worker: one start over the shared matrix."""
+    name, shape, seed, deadline, symmetric, max_iterations = task
+    return _search_from_start(_attach_matrix(name, shape), seed, deadline, symmetric, max_iterations)
+
+
+def multi_start_search(
+    matrix: np.ndarray,
+    budget: SearchBudget,
+    workers: Optional[int] = None,
+    seed: int = 0
+) -> Tuple[List[int], Dict]:
+    """
+    Anytime search: run randomized-start local searches until the budget's
+    time limit and keep the best tour.
+
+    With more than one worker the matrix is copied into shared memory once
+    and the starts run in a process pool, so throughput grows with the
+    number of cores. A new start is submitted whenever one finishes; every
+    finished start reports to the budget, so progress callbacks and
+    cancellation work between starts (running starts stop at the deadline).
+
+    Args:
+        matrix: Square distance matrix (km)
+        budget: Must have a time limit, which ends the search; its
+            max_iterations caps every single start (the reported
+            iterations add up the moves of all starts)
+        workers: Worker processes (defaults to DEFAULT_POOL_WORKERS, 1 = in-process)
+        seed: Seed of the first start, start i uses seed + i (seed 0 is the greedy tour)
+
+    Returns:
+        Tuple of (best tour, stats with 'starts', 'workers' and the
+        'convergence' curve: elapsed_ms / km whenever the best tour improved)
+    """
+    if budget.deadline is None:
+        raise ValueError("multi-start search needs a time limit")
+    workers = 1 if matrix.shape[0] < 4 else max(1, workers or DEFAULT_POOL_WORKERS)
+    # Wall clock, so worker processes can check it too
+    deadline = time.time() + max(budget.deadline - time.monotonic(), 0.0)
+    symmetric = is_symmetric(matrix)
+
+    best: Dict = {}
+    convergence: List[Dict] = []
+    starts = 0
+
+    def collect(result):
+        nonlocal starts
+        starts += 1
+        budget.iterations += result['iterations']
+        if not best or result['km'] < best['km'] - IMPROVEMENT_EPSILON:
+            best.update(result)
+            convergence.append({'elapsed_ms': budget.elapsed_ms, 'km': round(result['km'], 3), 'start': starts})
+        budget.report(best['km'], best['tour'])
+
+    def more_starts():
+        # not budget.exhausted(): the summed iterations must not end the search early
+        return not budget.cancelled and time.time() < deadline
+
+    seeds = itertools.count(seed)
+    if workers == 1:
+        while True:
+            collect(_search_from_start(matrix, next(seeds), deadline, symmetric, budget.max_iterations))
+            if matrix.shape[0] < 4 or not more_starts():
+                break
+    else:
+        matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        segment = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+        try:
+            np.ndarray(matrix.shape, dtype=np.float64, buffer=segment.buf)[:] = matrix
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                def submit():
+                    task = (segment.name, matrix.shape, next(seeds), deadline, symmetric, budget.max_iterations)
+                    return pool.submit(_multi_start_worker, task)
+
+                running = {submit() for _ in range(workers)}
+                while running:
+                    done, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+                        if more_starts():
+                            running.add(submit())
+        finally:
+            segment.close()
+            segment.unlink()
+
+    return best['tour'], {'starts': starts, 'workers': workers, 'convergence': convergence}
+
+
+def savings_routes(
+    matrix: np.ndarray,
+    demands: np.ndarray,
+    vehicle_count: int,
+    capacity: Optional[float] = None,
+    neighbors: int = SAVINGS_NEIGHBORS
+) -> Tuple[List[List[int]], List[int]]:
+    """
+    Clarke-Wright savings construction for open routes from depot 0.
+
+    Joining a route ending at i to a route starting at j replaces the
+    depot -> j leg with i -> j, so the saving is d(0, j) - d(i, j).
+    Positive savings among each stop's nearest neighbors are merged first;
+    if more routes than vehicles remain, the cheapest feasible joins are
+    forced until the fleet size is met.
+
+    Args:
+        matrix: Square distance matrix, depot at index 0
+        demands: Demand per matrix index (index 0 ignored)
+        vehicle_count: Number of vehicles available
+        capacity: Vehicle capacity in demand units, unlimited if None
+        neighbors: Savings candidates considered per stop
+
+    Returns:
+        Tuple of (routes, unassigned). Routes are stop index lists without
+        the depot; unassigned stops could not be served by the fleet.
+    """
+    n = matrix.shape[0]
+    capacity = np.inf if capacity is None else capacity
+
+    unassigned = [i for i in range(1, n) if demands[i] > capacity]
+    stops = [i for i in range(1, n) if demands[i] <= capacity]
+    if not stops:
+        return [], unassigned
+
+    routes = {i: [i] for i in stops}
+    route_of = {i: i for i in stops}
+    loads = {i: float(demands[i]) for i in stops}
+
+    def merge(i, j):
+        ri, rj = route_of[i], route_of[j]
+        routes[ri].extend(routes[rj])
+        loads[ri] += loads.pop(rj)
+        for node in routes.pop(rj):
+            route_of[node] = ri
+
+    # Phase 1: positive savings among nearest neighbors
+    idx = np.asarray(stops)
+    sub = matrix[np.ix_(idx, idx)]
+    np.fill_diagonal(sub, np.inf)
+    k = min(neighbors, len(stops) - 1)
+    if k > 0:
+        nearest = np.argpartition(sub, k - 1, axis=1)[:, :k]
+        tails = np.repeat(idx, k)
+        heads = idx[nearest.ravel()]
+        savings = matrix[0, heads] - matrix[tails, heads]
+        for pos in np.argsort(-savings, kind='stable'):
+            if savings[pos] <= 0:
+                break
+            i, j = int(tails[pos]), int(heads[pos])
+            ri, rj = route_of[i], route_of[j]
+            if ri != rj and routes[ri][-1] == i and routes[rj][0] == j \
+                    and loads[ri] + loads[rj] <= capacity:
+                merge(i, j)
+
+    # Phase 2: force the cheapest feasible joins until the fleet fits
+    while len(routes) > vehicle_count:
+        keys = list(routes)
+        tails = np.array([routes[r][-1] for r in keys])
+        heads = np.array([routes[r][0] for r in keys])
+        load = np.array([loads[r] for r in keys])
+        savings = matrix[0, heads][None, :] - matrix[np.ix_(tails, heads)]
+        np.fill_diagonal(savings, -np.inf)
+        savings[load[:, None] + load[None, :] > capacity] = -np.inf
+        a, b = np.unravel_index(int(np.argmax(savings)), savings.shape)
+        if savings[a, b] == -np.inf:
+            break
+        merge(int(tails[a]), int(heads[b]))
+
+    # Capacity fragmentation: keep the heaviest routes and re-insert the
+    # stops of the dropped ones wherever they still fit
+    ordered = sorted(routes, key=lambda r: loads[r], reverse=True)
+    leftover = [node for r in ordered[vehicle_count:] for node in routes[r]]
+    kept = [routes[r] for r in ordered[:vehicle_count]]
+    kept_loads = [loads[r] for r in ordered[:vehicle_count]]
+
+    for node in sorted(leftover, key=lambda i: demands[i], reverse=True):
+        best = (np.inf, None, None)
+        for r, route in enumerate(kept):
+            if kept_loads[r] + demands[node] > capacity:
+                continue
+            path = [0] + route
+            u, v = np.asarray(path), np.asarray(route + [-1])
+            # Appending after the last stop costs only the incoming leg
+            delta = matrix[u, node] + np.where(v >= 0, matrix[node, v] - matrix[u, v], 0.0)
+            k = int(np.argmin(delta))
+            if delta[k] < best[0]:
+                best = (delta[k], r, k)
+        _, r, k = best
+        if r is None:
+            unassigned.append(node)
+        else:
+            kept[r].insert(k, node)
+            kept_loads[r] += demands[node]
+
+    return kept, sorted(unassigned)
+
+
+def _relocate_pass(
+    ext: np.ndarray,
+    paths: List[np.ndarray],
+    loads: List[float],
+    demands: np.ndarray,
+    capacity: float,
+    budget: SearchBudget
+) -> bool:
+    """
+    Move single stops to the cheapest position in another route that has
+    spare capacity. Paths are depot..END arrays over the open-path matrix.
+    """
+    improved = False
+
+    for r, path in enumerate(paths):
+        p = 1
+        while p < len(paths[r]) - 1:
+            if budget.exhausted():
+                return improved
+            path = paths[r]
+            prev, node, nxt = path[p - 1], path[p], path[p + 1]
+            removal_gain = ext[prev, node] + ext[node, nxt] - ext[prev, nxt]
+
+            best = (-IMPROVEMENT_EPSILON, None, None)
+            for q, target in enumerate(paths):
+                if q == r or loads[q] + demands[node] > capacity:
+                    continue
+                u, v = target[:-1], target[1:]
+                delta = ext[u, node] + ext[node, v] - ext[u, v] - removal_gain
+                k = int(np.argmin(delta))
+                if delta[k] < best[0]:
+                    best = (delta[k], q, k)
+
+            _, q, k = best
+            if q is None:
+                p += 1
+                continue
+
+            paths[r] = np.delete(path, p)
+            paths[q] = np.insert(paths[q], k + 1, node)
+            loads[r] -= demands[node]
+            loads[q] += demands[node]
+            budget.tick()
+            improved = True
+
+    return improved
+
+
+def improve_routes(
+    matrix: np.ndarray,
+    routes: List[List[int]],
+    demands: np.ndarray,
+    capacity: Optional[float] = None,
+    budget: Optional[SearchBudget] = None
+) -> List[List[int]]:
+    """
+    Multi-route local search: inter-route relocate moves that respect
+    capacity, followed by 2-opt / Or-opt inside every route.
+
+    Args:
+        matrix: Square distance matrix, depot at index 0
+        routes: Stop index lists without the depot
+        demands: Demand per matrix index
+        capacity: Vehicle capacity, unlimited if None
+        budget: Time / iteration budget
+
+    Returns:
+        Improved routes (same number of routes, possibly empty ones)
+    """
+    budget = budget or SearchBudget()
+    capacity = np.inf if capacity is None else capacity
+    end = matrix.shape[0]
+    ext = _open_path_matrix(matrix)
+    symmetric = is_symmetric(matrix)
+
+    paths = [np.asarray([0] + list(route) + [end]) for route in routes]
+    loads = [float(demands[route].sum()) if route else 0.0 for route in routes]
+
+    changed = True
+    while changed and not budget.exhausted():
+        changed = _relocate_pass(ext, paths, loads, demands, capacity, budget)
+        for r, path in enumerate(paths):
+            tour = improve_tour(matrix, [int(x) for x in path[:-1]], budget, report=False, symmetric=symmetric)
+            paths[r] = np.asarray(tour + [end])
+        budget.report(
+            sum(float(ext[path[:-1], path[1:]].sum()) for path in paths),
+            [[int(x) for x in path[1:-1]] for path in paths]
+        )
+
+    return [[int(x) for x in path[1:-1]] for path in paths]
+
+
+class TimeWindowSolver:
+    """
+    VRPTW solver: feasibility-checked cheapest insertion followed by
+    relocate local search.
+
+    For every route two arrays are kept:
+    - start[p]: service start time at position p (forward pass)
+    - latest[p]: latest service start at p that keeps every later stop
+      inside its window (backward pass)
+
+    Inserting a stop between p and p + 1 is then feasible iff the stop
+    itself can start before its due time and the pushed service start at
+    p + 1 does not exceed latest[p + 1], an O(1) check per position.
+
+    With an hourly speed factor the forward pass uses the factor of each
+    leg's departure hour (as schedule_arrivals does) and the backward pass
+    the slowest factor, so latest[] stays a safe bound. Per-stop speeds and
+    hourly factors can break the triangle inequality in time, so a removal
+    is only applied when the shortened route still meets its windows.
+
+    All times are minutes since midnight.
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        travel: np.ndarray,
+        ready: np.ndarray,
+        due: np.ndarray,
+        service: np.ndarray,
+        demands: np.ndarray,
+        vehicle_count: int,
+        capacity: Optional[float] = None,
+        departure: float = DEFAULT_DEPARTURE_MINUTES,
+        hourly_speed_factor: Optional[np.ndarray] = None
+    ):
+        self.matrix = matrix
+        self.travel = travel
+        self.hourly_speed_factor = None if hourly_speed_factor is None else np.asarray(hourly_speed_factor, dtype=float)
+        self.slowest_factor = 1.0 if self.hourly_speed_factor is None else float(self.hourly_speed_factor.min())
+        self.ready = ready.astype(float).copy()
+        self.due = due.astype(float).copy()
+        self.service = service.astype(float).copy()
+        self.demands = demands
+        self.capacity = np.inf if capacity is None else capacity
+        self.departure = departure
+
+        # The depot opens at departure and never closes
+        self.ready[0], self.due[0], self.service[0] = departure, np.inf, 0.0
+
+        self.paths = [np.array([0]) for _ in range(vehicle_count)]
+        self.loads = [0.0] * vehicle_count
+        self.start = [np.array([departure]) for _ in range(vehicle_count)]
+        self.latest = [np.array([np.inf]) for _ in range(vehicle_count)]
+
+    def _leg(self, prev, node, depart):
+        """Travel minutes from prev to node leaving at `depart` (scalars or arrays)."""
+        if self.hourly_speed_factor is None:
+            return self.travel[prev, node]
+        hours = (np.asarray(depart) // 60).astype(int) % 24
+        return self.travel[prev, node] / self.hourly_speed_factor[hours]
+
+    def _schedule(self, path: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Forward service starts and backward latest starts for a path."""
+        k = len(path)
+        start = np.empty(k)
+        latest = np.empty(k)
+        start[0] = self.departure
+        for p in range(1, k):
+            prev, node = path[p - 1], path[p]
+            depart = start[p - 1] + self.service[prev]
+            start[p] = max(depart + self._leg(prev, node, depart), self.ready[node])
+        latest[-1] = self.due[path[-1]]
+        for p in range(k - 2, -1, -1):
+            node, nxt = path[p], path[p + 1]
+            latest[p] = min(
+                self.due[node], latest[p + 1] - self.service[node] - self.travel[node, nxt] / self.slowest_factor
+            )
+        return start, latest
+
+    def _set_path(self, r: int, path: np.ndarray):
+        self.paths[r] = path
+        self.start[r], self.latest[r] = self._schedule(path)
+
+    def _insertion_costs(self, path, start, latest, node) -> np.ndarray:
+        """
+        Distance increase of inserting `node` after each position of `path`,
+        inf where the time windows would be violated.
+        """
+        prev = path
+        has_next = np.arange(len(path)) < len(path) - 1
+        nxt = np.where(has_next, np.roll(path, -1), 0)
+        latest_next = np.where(has_next, np.roll(latest, -1), np.inf)
+
+        depart = start + self.service[prev]
+        begin = np.maximum(depart + self._leg(prev, node, depart), self.ready[node])
+        depart_next = begin + self.service[node]
+        begin_next = np.maximum(depart_next + self._leg(node, nxt, depart_next), self.ready[nxt])
+        feasible = (begin <= self.due[node]) & (~has_next | (begin_next <= latest_next))
+
+        cost = self.matrix[prev, node] + np.where(
+            has_next, self.matrix[node, nxt] - self.matrix[prev, nxt], 0.0
+        )
+        return np.where(feasible, cost, np.inf)
+
+    def _best_insertion(self, node: int, skip_route: Optional[int] = None) -> Tuple[float, Optional[int], Optional[int]]:
+        best = (np.inf, None, None)
+        for r, path in enumerate(self.paths):
+            if r == skip_route or self.loads[r] + self.demands[node] > self.capacity:
+                continue
+            costs = self._insertion_costs(path, self.start[r], self.latest[r], node)
+            k = int(np.argmin(costs))
+            if costs[k] < best[0]:
+                best = (costs[k], r, k)
+        return best
+
+    def _insert(self, r: int, k: int, node: int):
+        self.loads[r] += self.demands[node]
+        self._set_path(r, np.insert(self.paths[r], k + 1, node))
+
+    def construct(self, nodes: List[int]) -> List[int]:
+        """
+        Insert stops in order of due time at their cheapest feasible position.
+
+        Returns:
+            Stops that could not be inserted anywhere
+        """
+        infeasible = []
+        for node in sorted(nodes, key=lambda i: (self.due[i], self.ready[i])):
+            cost, r, k = self._best_insertion(node)
+            if r is None:
+                infeasible.append(node)
+            else:
+                self._insert(r, k, node)
+        return infeasible
+
+    def _relocate_pass(self, budget: SearchBudget) -> bool:
+        improved = False
+        for r in range(len(self.paths)):
+            p = 1
+            while p < len(self.paths[r]):
+                if budget.exhausted():
+                    return improved
+                path = self.paths[r]
+                prev, node = path[p - 1], path[p]
+                gain = self.matrix[prev, node]
+                if p + 1 < len(path):
+                    nxt = path[p + 1]
+                    gain += self.matrix[node, nxt] - self.matrix[prev, nxt]
+
+                # Other routes: their arrays are current
+                cost, q, k = self._best_insertion(node, skip_route=r)
+
+                # Same route: schedule the route without the stop first
+                reduced = np.delete(path, p)
+                start, latest = self._schedule(reduced)
+                if np.any(start > self.due[reduced]):
+                    p += 1
+                    continue
+                costs = self._insertion_costs(reduced, start, latest, node)
+                costs[p - 1] = np.inf  # original position
+                k_same = int(np.argmin(costs))
+                if costs[k_same] < cost:
+                    cost, q, k = costs[k_same], r, k_same
+
+                if q is not None and cost - gain < -IMPROVEMENT_EPSILON:
+                    self.loads[r] -= self.demands[node]
+                    self._set_path(r, reduced)
+                    self._insert(q, k, node)
+                    budget.tick()
+                    improved = True
+                else:
+                    p += 1
+        return improved
+
+    def solve(self, nodes: List[int], budget: Optional[SearchBudget] = None) -> Tuple[List[List[int]], List[int]]:
+        """
+        Build and improve routes for the given stop indices.
+
+        Returns:
+            Tuple of (routes without the depot, infeasible stops)
+        """
+        budget = budget or SearchBudget()
+        infeasible = self.construct(nodes)
+
+        while not budget.exhausted():
+            improved = self._relocate_pass(budget)
+            # Freed-up slack may now admit stops that were rejected
+            retry, infeasible = infeasible, []
+            for node in retry:
+                cost, r, k = self._best_insertion(node)
+                if r is None:
+                    infeasible.append(node)
+                else:
+                    self._insert(r, k, node)
+                    improved = True
+            budget.report(
+                sum(path_length(self.matrix, list(path)) for path in self.paths),
+                [[int(x) for x in path[1:]] for path in self.paths]
+            )
+            if not improved:
+                break
+
+        return [[int(x) for x in path[1:]] for path in self.paths], sorted(infeasible)
+
+    def service_starts(self, r: int) -> np.ndarray:
+        """Service start times of route r (index 0 is the depot departure)."""
+        return self.start[r]
+
+
+class TravelModel:
+    """
+    Travel-time model: speed and service time per district, speed factor
+    per hour of day. The time-window solver plans with it and the stored
+    schedule (route_schedule.ScheduleProfile) is computed with it, so a
+    plan reported feasible keeps its windows once saved.
+    """
+
+    def __init__(
+        self,
+        speed_kmh: float = DEFAULT_AVG_SPEED_KMH,
+        service_minutes: float = DEFAULT_SERVICE_TIME_MINUTES,
+        districts: Optional[Dict[str, Dict]] = None,
+        hourly_speed_factor: Optional[Dict[int, float]] = None
+    ):
+        self.speed_kmh = float(speed_kmh)
+        self.service_minutes = float(service_minutes)
+        self.districts = districts or {}
+        self.hourly_speed_factor = None
+        if hourly_speed_factor:
+            self.hourly_speed_factor = np.ones(24)
+            for hour, factor in hourly_speed_factor.items():
+                self.hourly_speed_factor[int(hour)] = float(factor)
+
+    def speed_for(self, district: Optional[str]) -> float:
+        return float(self.districts.get(district, {}).get('speed_kmh', self.speed_kmh))
+
+    def service_for(self, district: Optional[str]) -> float:
+        return float(self.districts.get(district, {}).get('service_minutes', self.service_minutes))
+
+
+def schedule_arrivals(
+    distances_km,
+    start_minutes: float,
+    speeds_kmh=DEFAULT_AVG_SPEED_KMH,
+    service_minutes=DEFAULT_SERVICE_TIME_MINUTES,
+    ready=None,
+    hourly_speed_factor: Optional[np.ndarray] = None,
+    refinements: int = SCHEDULE_REFINEMENTS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Service start time of every stop of a route in one vectorized pass.
+
+    With c_i the cumulative travel + previous service time up to stop i,
+    the start at stop i is c_i + max(start, max_{k<=i}(ready_k - c_k)),
+    so waiting for a time window is a running maximum.
+
+    Args:
+        distances_km: Leg length to each stop from the previous one
+        start_minutes: Departure from the first leg's origin (minutes since midnight)
+        speeds_kmh: Travel speed per leg (scalar or array)
+        service_minutes: Service time per stop (scalar or array)
+        ready: Earliest service start per stop (NaN / None for no window)
+        hourly_speed_factor: 24 speed multipliers by hour of leg departure;
+            resolved by fixed-point iteration
+        refinements: Maximum fixed-point passes
+
+    Returns:
+        Tuple of (service start per stop, travel minutes per leg)
+    """
+    dist = np.asarray(distances_km, dtype=float)
+    if dist.size == 0:
+        return np.zeros(0), np.zeros(0)
+    speeds = np.broadcast_to(np.asarray(speeds_kmh, dtype=float), dist.shape)
+    service = np.broadcast_to(np.asarray(service_minutes, dtype=float), dist.shape)
+    earliest = np.full(dist.shape, -np.inf)
+    if ready is not None:
+        ready = np.asarray(ready, dtype=float)
+        earliest = np.where(np.isnan(ready), -np.inf, ready)
+
+    service_before = np.concatenate(([0.0], np.cumsum(service[:-1])))
+    factors = np.ones(dist.shape)
+    for _ in range(max(refinements, 1)):
+        legs = dist / (speeds * factors) * 60
+        offsets = np.cumsum(legs) + service_before
+        arrivals = offsets + np.maximum.accumulate(np.maximum(earliest - offsets, start_minutes))
+        if hourly_speed_factor is None:
+            break
+        departures = np.concatenate(([start_minutes], arrivals[:-1] + service[:-1]))
+        updated = np.asarray(hourly_speed_factor, dtype=float)[(departures // 60).astype(int) % 24]
+        if np.array_equal(updated, factors):
+            break
+        factors = updated
+
+    return arrivals, legs
+
+
+def format_minutes(minutes: float) -> str:
+    """Minutes since midnight as HH:MM."""
+    minutes = int(round(minutes))
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+
 class RouteOptimizer:
     """
-    Route optimizer using Nearest Neighbor algorithm.
+    Route optimizer: Nearest Neighbor construction with optional
+    2-opt / Or-opt improvement, or an anytime multi-start search.
     """
+
+    ALGORITHMS = ('nearest_neighbor', 'two_opt', 'or_opt', 'multi_start')
+    FLEET_ALGORITHMS = ('cvrp', 'vrptw')
     
-    def __init__(self, depot_lat: float, depot_lng: float):
+    def __init__(self, depot_lat: float, depot_lng: float, distance_provider=None):
         """
         Initialize optimizer with depot coordinates.
         
         Args:
             depot_lat: Depot latitude
             depot_lng: Depot longitude
+            distance_provider: Source of distance matrices (haversine if omitted)
         """
         self.depot_lat = depot_lat
         self.depot_lng = depot_lng
+        self.distance_provider = distance_provider or HaversineDistanceProvider()
     
+    def distance_matrix(self, deliveries: List[Dict]) -> np.ndarray:
+        """
+        Pairwise distance matrix with the depot at index 0.
+
+        Args:
+            deliveries: List of delivery dicts with 'lat', 'lng' keys
+
+        Returns:
+            (n + 1, n + 1) matrix in kilometers
+        """
+        lats = [self.depot_lat] + [d['lat'] for d in deliveries]
+        lngs = [self.depot_lng] + [d['lng'] for d in deliveries]
+        return self.distance_provider.matrix(lats, lngs)
+
     def nearest_neighbor_route(
         self, 
         deliveries: List[Dict]
@@ -75,71 +1243,135 @@ class RouteOptimizer:
         """
         if not deliveries:
             return [], 0.0
-        
-        # Start from depot
-        current_lat = self.depot_lat
-        current_lng = self.depot_lng
-        
-        unvisited = deliveries.copy()
+
+        matrix = self.distance_matrix(deliveries)
+        return self._build_route(deliveries, nearest_neighbor_tour(matrix), matrix)
+
+    def _build_route(
+        self,
+        deliveries: List[Dict],
+        tour: List[int],
+        matrix: np.ndarray
+    ) -> Tuple[List[Dict], float]:
+        """
+        Annotate deliveries with 'order' and 'distance_from_previous' following the tour.
+
+        Returns:
+            Tuple of (ordered_deliveries, total_distance_km)
+        """
         route = []
         total_distance = 0.0
-        
-        # Greedy nearest neighbor
-        while unvisited:
-            # Find nearest unvisited delivery
-            nearest = None
-            min_distance = float('inf')
-            
-            for delivery in unvisited:
-                distance = haversine_distance(
-                    current_lat, current_lng,
-                    delivery['lat'], delivery['lng']
-                )
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest = delivery
-            
-            # Move to nearest
-            if nearest:
-                nearest['distance_from_previous'] = round(min_distance, 2)
-                nearest['order'] = len(route) + 1
-                route.append(nearest)
-                unvisited.remove(nearest)
-                total_distance += min_distance
-                current_lat = nearest['lat']
-                current_lng = nearest['lng']
-        
+
+        for previous, node in zip(tour[:-1], tour[1:]):
+            delivery = deliveries[node - 1]
+            distance = float(matrix[previous, node])
+            delivery['distance_from_previous'] = round(distance, 2)
+            delivery['order'] = len(route) + 1
+            route.append(delivery)
+            total_distance += distance
+
         return route, round(total_distance, 2)
     
+    def optimize(self, deliveries_data: List[Dict], algorithm: str = 'nearest_neighbor', **options) -> Dict:
+        """
+        Dispatch to the right solver for an algorithm name.
+
+        Single-tour algorithms switch to the fleet solver when more than one
+        vehicle or a capacity is requested.
+
+        Args:
+            deliveries_data: List of deliveries with coordinates
+            algorithm: One of ALGORITHMS or FLEET_ALGORITHMS
+            **options: time_limit, max_iterations, on_progress, vehicle_count,
+                vehicle_capacity, departure_minutes, shift_end_minutes, workers,
+                travel_model (vrptw)
+
+        Returns:
+            Solver result dict
+        """
+        search = {key: options[key] for key in ('time_limit', 'max_iterations', 'on_progress') if key in options}
+        vehicle_count = options.get('vehicle_count', 1)
+        vehicle_capacity = options.get('vehicle_capacity')
+
+        if algorithm == 'vrptw':
+            return self.optimize_time_windows(
+                deliveries_data,
+                vehicle_count=vehicle_count,
+                vehicle_capacity=vehicle_capacity,
+                departure_minutes=options.get('departure_minutes', DEFAULT_DEPARTURE_MINUTES),
+                shift_end_minutes=options.get('shift_end_minutes'),
+                travel_model=options.get('travel_model'),
+                **search
+            )
+        if algorithm == 'cvrp' or vehicle_count > 1 or vehicle_capacity is not None:
+            return self.optimize_fleet(
+                deliveries_data,
+                vehicle_count=vehicle_count,
+                vehicle_capacity=vehicle_capacity,
+                **search
+            )
+        if 'workers' in options:
+            search['workers'] = options['workers']
+        return self.optimize_deliveries(deliveries_data, algorithm=algorithm, **search)
+
     def optimize_deliveries(
         self,
         deliveries_data: List[Dict],
-        algorithm: str = 'nearest_neighbor'
+        algorithm: str = 'nearest_neighbor',
+        time_limit: Optional[float] = DEFAULT_TIME_LIMIT_SECONDS,
+        max_iterations: Optional[int] = DEFAULT_MAX_ITERATIONS,
+        on_progress: Optional[Callable[[SearchBudget], None]] = None,
+        workers: Optional[int] = None
     ) -> Dict:
         """
         Main optimization method.
         
         Args:
             deliveries_data: List of deliveries with coordinates
-            algorithm: Optimization algorithm ('nearest_neighbor')
+            algorithm: Optimization algorithm ('nearest_neighbor', 'two_opt', 'or_opt', 'multi_start')
+            time_limit: Local search wall-clock limit in seconds (multi_start uses all of it)
+            max_iterations: Maximum number of improving moves (multi_start: per start)
+            on_progress: Progress / cancellation callback (see SearchBudget)
+            workers: multi_start worker processes (defaults to DEFAULT_POOL_WORKERS)
         
         Returns:
-            Dict with optimized route info
+            Dict with optimized route info. Improvement figures are relative
+            to the Nearest Neighbor tour the local search starts from;
+            multi_start also returns 'starts', 'workers' and 'convergence'.
         """
-        if algorithm == 'nearest_neighbor':
-            optimized_route, total_km = self.nearest_neighbor_route(deliveries_data)
-        else:
+        if algorithm not in self.ALGORITHMS:
             raise ValueError(f"Unknown algorithm: {algorithm}")
-        
-        # Generate batch ID
-        batch_id = f"ROUTE-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+        budget = SearchBudget(time_limit, max_iterations, on_progress)
+        matrix = self.distance_matrix(deliveries_data)
+        tour = nearest_neighbor_tour(matrix)
+        baseline_km = path_length(matrix, tour)
+        budget.report(baseline_km, tour, force=True)
+
+        stats = {}
+        if algorithm == 'two_opt':
+            tour = two_opt(matrix, tour, budget)
+        elif algorithm == 'or_opt':
+            tour = or_opt(matrix, tour, budget)
+        elif algorithm == 'multi_start':
+            tour, stats = multi_start_search(matrix, budget, workers)
+        budget.report(path_length(matrix, tour), tour, force=True)
+
+        optimized_route, total_km = self._build_route(deliveries_data, tour, matrix)
+        improvement_km = max(baseline_km - path_length(matrix, tour), 0.0)
         
         return {
             'optimized_deliveries': optimized_route,
             'total_km': total_km,
-            'batch_id': batch_id,
+            'batch_id': self._new_batch_id(),
             'algorithm': algorithm,
+            'baseline_km': round(baseline_km, 2),
+            'improvement_km': round(improvement_km, 2),
+            'improvement_pct': round(improvement_km / baseline_km * 100, 2) if baseline_km else 0.0,
+            'iterations': budget.iterations,
+            'cancelled': budget.cancelled,
+            'runtime_ms': budget.elapsed_ms,
+            **stats,
             'depot_coords': {
                 'lat': self.depot_lat,
                 'lng': self.depot_lng
@@ -147,11 +1379,449 @@ class RouteOptimizer:
         }
 
 
+    def optimize_fleet(
+        self,
+        deliveries_data: List[Dict],
+        vehicle_count: int,
+        vehicle_capacity: Optional[float] = None,
+        time_limit: Optional[float] = DEFAULT_TIME_LIMIT_SECONDS,
+        max_iterations: Optional[int] = DEFAULT_MAX_ITERATIONS,
+        on_progress: Optional[Callable[[SearchBudget], None]] = None
+    ) -> Dict:
+        """
+        Capacitated multi-vehicle optimization (CVRP).
+
+        Args:
+            deliveries_data: List of deliveries with coordinates and an
+                optional 'demand' key (defaults to 1 unit)
+            vehicle_count: Number of trucks available
+            vehicle_capacity: Capacity per truck in demand units (unlimited if None)
+            time_limit: Wall-clock limit in seconds for the whole solve
+            max_iterations: Maximum number of improving moves
+            on_progress: Progress / cancellation callback (see SearchBudget)
+
+        Returns:
+            Dict with one route (and batch ID) per used vehicle and the
+            deliveries that did not fit into the fleet
+        """
+        if vehicle_count < 1:
+            raise ValueError("vehicle_count must be at least 1")
+
+        budget = SearchBudget(time_limit, max_iterations, on_progress)
+        matrix = self.distance_matrix(deliveries_data)
+        demands = np.array([0.0] + [float(d.get('demand', 1)) for d in deliveries_data])
+
+        routes, unassigned = savings_routes(matrix, demands, vehicle_count, vehicle_capacity)
+        baseline_km = sum(path_length(matrix, [0] + route) for route in routes)
+        budget.report(baseline_km, routes, force=True)
+        routes = improve_routes(matrix, routes, demands, vehicle_capacity, budget)
+        budget.report(sum(path_length(matrix, [0] + route) for route in routes), routes, force=True)
+
+        base_batch_id = self._new_batch_id()
+        vehicle_routes = []
+        for route in routes:
+            if not route:
+                continue
+            ordered, route_km = self._build_route(deliveries_data, [0] + route, matrix)
+            vehicle = len(vehicle_routes) + 1
+            vehicle_routes.append({
+                'vehicle': vehicle,
+                'batch_id': f"{base_batch_id}-V{vehicle}",
+                'optimized_deliveries': ordered,
+                'total_km': route_km,
+                'load': float(demands[route].sum()),
+            })
+
+        total_km = round(sum(route['total_km'] for route in vehicle_routes), 2)
+
+        return {
+            'routes': vehicle_routes,
+            'unassigned': [deliveries_data[i - 1] for i in unassigned],
+            'total_km': total_km,
+            'algorithm': 'cvrp',
+            'vehicle_count': vehicle_count,
+            'vehicle_capacity': vehicle_capacity,
+            'construction_km': round(baseline_km, 2),
+            'iterations': budget.iterations,
+            'cancelled': budget.cancelled,
+            'runtime_ms': budget.elapsed_ms,
+            'depot_coords': {
+                'lat': self.depot_lat,
+                'lng': self.depot_lng
+            }
+        }
+
+    def optimize_time_windows(
+        self,
+        deliveries_data: List[Dict],
+        vehicle_count: int = 1,
+        vehicle_capacity: Optional[float] = None,
+        departure_minutes: float = DEFAULT_DEPARTURE_MINUTES,
+        shift_end_minutes: Optional[float] = None,
+        avg_speed_kmh: float = DEFAULT_AVG_SPEED_KMH,
+        service_time_minutes: float = DEFAULT_SERVICE_TIME_MINUTES,
+        time_limit: Optional[float] = DEFAULT_TIME_LIMIT_SECONDS,
+        max_iterations: Optional[int] = DEFAULT_MAX_ITERATIONS,
+        on_progress: Optional[Callable[[SearchBudget], None]] = None,
+        travel_model: Optional[TravelModel] = None
+    ) -> Dict:
+        """
+        Time-window-aware optimization (VRPTW).
+
+        Args:
+            deliveries_data: Deliveries with coordinates and optional
+                'window_start' / 'window_end' (minutes since midnight),
+                'demand' and 'district'
+            vehicle_count: Number of trucks available
+            vehicle_capacity: Capacity per truck in demand units (unlimited if None)
+            departure_minutes: Depot departure time (minutes since midnight)
+            shift_end_minutes: Latest service start for any stop (no limit if None)
+            avg_speed_kmh: Average travel speed, as in calculate_eta
+            service_time_minutes: Time spent at each stop, as in calculate_eta
+            time_limit: Wall-clock limit in seconds
+            max_iterations: Maximum number of improving moves
+            on_progress: Progress / cancellation callback (see SearchBudget)
+            travel_model: District speeds / service times and hourly speed
+                factors; overrides avg_speed_kmh and service_time_minutes
+
+        Returns:
+            Dict with one route per used vehicle (stops carry 'arrival' HH:MM
+            and 'arrival_minutes') and the deliveries whose window cannot be met
+        """
+        if vehicle_count < 1:
+            raise ValueError("vehicle_count must be at least 1")
+        model = travel_model or TravelModel(avg_speed_kmh, service_time_minutes)
+        districts = [d.get('district') for d in deliveries_data]
+        # Like schedule_arrivals, a leg runs at the speed of the stop it leads to
+        speeds = np.array([model.speed_kmh] + [model.speed_for(d) for d in districts])
+        if np.any(speeds <= 0):
+            raise ValueError("avg_speed_kmh must be positive")
+
+        budget = SearchBudget(time_limit, max_iterations, on_progress)
+        matrix = self.distance_matrix(deliveries_data)
+        travel = matrix / speeds[np.newaxis, :] * 60
+        n = len(deliveries_data)
+
+        ready = np.array([departure_minutes] + [
+            d['window_start'] if d.get('window_start') is not None else 0.0 for d in deliveries_data
+        ], dtype=float)
+        due = np.array([np.inf] + [
+            d['window_end'] if d.get('window_end') is not None else np.inf for d in deliveries_data
+        ], dtype=float)
+        if shift_end_minutes is not None:
+            due = np.minimum(due, shift_end_minutes)
+        service = np.array([0.0] + [model.service_for(d) for d in districts])
+        demands = np.array([0.0] + [float(d.get('demand', 1)) for d in deliveries_data])
+
+        solver = TimeWindowSolver(
+            matrix, travel, ready, due, service, demands,
+            vehicle_count, vehicle_capacity, departure_minutes, model.hourly_speed_factor
+        )
+        routes, infeasible = solver.solve(list(range(1, n + 1)), budget)
+        budget.report(sum(path_length(matrix, [0] + route) for route in routes), routes, force=True)
+
+        base_batch_id = self._new_batch_id()
+        vehicle_routes = []
+        for r, route in enumerate(routes):
+            if not route:
+                continue
+            ordered, route_km = self._build_route(deliveries_data, [0] + route, matrix)
+            starts = solver.service_starts(r)
+            for delivery, begin in zip(ordered, starts[1:]):
+                delivery['arrival_minutes'] = round(float(begin), 1)
+                delivery['arrival'] = format_minutes(begin)
+            vehicle = len(vehicle_routes) + 1
+            vehicle_routes.append({
+                'vehicle': vehicle,
+                'batch_id': f"{base_batch_id}-V{vehicle}",
+                'optimized_deliveries': ordered,
+                'total_km': route_km,
+                'load': float(demands[route].sum()),
+                'finish': format_minutes(starts[-1] + service[route[-1]]),
+            })
+
+        return {
+            'routes': vehicle_routes,
+            'infeasible': [deliveries_data[i - 1] for i in infeasible],
+            'total_km': round(sum(route['total_km'] for route in vehicle_routes), 2),
+            'algorithm': 'vrptw',
+            'vehicle_count': vehicle_count,
+            'vehicle_capacity': vehicle_capacity,
+            'departure': format_minutes(departure_minutes),
+            'iterations': budget.iterations,
+            'cancelled': budget.cancelled,
+            'runtime_ms': budget.elapsed_ms,
+            'depot_coords': {
+                'lat': self.depot_lat,
+                'lng': self.depot_lng
+            }
+        }
+
+    @staticmethod
+    def _new_batch_id() -> str:
+        return f"ROUTE-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def result_routes(result: Dict) -> List[Dict]:
+    """Vehicle routes of any solver result (single-tour results are one route)."""
+    return result['routes'] if 'routes' in result else [result]
+
+
+def assign_depots(
+    deliveries: List[Dict],
+    depots: List[Dict],
+    strategy: str = 'nearest',
+    distance_provider=None
+) -> np.ndarray:
+    """
+    Assign every delivery to a depot using one vectorized distance matrix.
+
+    Args:
+        deliveries: Deliveries with 'lat', 'lng' (and optional 'demand')
+        depots: Depots with 'lat', 'lng'
+        strategy: 'nearest' (closest depot) or 'balanced' (closest depot
+            with room left, each depot taking at most DEPOT_BALANCE_SLACK
+            times its even share of the demand)
+
+    Returns:
+        Array with the depot index for each delivery
+    """
+    if strategy not in ('nearest', 'balanced'):
+        raise ValueError(f"Unknown depot assignment strategy: {strategy}")
+    if not deliveries:
+        return np.array([], dtype=int)
+
+    provider = distance_provider or HaversineDistanceProvider()
+    distances = provider.matrix(
+        [d['lat'] for d in deliveries], [d['lng'] for d in deliveries],
+        [d['lat'] for d in depots], [d['lng'] for d in depots]
+    )
+    nearest = np.argmin(distances, axis=1)
+    if strategy == 'nearest' or len(depots) == 1:
+        return nearest
+
+    demands = np.array([float(d.get('demand', 1)) for d in deliveries])
+    share = demands.sum() / len(depots) * DEPOT_BALANCE_SLACK
+    room = np.full(len(depots), max(share, demands.max()))
+    assignment = np.empty(len(deliveries), dtype=int)
+
+    # Deliveries that lose most by not getting their nearest depot go first
+    ranked = np.sort(distances, axis=1)
+    regret = ranked[:, 1] - ranked[:, 0]
+    for i in np.argsort(-regret, kind='stable'):
+        for depot in np.argsort(distances[i]):
+            if room[depot] >= demands[i]:
+                break
+        assignment[i] = depot
+        room[depot] -= demands[i]
+
+    return assignment
+
+
+def _optimize_depot(task: Tuple[Dict, List[Dict], str, Dict, object]) -> Dict:
+    """Process pool worker: optimize one depot's deliveries (or one what-if scenario)."""
+    depot, deliveries, algorithm, options, provider = task
+    # Depots already run in parallel; multi-start stays in this process
+    options = {**options, 'workers': 1}
+    optimizer = RouteOptimizer(depot['lat'], depot['lng'], distance_provider=provider)
+    result = optimizer.optimize(deliveries, algorithm, **options)
+    result['depot'] = depot
+    return result
+
+
+def optimize_multi_depot(
+    deliveries_data: List[Dict],
+    depots: List[Dict],
+    algorithm: str = 'nearest_neighbor',
+    strategy: str = 'nearest',
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    distance_provider=None,
+    on_progress: Optional[Callable[[SearchBudget], None]] = None,
+    **options
+) -> Dict:
+    """
+    Split a day's deliveries across depots and optimize each subset
+    independently, in a process pool when more than one depot is used.
+
+    Args:
+        deliveries_data: Deliveries with coordinates
+        depots: Depots as dicts with 'id', 'lat', 'lng' (other keys are passed through)
+        algorithm: Solver used for every depot (see RouteOptimizer.optimize)
+        strategy: Depot assignment strategy (see assign_depots)
+        parallel: Use worker processes
+        max_workers: Process pool size (defaults to DEFAULT_POOL_WORKERS)
+        distance_provider: Source of distances; queried once in this process
+            for all depots and deliveries, workers get slices of that matrix
+        on_progress: Called after every finished depot (see SearchBudget)
+        **options: Solver options, applied per depot
+
+    Returns:
+        Dict with one solver result per depot that received deliveries
+    """
+    if not depots:
+        raise ValueError("At least one depot is required")
+
+    started = time.monotonic()
+    provider = distance_provider or HaversineDistanceProvider()
+    points = depots + deliveries_data
+    lats, lngs = [p['lat'] for p in points], [p['lng'] for p in points]
+    shared = MatrixDistanceProvider(lats, lngs, provider.matrix(lats, lngs), provider.source)
+
+    assignment = assign_depots(deliveries_data, depots, strategy, shared)
+    tasks = []
+    for index, depot in enumerate(depots):
+        subset = [d for d, a in zip(deliveries_data, assignment) if a == index]
+        if subset:
+            tasks.append((depot, subset, algorithm, options, shared))
+
+    # Callbacks cannot cross process boundaries: progress is reported per
+    # finished depot and cancellation skips the depots not started yet.
+    budget = SearchBudget(on_progress=on_progress)
+    finished = {}
+
+    def collect(index, result):
+        finished[index] = result
+        budget.report(
+            sum(r['total_km'] for r in finished.values()), None,
+            fraction=len(finished) / len(tasks), force=True
+        )
+
+    if parallel and len(tasks) > 1:
+        workers = min(len(tasks), max_workers or DEFAULT_POOL_WORKERS)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_optimize_depot, task): index for index, task in enumerate(tasks)}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                collect(futures[future], future.result())
+                if budget.cancelled:
+                    for pending in futures:
+                        pending.cancel()
+    else:
+        for index, task in enumerate(tasks):
+            if budget.cancelled:
+                break
+            collect(index, _optimize_depot(task))
+
+    results = [finished[index] for index in sorted(finished)]
+
+    return {
+        'depots': results,
+        'algorithm': algorithm,
+        'strategy': strategy,
+        'cancelled': budget.cancelled,
+        'total_km': round(sum(result['total_km'] for result in results), 2),
+        'runtime_ms': int((time.monotonic() - started) * 1000),
+    }
+
+
+def scenario_summary(
+    result: Dict,
+    departure_minutes: float = DEFAULT_DEPARTURE_MINUTES,
+    travel_model: Optional[TravelModel] = None
+) -> Dict:
+    """
+    Comparable figures for a solver result.
+
+    Args:
+        result: Solver result (single tour or vehicle routes)
+        departure_minutes: Depot departure, minutes after midnight
+        travel_model: Travel-time model (default speed / service time if omitted)
+
+    Returns:
+        Dict with the distance, the driving + service time of the longest
+        route and of all vehicles together, deliveries reached after their
+        time window and deliveries left unrouted
+    """
+    model = travel_model or TravelModel()
+    durations = []
+    late = []
+    for route in result_routes(result):
+        stops = route['optimized_deliveries']
+        if not stops:
+            continue
+        ready = [np.nan if stop.get('window_start') is None else stop['window_start'] for stop in stops]
+        districts = [stop.get('district') for stop in stops]
+        arrivals, _ = schedule_arrivals(
+            [stop['distance_from_previous'] for stop in stops], departure_minutes,
+            speeds_kmh=[model.speed_for(d) for d in districts],
+            service_minutes=[model.service_for(d) for d in districts],
+            ready=ready,
+            hourly_speed_factor=model.hourly_speed_factor,
+        )
+        durations.append(float(arrivals[-1]) + model.service_for(districts[-1]) - departure_minutes)
+        late.extend(
+            stop['id'] for stop, arrival in zip(stops, arrivals)
+            if stop.get('window_end') is not None and arrival > stop['window_end']
+        )
+    unrouted = [d['id'] for d in result.get('unassigned', []) + result.get('infeasible', [])]
+    return {
+        'total_km': result['total_km'],
+        'vehicles_used': len(durations),
+        'duration_minutes': round(max(durations, default=0.0), 1),
+        'vehicle_minutes': round(sum(durations), 1),
+        'late_deliveries': late,
+        'unrouted_deliveries': unrouted,
+        'feasible': not late and not unrouted,
+    }
+
+
+def compare_scenarios(
+    deliveries_data: List[Dict],
+    depots: List[Dict],
+    scenarios: List[Dict],
+    parallel: bool = True,
+    max_workers: Optional[int] = None,
+    distance_provider=None
+) -> List[Dict]:
+    """
+    Solve the same deliveries under several configurations (what-if).
+
+    The distance matrix over all depots and deliveries is built once in this
+    process; each scenario runs in a worker process on slices of it.
+
+    Args:
+        deliveries_data: Deliveries with coordinates
+        depots: Depots as dicts with 'id', 'lat', 'lng'
+        scenarios: Dicts with 'depot' (index into depots), 'algorithm' and
+            'options' (see RouteOptimizer.optimize)
+        parallel: Use worker processes
+        max_workers: Process pool size (defaults to DEFAULT_POOL_WORKERS)
+        distance_provider: Source of distances (haversine if omitted)
+
+    Returns:
+        One solver result per scenario, in input order, each with its
+        'depot' and a 'summary' (see scenario_summary)
+    """
+    provider = distance_provider or HaversineDistanceProvider()
+    points = depots + deliveries_data
+    lats, lngs = [p['lat'] for p in points], [p['lng'] for p in points]
+    shared = MatrixDistanceProvider(lats, lngs, provider.matrix(lats, lngs), provider.source)
+
+    # Solvers annotate the delivery dicts: every scenario gets its own copies
+    tasks = [
+        (depots[s['depot']], [dict(d) for d in deliveries_data], s['algorithm'], s['options'], shared)
+        for s in scenarios
+    ]
+    if parallel and len(tasks) > 1:
+        workers = min(len(tasks), max_workers or DEFAULT_POOL_WORKERS)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_optimize_depot, tasks))
+    else:
+        results = [_optimize_depot(task) for task in tasks]
+
+    for result, scenario in zip(results, scenarios):
+        departure = scenario['options'].get('departure_minutes', DEFAULT_DEPARTURE_MINUTES)
+        result['summary'] = scenario_summary(result, departure, scenario['options'].get('travel_model'))
+    return results
+
+
 def calculate_eta(
     current_time: datetime,
     distance_km: float,
-    avg_speed_kmh: float = 40.0,
-    service_time_minutes: int = 10
+    avg_speed_kmh: float = DEFAULT_AVG_SPEED_KMH,
+    service_time_minutes: int = DEFAULT_SERVICE_TIME_MINUTES
 ) -> datetime:
     """
     Calculate estimated time of arrival.
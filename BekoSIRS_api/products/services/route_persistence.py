@@ -0,0 +1,157 @@
+"""
+Bulk persistence of route optimization results.
+
+Optimized routes are written to Delivery (order, distance, batch, depot) and
+to DeliveryRoute / DeliveryRouteStop with a fixed number of set-based queries
+per call, independent of the number of stops. Each route also gets its
+encoded polyline (services/polyline.py). Arrival times are then filled in by
+the schedule pipeline (route_schedule.compute_schedules).
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import Delivery, DeliveryRoute, DeliveryRouteStop
+from products.services.distance_cache import get_distance_provider
+from products.services.polyline import route_polyline
+from products.services.route_bundle import bump_versions
+from products.services.route_optimizer import DEFAULT_DEPARTURE_MINUTES
+from products.services.route_schedule import compute_schedules
+from products.services.vehicle_tracking import forget_routes
+
+# Rows per UPDATE/INSERT batch and ids per IN-clause (MSSQL allows 2100 parameters)
+BATCH_SIZE = 500
+
+DELIVERY_FIELDS = ['delivery_order', 'distance_km', 'route_batch_id', 'depot', 'updated_at']
+ROUTE_FIELDS = [
+    'date', 'depot', 'store_address', 'store_lat', 'store_lng', 'total_distance_km',
+    'planned_departure', 'route_polyline', 'is_optimized', 'optimized_at',
+]
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def save_optimized_routes(
+    routes: List[Dict],
+    depot,
+    route_date,
+    departure_minutes: int = DEFAULT_DEPARTURE_MINUTES,
+    distance_provider=None
+) -> List[DeliveryRoute]:
+    """
+    Persist optimized routes (one DeliveryRoute per batch id).
+
+    Args:
+        routes: Solver routes (see route_optimizer.result_routes)
+        depot: DepotLocation the routes start from
+        route_date: Delivery date of the routes
+        departure_minutes: Depot departure, minutes after midnight
+        distance_provider: Provider used for the route geometry (configured one if omitted)
+
+    Returns:
+        The saved DeliveryRoute objects, in input order
+    """
+    routes = [route for route in routes if route['optimized_deliveries']]
+    if not routes:
+        return []
+
+    now = timezone.now()
+    distance_provider = distance_provider or get_distance_provider()
+    departure = timezone.make_aware(
+        datetime.combine(route_date, datetime.min.time()) + timedelta(minutes=departure_minutes)
+    )
+    batch_ids = [route['batch_id'] for route in routes]
+    delivery_ids = [stop['id'] for route in routes for stop in route['optimized_deliveries']]
+
+    with transaction.atomic():
+        Delivery.objects.bulk_update(
+            [
+                Delivery(
+                    id=stop['id'],
+                    delivery_order=stop['order'],
+                    distance_km=stop['distance_from_previous'],
+                    route_batch_id=route['batch_id'],
+                    depot=depot,
+                    updated_at=now,
+                )
+                for route in routes for stop in route['optimized_deliveries']
+            ],
+            DELIVERY_FIELDS,
+            batch_size=BATCH_SIZE,
+        )
+
+        # Upsert routes by batch id
+        existing = DeliveryRoute.objects.in_bulk(batch_ids, field_name='batch_id')
+        saved = []
+        for route in routes:
+            obj = existing.get(route['batch_id']) or DeliveryRoute(batch_id=route['batch_id'])
+            obj.date = route_date
+            obj.depot = depot
+            obj.store_address = depot.name
+            obj.store_lat = depot.latitude
+            obj.store_lng = depot.longitude
+            obj.total_distance_km = round(route['total_km'], 2)
+            obj.planned_departure = departure
+            stops = route['optimized_deliveries']
+            obj.route_polyline = route_polyline(
+                distance_provider,
+                [float(depot.latitude)] + [stop['lat'] for stop in stops],
+                [float(depot.longitude)] + [stop['lng'] for stop in stops],
+            )
+            obj.is_optimized = True
+            obj.optimized_at = now
+            saved.append(obj)
+        created = [obj for obj in saved if obj.pk is None]
+        reused_ids = [obj.pk for obj in saved if obj.pk is not None]
+        DeliveryRoute.objects.bulk_update([obj for obj in saved if obj.pk is not None], ROUTE_FIELDS, batch_size=BATCH_SIZE)
+        DeliveryRoute.objects.bulk_create(created, batch_size=BATCH_SIZE)
+        if any(obj.pk is None for obj in created):
+            # Not every backend returns primary keys from bulk_create
+            ids = dict(DeliveryRoute.objects.filter(batch_id__in=batch_ids).values_list('batch_id', 'id'))
+            for obj in saved:
+                obj.pk = ids[obj.batch_id]
+        route_ids = [obj.pk for obj in saved]
+        # Re-saved routes get a new version (and geometry) for the driver bundle
+        versions = bump_versions(reused_ids, geometry=True)
+
+        # Replace stops of these routes and of the deliveries that moved here
+        DeliveryRouteStop.objects.filter(route_id__in=route_ids).delete()
+        stale_route_ids = set()
+        for chunk in _chunks(delivery_ids):
+            moved = DeliveryRouteStop.objects.filter(delivery_id__in=chunk)
+            stale_route_ids.update(moved.values_list('route_id', flat=True))
+            moved.delete()
+        if stale_route_ids:
+            emptied = list(DeliveryRoute.objects.filter(
+                id__in=stale_route_ids - set(route_ids), stops__isnull=True
+            ).values_list('id', flat=True))
+            if emptied:
+                DeliveryRoute.objects.filter(id__in=emptied).delete()
+                # Buffered pings of these routes are dropped at flush time
+                forget_routes(emptied)
+            # Routes that lost stops to these ones
+            bump_versions(stale_route_ids - set(route_ids))
+
+        DeliveryRouteStop.objects.bulk_create(
+            [
+                DeliveryRouteStop(
+                    route_id=obj.pk,
+                    delivery_id=stop['id'],
+                    stop_order=stop['order'],
+                    distance_from_previous_km=round(stop['distance_from_previous'], 2),
+                    version=versions.get(obj.pk, 1),
+                )
+                for obj, route in zip(saved, routes)
+                for stop in route['optimized_deliveries']
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        compute_schedules(saved)
+
+    return saved
@@ -0,0 +1,105 @@
+"""
+What-if route plans.
+
+compare_plans() solves one day's deliveries under several configurations
+(algorithm, vehicle count / capacity, depot) in parallel worker processes
+sharing one distance matrix (route_optimizer.compare_scenarios) and writes
+nothing to the database. Every result is kept in the cache for PLAN_TTL
+seconds under a plan id; commit_plan() saves the chosen plan exactly like a
+regular optimize run, provided its deliveries are still waiting for that day.
+"""
+import uuid
+from typing import Dict, List, Tuple
+
+from django.core.cache import cache
+
+from products.models import Delivery, DeliveryRoute, DepotLocation
+from products.services.distance_cache import get_distance_provider
+from products.services.route_optimizer import compare_scenarios, result_routes
+from products.services.route_persistence import _chunks, save_optimized_routes
+
+PLAN_TTL = 30 * 60
+MAX_SCENARIOS = 8
+
+
+class PlanError(Exception):
+    """Raised when a stored plan cannot be committed."""
+
+
+def _plan_key(plan_id: str) -> str:
+    return f'route_plan:{plan_id}'
+
+
+def plan_delivery_ids(result: Dict) -> List[int]:
+    return [stop['id'] for route in result_routes(result) for stop in route['optimized_deliveries']]
+
+
+def compare_plans(deliveries_data: List[Dict], depots: List, scenarios: List[Dict], route_date) -> List[Dict]:
+    """
+    Evaluate scenarios without persisting them.
+
+    Args:
+        deliveries_data: Deliveries in optimizer format
+        depots: DepotLocation objects, referenced by index from the scenarios
+        scenarios: Dicts with 'label', 'depot' (index), 'algorithm' and 'options'
+        route_date: Delivery date of the plans
+
+    Returns:
+        One plan per scenario: plan_id, label, solver result (with 'depot'
+        and 'summary')
+    """
+    depot_infos = [
+        {'id': d.id, 'name': d.name, 'lat': float(d.latitude), 'lng': float(d.longitude)} for d in depots
+    ]
+    results = compare_scenarios(deliveries_data, depot_infos, scenarios, distance_provider=get_distance_provider())
+
+    plans = []
+    for scenario, result in zip(scenarios, results):
+        plan_id = uuid.uuid4().hex
+        cache.set(_plan_key(plan_id), {
+            'date': route_date,
+            'depot_id': result['depot']['id'],
+            'departure_minutes': scenario['options']['departure_minutes'],
+            'result': result,
+        }, PLAN_TTL)
+        plans.append({'plan_id': plan_id, 'label': scenario['label'], 'result': result})
+    return plans
+
+
+def commit_plan(plan_id: str) -> Tuple[Dict, List[DeliveryRoute]]:
+    """
+    Save a compared plan as the day's routes. A plan can be committed once.
+
+    Raises:
+        PlanError: Plan expired or already committed, its depot is gone or
+            its deliveries are no longer waiting for the plan's date
+
+    Returns:
+        Tuple of (solver result, saved routes)
+    """
+    key = _plan_key(plan_id)
+    plan = cache.get(key)
+    # Whoever removes the plan from the cache commits it
+    if plan is None or not cache.delete(key):
+        raise PlanError('Plan bulunamadı veya süresi doldu')
+
+    try:
+        delivery_ids = plan_delivery_ids(plan['result'])
+        waiting = sum(
+            Delivery.objects.filter(id__in=chunk, status='WAITING', scheduled_date=plan['date']).count()
+            for chunk in _chunks(delivery_ids)
+        )
+        if waiting != len(delivery_ids):
+            raise PlanError('Plan oluşturulduktan sonra teslimatlar değişti, karşılaştırmayı yenileyin')
+        try:
+            depot = DepotLocation.objects.get(pk=plan['depot_id'])
+        except DepotLocation.DoesNotExist:
+            raise PlanError('Planın deposu bulunamadı')
+
+        routes = save_optimized_routes(
+            result_routes(plan['result']), depot, plan['date'], plan['departure_minutes']
+        )
+    except Exception:
+        cache.set(key, plan, PLAN_TTL)
+        raise
+    return plan['result'], routes
@@ -0,0 +1,229 @@
+"""
+Stop schedule (ETA) pipeline for saved delivery routes.
+
+Arrival times are computed per route with route_optimizer.schedule_arrivals
+using speed / service-time profiles from settings.ROUTE_SCHEDULE_PROFILES:
+
+    ROUTE_SCHEDULE_PROFILES = {
+        'speed_kmh': 40,
+        'service_minutes': 10,
+        'districts': {'Lefkoşa': {'speed_kmh': 30, 'service_minutes': 12}},
+        'hourly_speed_factor': {8: 0.7, 17: 0.75},   # rush hours
+    }
+
+Results are stored in bulk on DeliveryRouteStop (estimated_arrival,
+duration_from_previous_min), Delivery.eta_minutes (minutes after the
+route's departure) and DeliveryRoute.total_duration_min. Every save bumps
+the route version and stamps the rescheduled stops (services/route_bundle.py).
+"""
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from products.models import Delivery, DeliveryRoute, DeliveryRouteStop
+from products.services.route_bundle import bump_versions
+from products.services.route_optimizer import (
+    DEFAULT_AVG_SPEED_KMH, DEFAULT_DEPARTURE_MINUTES, DEFAULT_SERVICE_TIME_MINUTES,
+    TravelModel, format_minutes, schedule_arrivals
+)
+
+BATCH_SIZE = 500
+
+# Largest delay (either direction) a driver can report for one stop
+MAX_DELAY_MINUTES = 24 * 60
+
+
+class ScheduleProfile(TravelModel):
+    """
+    TravelModel configured from settings.ROUTE_SCHEDULE_PROFILES. The route
+    optimize / compare views hand the same profile to the time-window
+    solver, so planned and stored arrival times agree.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        config = config if config is not None else getattr(settings, 'ROUTE_SCHEDULE_PROFILES', {})
+        super().__init__(
+            speed_kmh=config.get('speed_kmh', DEFAULT_AVG_SPEED_KMH),
+            service_minutes=config.get('service_minutes', DEFAULT_SERVICE_TIME_MINUTES),
+            districts=config.get('districts', {}),
+            hourly_speed_factor=config.get('hourly_speed_factor'),
+        )
+
+
+def _midnight(route_date) -> datetime:
+    return timezone.make_aware(datetime.combine(route_date, time.min))
+
+
+def _minutes_since_midnight(value: datetime, route_date) -> float:
+    return (value - _midnight(route_date)).total_seconds() / 60
+
+
+def _stop_district(stop) -> Optional[str]:
+    assignment = stop.delivery.assignment
+    district = assignment.customer.district if assignment and assignment.customer else None
+    return district.name if district else None
+
+
+def _ready_minutes(delivery) -> float:
+    start = delivery.time_window_start
+    return start.hour * 60 + start.minute if start else np.nan
+
+
+def _load_stops(route_ids, from_order: Optional[int] = None) -> Dict[int, List[DeliveryRouteStop]]:
+    stops = DeliveryRouteStop.objects.filter(route_id__in=route_ids).select_related(
+        'delivery__assignment__customer__district'
+    ).order_by('route_id', 'stop_order')
+    if from_order is not None:
+        stops = stops.filter(stop_order__gte=from_order)
+    by_route: Dict[int, List[DeliveryRouteStop]] = {route_id: [] for route_id in route_ids}
+    for stop in stops:
+        by_route[stop.route_id].append(stop)
+    return by_route
+
+
+def _apply(route: DeliveryRoute, stops: List[DeliveryRouteStop], start_minutes: float, profile: ScheduleProfile):
+    """Compute arrivals for `stops` departing at start_minutes and set them on the objects."""
+    districts = [_stop_district(stop) for stop in stops]
+    arrivals, legs = schedule_arrivals(
+        [float(stop.distance_from_previous_km or 0) for stop in stops],
+        start_minutes,
+        speeds_kmh=[profile.speed_for(d) for d in districts],
+        service_minutes=[profile.service_for(d) for d in districts],
+        ready=[_ready_minutes(stop.delivery) for stop in stops],
+        hourly_speed_factor=profile.hourly_speed_factor,
+    )
+    midnight = _midnight(route.date)
+    departure = _minutes_since_midnight(route.planned_departure, route.date)
+    for stop, arrival, leg in zip(stops, arrivals, legs):
+        stop.estimated_arrival = midnight + timedelta(minutes=float(arrival))
+        stop.duration_from_previous_min = int(round(leg))
+        stop.delivery.eta_minutes = int(round(arrival - departure))
+    if stops:
+        finish = arrivals[-1] + profile.service_for(districts[-1])
+        route.total_duration_min = int(round(finish - departure))
+
+
+def _save(routes: List[DeliveryRoute], stops: List[DeliveryRouteStop]):
+    versions = bump_versions([route.pk for route in routes])
+    for route in routes:
+        route.version = versions[route.pk]
+    for stop in stops:
+        stop.version = versions[stop.route_id]
+    DeliveryRouteStop.objects.bulk_update(
+        stops, ['estimated_arrival', 'duration_from_previous_min', 'version'], batch_size=BATCH_SIZE
+    )
+    Delivery.objects.bulk_update([stop.delivery for stop in stops], ['eta_minutes'], batch_size=BATCH_SIZE)
+    DeliveryRoute.objects.bulk_update(routes, ['planned_departure', 'total_duration_min'], batch_size=BATCH_SIZE)
+
+
+def compute_schedules(
+    routes: List[DeliveryRoute],
+    departure_minutes: Optional[float] = None,
+    profile: Optional[ScheduleProfile] = None
+) -> Dict[int, List[DeliveryRouteStop]]:
+    """
+    Recompute and store the full schedule of the given routes.
+
+    Args:
+        routes: Saved routes
+        departure_minutes: New depot departure (minutes since midnight);
+            defaults to each route's planned_departure or 09:00
+
+    Returns:
+        Stops per route id, with the new arrival times
+    """
+    profile = profile or ScheduleProfile()
+    by_route = _load_stops([route.pk for route in routes])
+    for route in routes:
+        if departure_minutes is not None:
+            route.planned_departure = _midnight(route.date) + timedelta(minutes=departure_minutes)
+        elif route.planned_departure is None:
+            route.planned_departure = _midnight(route.date) + timedelta(minutes=DEFAULT_DEPARTURE_MINUTES)
+        _apply(route, by_route[route.pk], _minutes_since_midnight(route.planned_departure, route.date), profile)
+
+    _save(routes, [stop for stops in by_route.values() for stop in stops])
+    return by_route
+
+
+def apply_delay(
+    route: DeliveryRoute,
+    stop: DeliveryRouteStop,
+    delay_minutes: float,
+    profile: Optional[ScheduleProfile] = None
+) -> List[DeliveryRouteStop]:
+    """
+    Shift `stop` by delay_minutes and recompute only the stops after it.
+
+    Returns:
+        The updated stops (`stop` and everything downstream)
+    """
+    profile = profile or ScheduleProfile()
+    if route.planned_departure is None or stop.estimated_arrival is None:
+        compute_schedules([route], profile=profile)
+        stop.refresh_from_db()
+
+    stops = _load_stops([route.pk], from_order=stop.stop_order)[route.pk]
+    first, downstream = stops[0], stops[1:]
+    arrival = _minutes_since_midnight(first.estimated_arrival, route.date) + delay_minutes
+    departure = _minutes_since_midnight(route.planned_departure, route.date)
+
+    first.estimated_arrival = _midnight(route.date) + timedelta(minutes=arrival)
+    first.delivery.eta_minutes = int(round(arrival - departure))
+    route.total_duration_min = int(round(arrival + profile.service_for(_stop_district(first)) - departure))
+    _apply(route, downstream, arrival + profile.service_for(_stop_district(first)), profile)
+
+    _save([route], stops)
+    return stops
+
+
+def reschedule_from(
+    route: DeliveryRoute,
+    stop_order: int,
+    profile: Optional[ScheduleProfile] = None
+) -> List[DeliveryRouteStop]:
+    """
+    Recompute arrivals from stop_order onwards, keeping earlier stops as
+    they are (after a stop was inserted or removed at that position).
+
+    Returns:
+        The updated stops
+    """
+    profile = profile or ScheduleProfile()
+    if route.planned_departure is None:
+        return compute_schedules([route], profile=profile)[route.pk]
+
+    stops = _load_stops([route.pk], from_order=stop_order - 1)[route.pk]
+    departure = _minutes_since_midnight(route.planned_departure, route.date)
+    start = departure
+    if stops and stops[0].stop_order < stop_order:
+        previous, stops = stops[0], stops[1:]
+        if previous.estimated_arrival is None:
+            return compute_schedules([route], profile=profile)[route.pk]
+        start = _minutes_since_midnight(previous.estimated_arrival, route.date) + profile.service_for(
+            _stop_district(previous)
+        )
+
+    route.total_duration_min = int(round(start - departure))
+    _apply(route, stops, start, profile)
+    _save([route], stops)
+    return stops
+
+
+def schedule_payload(stops: List[DeliveryRouteStop]) -> List[Dict]:
+    """API representation of scheduled stops."""
+    rows = []
+    for stop in stops:
+        arrival = timezone.localtime(stop.estimated_arrival) if stop.estimated_arrival else None
+        rows.append({
+            'stop_order': stop.stop_order,
+            'delivery_id': stop.delivery_id,
+            'distance_from_previous_km': float(stop.distance_from_previous_km or 0),
+            'duration_from_previous_min': stop.duration_from_previous_min,
+            'estimated_arrival': arrival,
+            'arrival': format_minutes(arrival.hour * 60 + arrival.minute) if arrival else None,
+            'eta_minutes': stop.delivery.eta_minutes,
+        })
+    return rows
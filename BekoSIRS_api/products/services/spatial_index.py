@@ -0,0 +1,201 @@
+"""
+Grid-cell spatial index for customers, deliveries and depots.
+
+Every model in SPATIAL_FIELDS carries an indexed `geo_cell` column holding
+the fixed lat/lng grid cell of its coordinates ("row:col", cells of
+GEO_CELL_DEGREES). The column is kept up to date by a pre_save signal
+(products/signals.py); rows written with bulk_create / bulk_update /
+QuerySet.update can be re-indexed with `manage.py rebuild_geo_cells`.
+
+Area queries first narrow the queryset to the covering cells with an
+indexed `geo_cell IN (...)` lookup plus a coordinate range, then refine the
+candidates in Python with vectorized haversine (radius) or a point-in-polygon
+test.
+"""
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from products.models import CustomUser, Delivery, DepotLocation
+from products.services.route_optimizer import EARTH_RADIUS_KM, haversine_matrix
+
+# ~2.2 km north-south, ~1.8 km east-west at KKTC latitudes
+GEO_CELL_DEGREES = 0.02
+
+# Above this many covering cells the IN-list stops paying off (and must stay
+# well below the MSSQL 2100 parameter limit); only the coordinate range is used
+MAX_PREFILTER_CELLS = 400
+
+# model -> (latitude field, longitude field)
+SPATIAL_FIELDS = {
+    CustomUser: ('address_lat', 'address_lng'),
+    Delivery: ('address_lat', 'address_lng'),
+    DepotLocation: ('latitude', 'longitude'),
+}
+
+MAX_NEARBY_RESULTS = 500
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lng, max_lat, max_lng)
+
+
+def _cell_index(value: float) -> int:
+    return math.floor(value / GEO_CELL_DEGREES)
+
+
+def cell_for(lat, lng) -> Optional[str]:
+    """Grid cell id of a coordinate, None if it is missing."""
+    if lat is None or lng is None:
+        return None
+    return f"{_cell_index(float(lat))}:{_cell_index(float(lng))}"
+
+
+def assign_geo_cell(instance):
+    """Set instance.geo_cell from its coordinates (pre_save hook)."""
+    lat_field, lng_field = SPATIAL_FIELDS[type(instance)]
+    instance.geo_cell = cell_for(getattr(instance, lat_field), getattr(instance, lng_field))
+
+
+def cells_for_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> Optional[List[str]]:
+    """Cells covering a bounding box, or None if there are too many to list."""
+    rows = range(_cell_index(min_lat), _cell_index(max_lat) + 1)
+    cols = range(_cell_index(min_lng), _cell_index(max_lng) + 1)
+    if len(rows) * len(cols) > MAX_PREFILTER_CELLS:
+        return None
+    return [f"{row}:{col}" for row in rows for col in cols]
+
+
+def bbox_for_radius(lat: float, lng: float, radius_km: float) -> BBox:
+    """Bounding box that contains every point within radius_km of (lat, lng)."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    dlng = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - dlat, lng - dlng, lat + dlat, lng + dlng
+
+
+def within_bbox(queryset, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+    """Filter a queryset of a SPATIAL_FIELDS model to a bounding box."""
+    lat_field, lng_field = SPATIAL_FIELDS[queryset.model]
+    cells = cells_for_bbox(min_lat, min_lng, max_lat, max_lng)
+    if cells is not None:
+        queryset = queryset.filter(geo_cell__in=cells)
+    return queryset.filter(**{
+        f'{lat_field}__range': (min_lat, max_lat),
+        f'{lng_field}__range': (min_lng, max_lng),
+    })
+
+
+def _coordinates(objects, model) -> Tuple[np.ndarray, np.ndarray]:
+    lat_field, lng_field = SPATIAL_FIELDS[model]
+    lats = np.array([float(getattr(obj, lat_field)) for obj in objects])
+    lngs = np.array([float(getattr(obj, lng_field)) for obj in objects])
+    return lats, lngs
+
+
+def within_radius(queryset, lat: float, lng: float, radius_km: float, limit: Optional[int] = None) -> List:
+    """
+    Objects within radius_km of (lat, lng), nearest first.
+
+    Returns:
+        Model instances with a `distance_to_point_km` attribute
+    """
+    candidates = list(within_bbox(queryset, *bbox_for_radius(lat, lng, radius_km)))
+    if not candidates:
+        return []
+
+    lats, lngs = _coordinates(candidates, queryset.model)
+    distances = haversine_matrix(np.array([lat]), np.array([lng]), lats, lngs)[0]
+    order = np.argsort(distances, kind='stable')
+    order = order[distances[order] <= radius_km][:limit]
+
+    results = []
+    for index in order:
+        obj = candidates[index]
+        obj.distance_to_point_km = round(float(distances[index]), 3)
+        results.append(obj)
+    return results
+
+
+def points_in_polygon(lats: np.ndarray, lngs: np.ndarray, polygon: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Even-odd rule point-in-polygon test for many points; polygon is [(lat, lng), ...]."""
+    vertices = np.asarray(polygon, dtype=float)
+    inside = np.zeros(len(lats), dtype=bool)
+    for (lat1, lng1), (lat2, lng2) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        crosses = (lat1 > lats) != (lat2 > lats)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            edge_lng = lng1 + (lats - lat1) * (lng2 - lng1) / (lat2 - lat1)
+        inside ^= crosses & (lngs < edge_lng)
+    return inside
+
+
+def within_polygon(queryset, polygon: Sequence[Tuple[float, float]], limit: Optional[int] = None) -> List:
+    """Objects inside a polygon given as [(lat, lng), ...] vertices."""
+    vertices = np.asarray(polygon, dtype=float)
+    min_lat, min_lng = vertices.min(axis=0)
+    max_lat, max_lng = vertices.max(axis=0)
+    candidates = list(within_bbox(queryset, min_lat, min_lng, max_lat, max_lng))
+    if not candidates:
+        return []
+
+    lats, lngs = _coordinates(candidates, queryset.model)
+    mask = points_in_polygon(lats, lngs, vertices)
+    return [obj for obj, keep in zip(candidates, mask) if keep][:limit]
+
+
+def parse_area_params(params) -> Dict:
+    """
+    Read an area query from request parameters:
+    `lat, lng, radius_km`, `bbox=min_lat,min_lng,max_lat,max_lng` or
+    `polygon=lat,lng;lat,lng;...`, plus an optional `limit`.
+
+    Raises:
+        ValueError: With a user-facing (Turkish) message
+    """
+    try:
+        limit = min(max(int(params.get('limit', MAX_NEARBY_RESULTS)), 1), MAX_NEARBY_RESULTS)
+        if params.get('polygon'):
+            polygon = [tuple(float(v) for v in point.split(',')) for point in params['polygon'].split(';')]
+            if len(polygon) < 3 or any(len(point) != 2 for point in polygon):
+                raise ValueError
+            return {'polygon': polygon, 'limit': limit}
+        if params.get('bbox'):
+            bbox = tuple(float(v) for v in params['bbox'].split(','))
+            if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+                raise ValueError
+            return {'bbox': bbox, 'limit': limit}
+        lat, lng = float(params['lat']), float(params['lng'])
+        radius_km = float(params.get('radius_km', 5))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(
+            'lat, lng ve radius_km; bbox=min_lat,min_lng,max_lat,max_lng '
+            'veya polygon=lat,lng;lat,lng;... parametrelerinden biri gerekli'
+        )
+    if not 0 < radius_km <= 200:
+        raise ValueError('radius_km 0 ile 200 arasında olmalı')
+    return {'center': (lat, lng), 'radius_km': radius_km, 'limit': limit}
+
+
+def query_area(queryset, area: Dict) -> List:
+    """Run an area query produced by parse_area_params."""
+    if 'polygon' in area:
+        return within_polygon(queryset, area['polygon'], area['limit'])
+    if 'bbox' in area:
+        return list(within_bbox(queryset, *area['bbox'])[:area['limit']])
+    return within_radius(queryset, *area['center'], area['radius_km'], limit=area['limit'])
+
+
+def rebuild_geo_cells(model, batch_size: int = 1000) -> int:
+    """
+    Recompute geo_cell for every row of a SPATIAL_FIELDS model.
+
+    Returns:
+        Number of rows whose cell changed
+    """
+    lat_field, lng_field = SPATIAL_FIELDS[model]
+    changed = []
+    rows = model.objects.values_list('pk', lat_field, lng_field, 'geo_cell').order_by('pk')
+    for pk, lat, lng, current in rows.iterator(chunk_size=batch_size):
+        cell = cell_for(lat, lng)
+        if cell != current:
+            changed.append(model(pk=pk, geo_cell=cell))
+    model.objects.bulk_update(changed, ['geo_cell'], batch_size=batch_size)
+    return len(changed)
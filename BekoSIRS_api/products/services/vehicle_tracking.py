@@ -0,0 +1,320 @@
+"""
+Live vehicle tracking from batched GPS pings.
+
+The driver app posts pings in batches per route (one route is one truck for
+the day). For every batch:
+
+- the truck's latest position is stored in the cache, which is all a live
+  "where is my delivery" read needs;
+- the pings are appended to a process-local buffer that is bulk-inserted
+  into VehiclePing once it holds VEHICLE_PING_BUFFER['max_rows'] pings or
+  its oldest ping is 'max_age_seconds' old. Unless 'flush_timer' is off, a
+  timer flushes idle buffers; pending pings are flushed at exit.
+  Pings of routes deleted while they waited (re-optimization drops emptied
+  routes, see forget_routes) are dropped at flush time instead of failing
+  the whole insert.
+
+delivery_position() answers customer reads from the cache: the delivery ->
+route mapping is looked up once and cached for TRACKING_MAPPING_TTL seconds.
+Old pings are thinned out to one per interval by downsample_pings()
+(manage.py downsample_vehicle_pings).
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.models import Delivery, DeliveryRoute, VehiclePing
+
+logger = logging.getLogger(__name__)
+
+MAX_PINGS_PER_BATCH = 1000
+
+# 6 columns per row: one INSERT stays under MSSQL's 2100 parameters
+INSERT_BATCH_SIZE = 300
+
+# ids per DELETE when downsampling (IN-clause limit, see route_persistence)
+DELETE_BATCH_SIZE = 500
+
+# Cache lifetimes (seconds)
+POSITION_TTL = 6 * 60 * 60
+TRACKING_MAPPING_TTL = 60
+ROUTE_EXISTS_TTL = 60 * 60
+
+# (recorded_at, lat, lng, speed_kmh, heading)
+Ping = Tuple[datetime, float, float, Optional[float], Optional[int]]
+
+
+class PingError(ValueError):
+    """Raised for an invalid ping batch."""
+
+
+def _position_key(route_id: int) -> str:
+    return f'tracking:position:{route_id}'
+
+
+def _delivery_key(delivery_id: int) -> str:
+    return f'tracking:delivery:{delivery_id}'
+
+
+def _route_key(route_id: int) -> str:
+    return f'tracking:route:{route_id}'
+
+
+def _parse_time(value, default: datetime) -> datetime:
+    """Epoch seconds or ISO 8601; naive times are in the project time zone."""
+    if value in (None, ''):
+        return default
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(value)
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+def parse_pings(raw) -> List[Ping]:
+    """
+    Validate a batch of pings ({lat, lng, t, speed, heading}) and sort it by time.
+
+    Raises:
+        PingError: Batch is empty, too large or contains an invalid ping
+    """
+    if not isinstance(raw, list) or not raw:
+        raise PingError('pings boş olmayan bir liste olmalıdır')
+    if len(raw) > MAX_PINGS_PER_BATCH:
+        raise PingError(f'Tek istekte en fazla {MAX_PINGS_PER_BATCH} konum gönderilebilir')
+
+    now = timezone.now()
+    pings = []
+    for item in raw:
+        try:
+            lat, lng = float(item['lat']), float(item['lng'])
+            recorded_at = _parse_time(item.get('t'), now)
+            speed = float(item['speed']) if item.get('speed') is not None else None
+            heading = int(item['heading']) % 360 if item.get('heading') is not None else None
+        except (TypeError, KeyError, ValueError, AttributeError, OverflowError, OSError):
+            raise PingError('Geçersiz konum kaydı')
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise PingError('Koordinat aralık dışında')
+        pings.append((recorded_at, lat, lng, speed, heading))
+
+    pings.sort(key=lambda ping: ping[0])
+    return pings
+
+
+class PingBuffer:
+    """Thread-safe buffer of pings waiting for a bulk insert."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows: List[Tuple[int, datetime, float, float, Optional[float], Optional[int]]] = []
+        self.oldest: Optional[float] = None
+        self.timer: Optional[threading.Timer] = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, route_id: int, pings: Iterable[Ping]) -> int:
+        """
+        Buffer pings of a route; flush if the buffer is full or old enough.
+
+        Returns:
+            Number of pings written to the database by this call
+        """
+        config = settings.VEHICLE_PING_BUFFER
+        with self.lock:
+            if not self.rows:
+                self.oldest = time.monotonic()
+            self.rows.extend((route_id,) + tuple(ping) for ping in pings)
+            due = (
+                len(self.rows) >= config['max_rows']
+                or time.monotonic() - self.oldest >= config['max_age_seconds']
+            )
+            if not due and self.timer is None and config.get('flush_timer', True):
+                self.timer = threading.Timer(config['max_age_seconds'], self._flush_in_thread)
+                self.timer.daemon = True
+                self.timer.start()
+        return self.flush() if due else 0
+
+    def flush(self) -> int:
+        """Write all buffered pings. Returns the number of rows inserted."""
+        with self.lock:
+            rows, self.rows = self.rows, []
+            self.oldest = None
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        if not rows:
+            return 0
+        route_ids = list({row[0] for row in rows})
+        existing = set()
+        for start in range(0, len(route_ids), DELETE_BATCH_SIZE):
+            existing.update(DeliveryRoute.objects.filter(
+                pk__in=route_ids[start:start + DELETE_BATCH_SIZE]
+            ).values_list('pk', flat=True))
+        if len(existing) < len(route_ids):
+            gone = set(route_ids) - existing
+            logger.warning("Dropping pings of deleted routes %s", sorted(gone))
+            forget_routes(gone)
+            rows = [row for row in rows if row[0] in existing]
+        VehiclePing.objects.bulk_create(
+            [
+                VehiclePing(route_id=route_id, recorded_at=recorded_at, lat=lat, lng=lng, speed_kmh=speed, heading=heading)
+                for route_id, recorded_at, lat, lng, speed, heading in rows
+            ],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        return len(rows)
+
+    def _flush_in_thread(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Vehicle ping flush failed")
+        finally:
+            connections.close_all()
+
+
+ping_buffer = PingBuffer()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        ping_buffer.flush()
+    except Exception:
+        logger.exception("Vehicle ping flush at exit failed")
+
+
+def route_exists(route_id: int) -> bool:
+    """Route lookup for ping ingestion, cached so steady pinging does not hit the database."""
+    if cache.get(_route_key(route_id)):
+        return True
+    exists = DeliveryRoute.objects.filter(pk=route_id).exists()
+    if exists:
+        cache.set(_route_key(route_id), True, ROUTE_EXISTS_TTL)
+    return exists
+
+
+def forget_routes(route_ids: Iterable[int]):
+    """Drop cached route lookups and positions (after routes were deleted)."""
+    keys = []
+    for route_id in route_ids:
+        keys += [_route_key(route_id), _position_key(route_id)]
+    cache.delete_many(keys)
+
+
+def latest_position(route_id: int) -> Optional[Dict]:
+    return cache.get(_position_key(route_id))
+
+
+def record_pings(route_id: int, raw) -> Dict:
+    """
+    Ingest a batch of pings for a route.
+
+    Raises:
+        PingError: Invalid batch (see parse_pings)
+
+    Returns:
+        Dict with the accepted / flushed counts and the latest position
+    """
+    pings = parse_pings(raw)
+    recorded_at, lat, lng, speed, heading = pings[-1]
+    position = latest_position(route_id)
+    if position is None or position['recorded_at'] <= recorded_at:
+        position = {
+            'route_id': route_id,
+            'lat': lat,
+            'lng': lng,
+            'speed_kmh': speed,
+            'heading': heading,
+            'recorded_at': recorded_at,
+        }
+        cache.set(_position_key(route_id), position, POSITION_TTL)
+
+    flushed = ping_buffer.add(route_id, pings)
+    return {'accepted': len(pings), 'flushed': flushed, 'position': position}
+
+
+def forget_deliveries(delivery_ids: Iterable[int]):
+    """Drop cached tracking mappings (after a status or route change)."""
+    cache.delete_many([_delivery_key(delivery_id) for delivery_id in delivery_ids])
+
+
+def _tracking_mapping(delivery_id: int) -> Optional[Dict]:
+    mapping = cache.get(_delivery_key(delivery_id))
+    if mapping is None:
+        row = Delivery.objects.filter(pk=delivery_id).values(
+            'status', 'assignment__customer_id', 'route_stop__route_id',
+            'route_stop__stop_order', 'route_stop__estimated_arrival'
+        ).first()
+        if row is None:
+            return None
+        mapping = {
+            'status': row['status'],
+            'customer_id': row['assignment__customer_id'],
+            'route_id': row['route_stop__route_id'],
+            'stop_order': row['route_stop__stop_order'],
+            'estimated_arrival': row['route_stop__estimated_arrival'],
+        }
+        cache.set(_delivery_key(delivery_id), mapping, TRACKING_MAPPING_TTL)
+    return mapping
+
+
+def delivery_position(delivery_id: int, user) -> Optional[Dict]:
+    """
+    Where is my delivery: status, ETA and the truck's latest position.
+
+    Returns:
+        None if the delivery does not exist or does not belong to `user`
+        (staff see every delivery). The position is only given while the
+        delivery is OUT_FOR_DELIVERY.
+    """
+    mapping = _tracking_mapping(delivery_id)
+    if mapping is None or not (user.is_staff or mapping['customer_id'] == user.id):
+        return None
+
+    position = None
+    if mapping['status'] == 'OUT_FOR_DELIVERY' and mapping['route_id'] is not None:
+        position = latest_position(mapping['route_id'])
+    return {
+        'delivery_id': delivery_id,
+        'status': mapping['status'],
+        'stop_order': mapping['stop_order'],
+        'estimated_arrival': mapping['estimated_arrival'],
+        'position': position,
+    }
+
+
+def downsample_pings(older_than: timedelta, interval_seconds: int) -> int:
+    """
+    Keep one ping per route and `interval_seconds` for pings older than
+    `older_than`; routes are processed one at a time.
+
+    Returns:
+        Number of deleted pings
+    """
+    cutoff = timezone.now() - older_than
+    old = VehiclePing.objects.filter(recorded_at__lt=cutoff)
+    deleted = 0
+    for route_id in list(old.order_by().values_list('route_id', flat=True).distinct()):
+        redundant = []
+        last_bucket = None
+        pings = old.filter(route_id=route_id).order_by('recorded_at', 'id').values_list('id', 'recorded_at')
+        for ping_id, recorded_at in pings.iterator(chunk_size=2000):
+            bucket = int(recorded_at.timestamp() // interval_seconds)
+            if bucket == last_bucket:
+                redundant.append(ping_id)
+            last_bucket = bucket
+        for start in range(0, len(redundant), DELETE_BATCH_SIZE):
+            deleted += VehiclePing.objects.filter(id__in=redundant[start:start + DELETE_BATCH_SIZE]).delete()[0]
+    return deleted
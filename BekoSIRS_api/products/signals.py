@@ -1,10 +1,14 @@
 """
 Django signals for Products app.
 Auto-creates Delivery record when ProductAssignment is created.
+Keeps the spatial grid cell (geo_cell) of located models up to date.
+Keeps the cached unread notification counters up to date.
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from .models import ProductAssignment, Delivery, DepotLocation
+from .models import ProductAssignment, Delivery, DepotLocation, CustomUser, Notification
+from products.services import notification_counters
+from products.services.spatial_index import assign_geo_cell
 
 
 @receiver(post_save, sender=ProductAssignment)
@@ -45,3 +49,22 @@ def create_delivery_for_assignment(sender, instance, created, **kwargs):
             address_snapshot=formatted_address,
             status='WAITING'
         )
+
+
+@receiver(pre_save, sender=CustomUser)
+@receiver(pre_save, sender=Delivery)
+@receiver(pre_save, sender=DepotLocation)
+def update_geo_cell(sender, instance, **kwargs):
+    """Recompute the grid cell from the coordinates on every save."""
+    assign_geo_cell(instance)
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    """
+    New unread notifications raise the counter. Edits of saved rows are
+    reported by the code that makes them (notification_counters.notification_changed),
+    which knows the previous state without another query.
+    """
+    if created and not instance.is_read:
+        notification_counters.notifications_created([instance])
@@ -0,0 +1,127 @@
+"""
+Tests for the multi-day delivery planner.
+"""
+import time as clock
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import CustomUser, Delivery, ProductAssignment
+from products.services.day_planner import plan_days
+from .conftest import APITestCase
+
+# Lefkoşa, Girne, Gazimağusa
+CENTRES = [(35.1856, 33.3823), (35.3364, 33.3182), (35.1250, 33.9410)]
+
+
+def clustered_points(per_centre=30, seed=0):
+    rng = np.random.default_rng(seed)
+    points = np.vstack([rng.normal(centre, 0.01, size=(per_centre, 2)) for centre in CENTRES])
+    truth = np.repeat(np.arange(len(CENTRES)), per_centre)
+    order = rng.permutation(len(points))
+    return points[order], truth[order]
+
+
+class TestPlanDays:
+    def test_close_customers_share_a_day(self):
+        points, truth = clustered_points()
+        labels = plan_days(points[:, 0], points[:, 1], np.ones(len(points)), [30] * 5)
+
+        assert (labels >= 0).all()
+        assert set(labels) == {0, 1, 2}  # fewest days that fit
+        for centre in range(len(CENTRES)):
+            assert len(set(labels[truth == centre])) == 1
+
+    def test_capacity_is_respected(self):
+        points, _ = clustered_points()
+        demands = np.random.default_rng(1).integers(1, 4, size=len(points))
+        capacities = [45, 45, 45, 45, 20]
+        labels = plan_days(points[:, 0], points[:, 1], demands, capacities)
+
+        loads = np.bincount(labels[labels >= 0], weights=demands[labels >= 0], minlength=len(capacities))
+        assert (loads <= capacities).all()
+        assert (labels >= 0).all()
+
+    def test_time_window_limit_spreads_stops(self):
+        points, _ = clustered_points(per_centre=4)
+        buckets = np.zeros(len(points), dtype=int)  # all want the same window
+        labels = plan_days(points[:, 0], points[:, 1], np.ones(len(points)), [100] * 6, buckets, [3])
+
+        assert np.bincount(labels).max() <= 3
+        assert (labels >= 0).all()
+
+    def test_overflow_is_left_unplanned(self):
+        points, _ = clustered_points(per_centre=10)
+        labels = plan_days(points[:, 0], points[:, 1], np.ones(len(points)), [10, 10])
+        assert (labels >= 0).sum() == 20
+        assert (labels == -1).sum() == 10
+
+    def test_thousands_of_deliveries_in_seconds(self):
+        points, _ = clustered_points(per_centre=1000)
+        started = clock.perf_counter()
+        labels = plan_days(points[:, 0], points[:, 1], np.ones(len(points)), [400] * 10)
+        assert clock.perf_counter() - started < 5
+        assert (labels >= 0).all()
+
+
+class TestPlanDaysEndpoint(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+        self.deliveries = []
+        points, _ = clustered_points(per_centre=2)
+        for index, (lat, lng) in enumerate(points):
+            customer = CustomUser.objects.create(
+                username=f'plan_customer_{index}', role='customer',
+                address_lat=Decimal(str(round(lat, 6))), address_lng=Decimal(str(round(lng, 6)))
+            )
+            assignment = ProductAssignment.objects.create(customer=customer, product=self.product_fridge)
+            self.deliveries.append(assignment.delivery)
+        self.url = reverse('delivery-plan-days')
+        self.start = date.today() + timedelta(days=1)
+
+    def test_plan_is_written_in_bulk(self):
+        self.authenticate_admin()
+        response = self.client.post(self.url, {
+            'days': 5, 'vehicle_capacity': 2, 'start_date': str(self.start)
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['planned'] == 6
+        dates = dict(Delivery.objects.values_list('id', 'scheduled_date'))
+        assert set(dates.values()) == {self.start + timedelta(days=offset) for offset in range(3)}
+        assert set(ProductAssignment.objects.values_list('status', flat=True)) == {'SCHEDULED'}
+
+        # Planned deliveries are not picked up again
+        again = self.client.post(self.url, {'days': 5, 'vehicle_capacity': 2}, format='json')
+        assert again.data['planned'] == 0
+
+    def test_dry_run_and_windows(self):
+        for delivery in self.deliveries:
+            delivery.time_window_start, delivery.time_window_end = time(10, 0), time(10, 20)
+            delivery.save()
+
+        self.authenticate_admin()
+        response = self.client.post(self.url, {'days': 10, 'vehicle_capacity': 10, 'dry_run': True}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        # One 20-minute window: one stop per truck per day
+        assert [day['deliveries'] for day in response.data['days']][:6] == [1] * 6
+        assert not Delivery.objects.filter(scheduled_date__isnull=False).exists()
+
+    def test_validation(self):
+        self.authenticate_admin()
+        assert self.client.post(self.url, {'days': 5}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.post(self.url, {'days': 'x'}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command('plan_delivery_days', '--days', '3', '--capacity', '3', stdout=out)
+        assert '6 teslimat planlandı' in out.getvalue()
+        assert not Delivery.objects.filter(scheduled_date__isnull=True).exists()
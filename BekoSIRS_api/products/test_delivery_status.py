@@ -0,0 +1,108 @@
+"""
+Tests for bulk delivery status transitions.
+"""
+from unittest import mock
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import Delivery, DeliveryRoute, ProductAssignment
+from products.services.route_optimizer import RouteOptimizer
+from products.services.route_persistence import save_optimized_routes
+from .test_route_api import RouteAPITestCase
+
+
+class TestBulkDeliveryStatus(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.deliveries = self.create_deliveries()
+        self.ids = [d.id for d in self.deliveries]
+        self.url = reverse('delivery-bulk-status')
+
+    def test_close_out_day_in_few_queries(self):
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in self.deliveries]
+        result = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude)).optimize(data)
+        [route] = save_optimized_routes([result], self.depot, self.route_date)
+        version = route.version
+        Delivery.objects.filter(id__in=self.ids).update(status='OUT_FOR_DELIVERY')
+        self.authenticate_admin()
+
+        # read + delivery update + assignment update + route/stop version bumps
+        with self.assertNumQueries(9):
+            response = self.client.post(self.url, {'delivery_ids': self.ids, 'status': 'DELIVERED'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 6
+        assert response.data['by_status'] == {'DELIVERED': 6}
+        delivered = Delivery.objects.filter(id__in=self.ids, status='DELIVERED', delivered_by=self.admin_user)
+        assert delivered.exclude(delivered_at=None).count() == 6
+        assert set(ProductAssignment.objects.filter(delivery__in=self.ids).values_list('status', flat=True)) == {'DELIVERED'}
+        assert DeliveryRoute.objects.get(pk=route.pk).version > version
+
+    def test_mixed_updates_and_unchanged(self):
+        self.authenticate_admin()
+        updates = [
+            {'id': self.ids[0], 'status': 'OUT_FOR_DELIVERY'},
+            {'id': self.ids[1], 'status': 'FAILED'},
+            {'id': self.ids[2], 'status': 'WAITING'},
+        ]
+        response = self.client.post(self.url, {'updates': updates}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 2
+        assert response.data['unchanged_ids'] == [self.ids[2]]
+        statuses = dict(ProductAssignment.objects.filter(delivery__in=self.ids[:2]).values_list('delivery', 'status'))
+        assert statuses == {self.ids[0]: 'OUT_FOR_DELIVERY', self.ids[1]: 'SCHEDULED'}
+
+    def test_invalid_transition_changes_nothing(self):
+        Delivery.objects.filter(pk=self.ids[0]).update(status='DELIVERED')
+        self.authenticate_admin()
+        updates = [
+            {'id': self.ids[0], 'status': 'WAITING'},
+            {'id': self.ids[1], 'status': 'DELIVERED'},
+            {'id': 999999, 'status': 'DELIVERED'},
+        ]
+        response = self.client.post(self.url, {'updates': updates}, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert {error['id'] for error in response.data['errors']} == {self.ids[0], 999999}
+        assert Delivery.objects.get(pk=self.ids[1]).status == 'WAITING'
+
+    def test_concurrent_change_is_detected(self):
+        from django.utils import timezone
+        from products.services.delivery_status import StatusTransitionError, bulk_transition
+
+        now = timezone.now()
+
+        def change_concurrently():
+            # another request fails one delivery after the batch was validated
+            Delivery.objects.filter(pk=self.ids[0]).update(status='FAILED')
+            return now
+
+        # FAILED may also move to OUT_FOR_DELIVERY: only the status that was read may match
+        with mock.patch('products.services.delivery_status.timezone.now', side_effect=change_concurrently):
+            with pytest.raises(StatusTransitionError):
+                bulk_transition({delivery_id: 'OUT_FOR_DELIVERY' for delivery_id in self.ids[:3]})
+        assert list(Delivery.objects.filter(id__in=self.ids[:3]).values_list('status', flat=True).order_by('id')) == [
+            'FAILED', 'WAITING', 'WAITING'
+        ]
+
+    def test_bad_payloads(self):
+        self.authenticate_admin()
+        assert self.client.post(self.url, {}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        unknown = {'delivery_ids': self.ids, 'status': 'LOST'}
+        assert self.client.post(self.url, unknown, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        twice = {'updates': [{'id': self.ids[0], 'status': 'FAILED'}, {'id': self.ids[0], 'status': 'DELIVERED'}]}
+        assert self.client.post(self.url, twice, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+        self.authenticate_customer()
+        response = self.client.post(self.url, {'delivery_ids': self.ids, 'status': 'DELIVERED'}, format='json')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_patch_keeps_assignment_in_sync(self):
+        self.authenticate_admin()
+        self.client.patch(reverse('delivery-detail', kwargs={'pk': self.ids[0]}), {'status': 'OUT_FOR_DELIVERY'},
+                          format='json')
+        assert ProductAssignment.objects.get(delivery=self.ids[0]).status == 'OUT_FOR_DELIVERY'
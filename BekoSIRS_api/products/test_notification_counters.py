@@ -0,0 +1,147 @@
+"""
+Tests for the cached per-user unread notification counters.
+"""
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import Notification
+from products.services import notification_counters, notification_stats, notification_stream
+from products.services.notification_fanout import send_bulk_notification
+from .conftest import APITestCase
+
+
+class TestUnreadCounters(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.count_url = reverse('notification-unread-count')
+
+    def notify(self, count=1, user=None):
+        return [
+            Notification.objects.create(user=user or self.customer_user, title=f'Bildirim {i}', message='Mesaj')
+            for i in range(count)
+        ]
+
+    def unread(self):
+        return self.client.get(self.count_url).data['count']
+
+    def test_count_is_served_from_cache(self):
+        self.notify(2)
+        self.authenticate_customer()
+        assert self.unread() == 2
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.count_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 2
+
+        self.notify(3)
+        with self.assertNumQueries(0):
+            assert self.unread() == 5
+
+    def test_read_and_delete_paths(self):
+        first, second, third, fourth = self.notify(4)
+        self.authenticate_customer()
+        assert self.unread() == 4
+
+        read_url = reverse('notification-mark-as-read', args=[first.id])
+        self.client.post(read_url)
+        self.client.post(read_url)  # already read: no double decrement
+        assert self.unread() == 3
+
+        self.client.delete(reverse('notification-delete-notification', args=[second.id]))
+        self.client.delete(reverse('notification-delete-notification', args=[first.id]))  # was read
+        assert self.unread() == 2
+
+        self.client.post(reverse('notification-mark-all-read'))
+        assert self.unread() == 0
+
+        self.notify(2)
+        assert self.unread() == 2
+        self.client.delete(reverse('notification-clear-all'))
+        assert self.unread() == 0 == Notification.objects.filter(user=self.customer_user).count()
+
+    def test_bulk_paths_and_reconcile(self):
+        self.authenticate_customer()
+        assert self.unread() == 0
+
+        send_bulk_notification('Kampanya', 'İndirim', target='customers')
+        assert self.unread() == 1
+
+        # Drift (e.g. rows written behind the counter's back) is fixed by reconciliation
+        Notification.objects.bulk_create(
+            Notification(user=self.customer_user, title='Sessiz', message='Mesaj') for _ in range(3)
+        )
+        assert self.unread() == 1
+        out = StringIO()
+        call_command('reconcile_notification_counters', '--user', str(self.customer_user.id), stdout=out)
+        assert '1 kullanıcı sayacı güncellendi' in out.getvalue()
+        assert self.unread() == 4
+
+        call_command('reconcile_notification_counters', stdout=StringIO())
+        assert self.unread() == 4
+
+    def test_edits_only_touch_the_counter_when_is_read_flips(self):
+        first, _ = self.notify(2)
+        user_id = self.customer_user.id
+        self.authenticate_customer()
+        url = reverse('notification-detail', args=[first.id])
+        assert self.unread() == 2
+        version = notification_stream.current_version(user_id)
+
+        # A plain save costs its UPDATE only
+        first.title = 'İç düzenleme'
+        with self.assertNumQueries(1):
+            first.save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {'title': 'Düzenlendi'}, format='json')
+        with self.assertNumQueries(0):
+            assert notification_counters.unread_count(user_id) == 2
+        assert notification_stream.current_version(user_id) == version
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {'is_read': True}, format='json')
+        with self.assertNumQueries(0):
+            assert notification_counters.unread_count(user_id) == 1
+        assert notification_stream.current_version(user_id) > version
+
+        self.client.patch(url, {'is_read': False}, format='json')
+        with self.assertNumQueries(0):
+            assert notification_counters.unread_count(user_id) == 2
+
+        self.client.delete(url)
+        with self.assertNumQueries(0):
+            assert notification_counters.unread_count(user_id) == 1
+
+    def test_edits_keep_the_statistics_snapshot(self):
+        first, _ = self.notify(2)
+        self.authenticate_customer()
+        url = reverse('notification-detail', args=[first.id])
+        assert notification_stats.notification_stats()['unread'] == 2
+
+        self.client.patch(url, {'title': 'Düzenlendi'}, format='json')
+        with self.assertNumQueries(0):
+            stats = notification_stats.notification_stats()
+        assert (stats['total'], stats['read'], stats['unread']) == (2, 0, 2)
+
+        self.client.patch(url, {'is_read': True}, format='json')
+        with self.assertNumQueries(0):
+            stats = notification_stats.notification_stats()
+        assert (stats['read'], stats['unread']) == (1, 1)
+
+        # Moving a row to another user and type (admin) adjusts the snapshot in place
+        first.refresh_from_db()
+        previous = notification_counters.notification_state(first)
+        first.user = self.seller_user
+        first.notification_type = 'restock'
+        first.save()
+        notification_counters.notification_changed(previous, first)
+        with self.assertNumQueries(0):
+            stats = notification_stats.notification_stats()
+        assert stats == notification_stats.compute_stats()
+        assert notification_counters.unread_count(self.seller_user.id) == 0
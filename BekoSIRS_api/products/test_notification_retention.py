@@ -0,0 +1,88 @@
+"""
+Tests for the notification retention purge.
+"""
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from products.models import Notification
+from products.services import notification_counters
+from products.services.notification_retention import purge_notifications
+from .conftest import APITestCase
+
+
+class TestNotificationRetention(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+
+    def notification(self, days_old, is_read=True, notification_type='general', title='Bildirim'):
+        notification = Notification.objects.create(
+            user=self.customer_user, title=title, message='Mesaj',
+            notification_type=notification_type, is_read=is_read,
+        )
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(days=days_old))
+        return notification
+
+    def test_purges_expired_rows_into_archive(self):
+        expired = [
+            self.notification(100),                                        # read general > 90 days
+            self.notification(70, notification_type='recommendation'),     # read recommendation > 60 days
+            self.notification(400, is_read=False),                         # unread > 365 days
+        ]
+        kept = [
+            self.notification(10),
+            self.notification(200, notification_type='service_update'),    # read, kept for 365 days
+            self.notification(200, is_read=False),                         # unread, kept for 365 days
+        ]
+        # Warm the unread counter so the purge has to drop it
+        assert notification_counters.unread_count(self.customer_user.id) == 2
+
+        out = StringIO()
+        call_command('purge_notifications', batch_size=1, archive_dir=self.archive_dir, stdout=out, verbosity=2)
+
+        remaining = set(Notification.objects.values_list('id', flat=True))
+        assert remaining == {n.id for n in kept}
+        assert notification_counters.unread_count(self.customer_user.id) == 1
+        assert '3 bildirim' in out.getvalue()
+        assert 'parti' in out.getvalue()
+
+        archives = [f for f in os.listdir(self.archive_dir) if f.endswith('.jsonl.gz')]
+        assert len(archives) == 1
+        with gzip.open(os.path.join(self.archive_dir, archives[0]), 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        assert sorted(row['id'] for row in rows) == sorted(n.id for n in expired)
+        assert {row['user_id'] for row in rows} == {self.customer_user.id}
+
+    def test_dry_run_and_empty_purge(self):
+        self.notification(100)
+        out = StringIO()
+        call_command('purge_notifications', dry_run=True, stdout=out)
+        assert '1 bildirim' in out.getvalue()
+        assert Notification.objects.count() == 1
+
+        Notification.objects.all().delete()
+        totals = purge_notifications(archive_dir=self.archive_dir)
+        assert totals['deleted'] == 0 and totals['archive_path'] is None
+
+    def test_batches_walk_primary_key_windows(self):
+        for _ in range(5):
+            self.notification(100)
+        self.notification(1)
+
+        batches = []
+        totals = purge_notifications(batch_size=2, archive=False, on_batch=lambda t: batches.append(t['deleted']))
+        assert totals['deleted'] == 5
+        assert batches == [2, 4, 5]
+        assert totals['archive_path'] is None
+        assert Notification.objects.count() == 1
@@ -0,0 +1,80 @@
+"""
+Tests for the cached notification statistics and the dashboard summary.
+"""
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import Notification, Product, Review
+from products.services.notification_fanout import send_bulk_notification
+from products.services.notification_stats import compute_stats
+from .conftest import APITestCase
+
+
+class TestNotificationStats(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.stats_url = reverse('notification-stats')
+
+    def stats(self):
+        return self.client.get(self.stats_url).data
+
+    def test_snapshot_is_one_query_then_cached(self):
+        Notification.objects.create(user=self.customer_user, title='A', message='m', notification_type='restock')
+        Notification.objects.create(user=self.customer_user, title='B', message='m', is_read=True)
+        self.authenticate_admin()
+
+        with self.assertNumQueries(1):
+            stats = self.stats()
+        assert stats == {
+            'total': 2, 'read': 1, 'unread': 1,
+            'by_type': {'general': 1, 'price_drop': 0, 'restock': 1, 'service_update': 0,
+                        'recommendation': 0, 'warranty_expiry': 0},
+        }
+        with self.assertNumQueries(0):
+            assert self.stats() == stats
+
+    def test_writes_keep_snapshot_current(self):
+        self.authenticate_admin()
+        self.stats()
+
+        first = Notification.objects.create(user=self.customer_user, title='A', message='m')
+        send_bulk_notification('Kampanya', 'İndirim', target='all')
+        expected = compute_stats()
+        with self.assertNumQueries(0):
+            assert self.stats() == expected
+
+        self.authenticate_customer()
+        self.client.post(reverse('notification-mark-as-read', args=[first.id]))
+        self.client.post(reverse('notification-mark-all-read'))
+        other = Notification.objects.create(user=self.customer_user, title='C', message='m', notification_type='restock')
+        self.client.delete(reverse('notification-delete-notification', args=[other.id]))
+        self.authenticate_admin()
+        expected = compute_stats()
+        with self.assertNumQueries(0):
+            assert self.stats() == expected
+
+        self.authenticate_customer()
+        self.client.delete(reverse('notification-clear-all'))
+        self.authenticate_admin()
+        assert self.stats() == compute_stats()
+
+    def test_customers_cannot_read_stats(self):
+        self.authenticate_customer()
+        assert self.client.get(self.stats_url).status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestDashboardSummary(APITestCase):
+    def test_summary_uses_one_query_per_table(self):
+        Review.objects.create(customer=self.customer_user, product=self.product_fridge, rating=4, is_approved=True)
+        Review.objects.create(customer=self.customer_user, product=self.product_tv, rating=1)
+        self.authenticate_admin()
+
+        with self.assertNumQueries(6):
+            response = self.client.get(reverse('dashboard-summary'))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['products']['total'] == Product.objects.count()
+        assert response.data['reviews'] == {'pending_approval': 1, 'average_rating': 4.0}
+        assert set(response.data['service_requests']) == {'pending', 'in_progress', 'completed'}
@@ -0,0 +1,102 @@
+"""
+Tests for the notification push channel: long-poll and SSE stream.
+"""
+import json
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from products.models import Notification
+from products.services import notification_stream
+from .conftest import APITestCase
+
+STREAM = {'poll_interval': 0.05, 'heartbeat_seconds': 0.2, 'max_stream_seconds': 5, 'long_poll_timeout': 2}
+
+
+@override_settings(NOTIFICATION_STREAM=STREAM)
+class TestNotificationPush(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.poll_url = reverse('notification-poll')
+        self.stream_url = reverse('notification-stream')
+
+    def notify(self, title='Yeni'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(user=self.customer_user, title=title, message='Mesaj')
+
+    def test_long_poll_returns_pending_notifications_at_once(self):
+        seen = self.notify('Eski')
+        new = self.notify('Yeni')
+        self.authenticate_customer()
+
+        response = self.client.get(self.poll_url, {'after_id': seen.id, 'timeout': 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert [n['id'] for n in response.data['notifications']] == [new.id]
+        assert response.data['last_id'] == new.id
+        assert response.data['unread_count'] == 2
+
+    def test_long_poll_waits_for_a_change(self):
+        self.notify()
+        self.authenticate_customer()
+
+        started = time.monotonic()
+        response = self.client.get(self.poll_url, {'timeout': 0.3})
+        assert time.monotonic() - started >= 0.3
+        assert response.data['notifications'] == []
+
+        # A publish from another thread wakes the waiting request early
+        threading.Timer(0.1, notification_stream._bump, args=([self.customer_user.id],)).start()
+        started = time.monotonic()
+        self.client.get(self.poll_url, {'timeout': 2})
+        assert time.monotonic() - started < 1.5
+
+        assert self.client.get(self.poll_url, {'after_id': 'x'}).status_code == status.HTTP_400_BAD_REQUEST
+
+    @override_settings(NOTIFICATION_STREAM={**STREAM, 'long_poll_timeout': 0.3})
+    def test_long_poll_wait_is_capped(self):
+        # the wait holds a sync worker: a client cannot ask for more than the setting
+        self.authenticate_customer()
+        started = time.monotonic()
+        response = self.client.get(self.poll_url, {'timeout': 60})
+        assert response.status_code == status.HTTP_200_OK
+        assert time.monotonic() - started < 1.5
+
+    def test_read_all_is_published(self):
+        self.notify()
+        version = notification_stream.current_version(self.customer_user.id)
+        self.authenticate_customer()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notification-mark-all-read'))
+        assert notification_stream.current_version(self.customer_user.id) > version
+
+    async def test_sse_stream_pushes_new_notifications(self):
+        refresh = await sync_to_async(RefreshToken.for_user)(self.customer_user)
+        token = str(refresh.access_token)
+        unauthorized = await self.async_client.get(self.stream_url)
+        assert unauthorized.status_code == 401
+
+        response = await self.async_client.get(self.stream_url, {'token': token})
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/event-stream'
+        events = response.streaming_content.__aiter__()
+
+        assert (await events.__anext__()).startswith(b'retry:')
+        first = json.loads((await events.__anext__()).decode().split('data: ', 1)[1])
+        assert first['notifications'] == [] and first['unread_count'] == 0
+
+        notification = await sync_to_async(self.notify)()
+        chunk = (await events.__anext__()).decode()
+        while chunk.startswith(':'):  # keep-alive
+            chunk = (await events.__anext__()).decode()
+        assert chunk.startswith(f'id: {notification.id}\n')
+        pushed = json.loads(chunk.split('data: ', 1)[1])
+        assert [n['id'] for n in pushed['notifications']] == [notification.id]
+        assert pushed['unread_count'] == 1
+        await events.aclose()
@@ -1,7 +1,12 @@
+import math
+from unittest import mock
+
 import pytest
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
-from products.models import Notification
+from products.models import CustomUser, Notification
+from products.services.notification_fanout import send_bulk_notification
 from .conftest import APITestCase
 
 @pytest.mark.django_db
@@ -76,3 +81,45 @@ class TestNotificationSystem(APITestCase):
         
         n1.refresh_from_db()
         assert n1.is_read is True
+
+
+@pytest.mark.django_db
+@override_settings(BACKGROUND_JOBS_MODE='sync')
+class TestBulkNotificationFanout(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.send_bulk_url = reverse('notification-send-bulk')
+        CustomUser.objects.bulk_create(
+            CustomUser(username=f'fanout_{i}', email=f'fanout_{i}@example.com', role='customer') for i in range(25)
+        )
+        CustomUser.objects.filter(username='fanout_0').update(notify_general=False)
+        self.recipients = CustomUser.objects.filter(role='customer', notify_general=True).count()
+
+    def test_inserts_in_fixed_size_batches(self):
+        with mock.patch('products.services.notification_fanout.INSERT_BATCH_SIZE', 10):
+            # one streamed SELECT of ids + one INSERT per batch
+            with self.assertNumQueries(1 + math.ceil(self.recipients / 10)):
+                sent = send_bulk_notification('Kampanya', 'İndirim', target='customers')
+
+        assert sent == self.recipients == Notification.objects.count()
+        assert not Notification.objects.filter(user__username='fanout_0').exists()
+
+    def test_stops_when_cancelled(self):
+        with mock.patch('products.services.notification_fanout.INSERT_BATCH_SIZE', 10):
+            sent = send_bulk_notification('Kampanya', 'İndirim', on_batch=lambda sent, total: True)
+        assert sent == Notification.objects.count() == 10
+
+    def test_async_send_returns_job(self):
+        self.authenticate_admin()
+        data = {'title': 'Kampanya!', 'message': 'Büyük indirim var.', 'target': 'all', 'async': True}
+        response = self.client.post(self.send_bulk_url, data, format='json')
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_url = reverse('notification-send-bulk-job', kwargs={'job_id': response.data['job_id']})
+        job = self.client.get(job_url).data
+        assert job['status'] == 'SUCCEEDED' and job['progress'] == 1.0
+        assert job['result']['count'] == Notification.objects.count()
+        assert Notification.objects.filter(user=self.admin_user).exists()
+
+        self.authenticate_customer()
+        assert self.client.get(job_url).status_code == status.HTTP_403_FORBIDDEN
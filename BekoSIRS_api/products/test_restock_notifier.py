@@ -0,0 +1,162 @@
+"""
+Tests for restock notifications to wishlist subscribers.
+"""
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import pandas as pd
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import CustomUser, Notification, Product, Wishlist, WishlistItem
+from products.services import notification_counters
+from products.services.restock_notifier import is_restock, notify_restocked
+from .conftest import APITestCase
+
+
+class TestRestockNotifier(APITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.bulk_url = reverse('product-bulk-stock')
+        WishlistItem.objects.create(wishlist=self.create_wishlist_for_customer(), product=self.product_tv)
+
+        self.opted_out = CustomUser.objects.create_user(username='opted_out', password='x', role='customer', notify_restock=False)
+        WishlistItem.objects.create(wishlist=Wishlist.objects.create(customer=self.opted_out), product=self.product_tv)
+        self.item_off = CustomUser.objects.create_user(username='item_off', password='x', role='customer')
+        WishlistItem.objects.create(
+            wishlist=Wishlist.objects.create(customer=self.item_off), product=self.product_tv, notify_on_restock=False
+        )
+
+    def restock_notifications(self):
+        return Notification.objects.filter(notification_type='restock')
+
+    def test_is_restock(self):
+        assert is_restock(0, 3)
+        assert not is_restock(2, 3)
+        assert not is_restock(0, 0)
+        assert not is_restock(3, 0)
+
+    def test_product_update_notifies_subscribers_once(self):
+        self.authenticate_admin()
+        assert notification_counters.unread_count(self.customer_user.id) == 0
+        url = reverse('product-detail', args=[self.product_tv.id])
+
+        response = self.client.patch(url, {'stock': 4}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        notification = self.restock_notifications().get()
+        assert notification.user == self.customer_user
+        assert notification.related_product == self.product_tv
+        assert notification_counters.unread_count(self.customer_user.id) == 1
+
+        # Stock flapping 0 -> 1 inside the debounce window stays quiet
+        self.client.patch(url, {'stock': 0}, format='json')
+        self.client.patch(url, {'stock': 1}, format='json')
+        assert self.restock_notifications().count() == 1
+
+        # Stock changes that are not a restock never notify
+        cache.clear()
+        self.client.patch(url, {'stock': 7}, format='json')
+        assert self.restock_notifications().count() == 1
+
+    def test_bulk_stock_notifies_restocked_products(self):
+        WishlistItem.objects.create(wishlist=self.customer_user.wishlist, product=self.product_washer)
+        Product.objects.filter(pk=self.product_washer.pk).update(stock=0)
+        self.authenticate_admin()
+
+        response = self.client.post(self.bulk_url, {'items': [
+            {'id': self.product_tv.id, 'stock': 3},
+            {'id': self.product_washer.id, 'stock': 2},
+            {'id': self.product_fridge.id, 'stock': 8},
+        ]}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {
+            'updated': 3,
+            'restocked': sorted([self.product_tv.id, self.product_washer.id]),
+            'notified': 2,
+        }
+        assert set(self.restock_notifications().values_list('user_id', 'related_product_id')) == {
+            (self.customer_user.id, self.product_tv.id), (self.customer_user.id, self.product_washer.id),
+        }
+        self.product_fridge.refresh_from_db()
+        assert self.product_fridge.stock == 8
+
+    def test_bulk_stock_validation(self):
+        self.authenticate_admin()
+        unknown = self.client.post(self.bulk_url, {'items': [{'id': self.product_tv.id, 'stock': 3}, {'id': 99999, 'stock': 1}]}, format='json')
+        assert unknown.status_code == status.HTTP_400_BAD_REQUEST
+        self.product_tv.refresh_from_db()
+        assert self.product_tv.stock == 0
+
+        assert self.client.post(self.bulk_url, {'items': [{'id': self.product_tv.id, 'stock': -1}]}, format='json').status_code == 400
+        assert self.client.post(self.bulk_url, {'items': 'x'}, format='json').status_code == 400
+
+        self.authenticate_customer()
+        assert self.client.post(self.bulk_url, {'items': []}, format='json').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_subscribers_are_read_in_one_query(self):
+        for i in range(3):
+            user = CustomUser.objects.create_user(username=f'sub{i}', password='x', role='customer')
+            WishlistItem.objects.create(wishlist=Wishlist.objects.create(customer=user), product=self.product_tv)
+
+        # one join query for the subscribers, one INSERT for the notifications
+        with self.assertNumQueries(2):
+            assert notify_restocked([self.product_tv]) == 4
+        with self.assertNumQueries(0):
+            assert notify_restocked([self.product_tv]) == 0
+
+    def import_sheet(self, rows):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'urunler.xlsx')
+            pd.DataFrame(rows).to_excel(path, header=False, index=False)
+            out = StringIO()
+            call_command('import_products', '--file', path, stdout=out)
+        return out.getvalue()
+
+    def test_excel_import_without_stock_column_keeps_stock(self):
+        Product.objects.filter(pk=self.product_tv.pk).update(model_code='TV-55')
+        out = self.import_sheet([
+            ['EK GARANTİ KODU', 'Televizyonlar ve Buzdolapları', None, None, None, None, None, None],
+            ['-', 'TV-55', 'Televizyon', None, None, 21000, 20000, None],
+            ['-', 'YENI-1', 'Yeni ürün', None, None, 11000, 10000, 'Kampanya'],
+        ])
+
+        assert 'Successfully imported 2 products' in out
+        self.product_tv.refresh_from_db()
+        assert self.product_tv.stock == 0
+        assert Product.objects.get(model_code='YENI-1').stock == 10
+        assert not self.restock_notifications().exists()
+
+    def test_excel_import_notifies_restocked_products(self):
+        Product.objects.filter(pk=self.product_tv.pk).update(model_code='TV-55')
+        Product.objects.filter(pk=self.product_fridge.pk).update(model_code='BZ-70')
+        Product.objects.filter(pk=self.product_washer.pk).update(model_code='CM-9', stock=0)
+        WishlistItem.objects.create(wishlist=self.customer_user.wishlist, product=self.product_washer)
+        out = self.import_sheet([
+            ['EK GARANTİ KODU', 'Televizyonlar ve Buzdolapları', None, None, None, None, None, None, None],
+            ['EK GARANTİ KODU', 'Model', 'Açıklama', None, None, 'Liste', 'Peşin Fiyat', 'Kampanya', 'Stok'],
+            ['-', 'TV-55', 'Televizyon', None, None, 21000, 20000, None, 4],
+            ['-', 'BZ-70', 'Buzdolabı', None, None, 31000, 30000, None, 12],
+            ['-', 'CM-9', 'Çamaşır makinesi', None, None, 16000, 15000, None, None],
+        ])
+
+        assert 'Successfully imported 3 products' in out
+        self.product_tv.refresh_from_db()
+        assert self.product_tv.stock == 4
+        # only the product the sheet brought back in stock notifies its subscribers
+        notification = self.restock_notifications().get()
+        assert (notification.user, notification.related_product) == (self.customer_user, self.product_tv)
+        assert '1 products back in stock, 1 restock notifications sent' in out
+        assert Product.objects.get(pk=self.product_washer.pk).stock == 0
+
+    def test_failed_send_does_not_debounce(self):
+        with mock.patch('products.services.restock_notifier.Notification.objects.bulk_create', side_effect=RuntimeError):
+            with pytest.raises(RuntimeError):
+                notify_restocked([self.product_tv])
+        assert notify_restocked([self.product_tv]) == 1
@@ -0,0 +1,712 @@
+"""
+API tests for delivery route optimization endpoints.
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from products.models import (
+    BackgroundJob, CustomUser, Delivery, District, DeliveryRoute, DeliveryRouteStop, DepotLocation, DistanceCacheEntry, ProductAssignment
+)
+from products.services.distance_cache import CachedDistanceProvider, get_distance_provider, purge_stale
+from products.services.jobs import run_job, run_pending_jobs
+from products.services.polyline import decode_polyline
+from products.services.route_bundle import route_bundle
+from products.services.road_network import RoadNetworkDistanceProvider
+from products.services.route_optimizer import HaversineDistanceProvider, RouteOptimizer, haversine_matrix
+from products.services.route_persistence import save_optimized_routes
+from .conftest import APITestCase
+
+# (lat, lng) pairs around Lefkoşa / Girne
+STOP_COORDS = [
+    (35.1900, 33.3850),
+    (35.3323, 33.3184),
+    (35.2100, 33.3500),
+    (35.1700, 33.4200),
+    (35.3000, 33.3300),
+    (35.2000, 33.3000),
+]
+
+
+class RouteAPITestCase(APITestCase):
+    """Shared setup: staff admin, default depot and WAITING deliveries for today."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+        self.route_date = date.today()
+        self.depot = DepotLocation.objects.create(
+            name='Lefkoşa Ana Depo',
+            latitude=Decimal('35.1856'),
+            longitude=Decimal('33.3823'),
+            is_default=True
+        )
+
+    def create_deliveries(self, coords=STOP_COORDS, quantity=1):
+        deliveries = []
+        for index, (lat, lng) in enumerate(coords):
+            customer = CustomUser.objects.create_user(
+                username=f'route_customer_{index}',
+                password='Pass12345!',
+                role='customer',
+                address_lat=Decimal(str(lat)),
+                address_lng=Decimal(str(lng))
+            )
+            assignment = ProductAssignment.objects.create(
+                customer=customer, product=self.product_fridge, quantity=quantity
+            )
+            delivery = assignment.delivery  # created by signal
+            delivery.scheduled_date = self.route_date
+            delivery.save()
+            deliveries.append(delivery)
+        return deliveries
+
+
+@pytest.mark.django_db
+class TestOptimizeEndpoint(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.optimize_url = reverse('delivery-route-optimize')
+
+    def test_optimize_with_local_search_reports_improvement(self):
+        deliveries = self.create_deliveries()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'or_opt'
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['algorithm'] == 'or_opt'
+        assert response.data['total_km'] <= response.data['baseline_km']
+        assert response.data['delivery_count'] == len(deliveries)
+
+        orders = sorted(Delivery.objects.values_list('delivery_order', flat=True))
+        assert orders == list(range(1, len(deliveries) + 1))
+
+    def test_unknown_algorithm_is_rejected(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'genetic'
+        }, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'two_opt' in response.data['algorithms']
+
+    def test_rejects_malformed_delivery_ids(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+
+        for delivery_ids in (None, 5, 'abc', [1, 'x'], [1.5], [True]):
+            response = self.client.post(self.optimize_url, {
+                'date': str(self.route_date), 'delivery_ids': delivery_ids
+            }, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, delivery_ids
+
+        response = self.client.post(reverse('delivery-route-compare'), {
+            'date': str(self.route_date), 'delivery_ids': None, 'scenarios': [{'algorithm': 'nearest_neighbor'}]
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rejects_unbounded_time_limit(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+
+        for time_limit in (0, -1, 3600, 'nan'):
+            response = self.client.post(self.optimize_url, {
+                'date': str(self.route_date), 'algorithm': 'two_opt', 'time_limit': time_limit
+            }, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, time_limit
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'max_iterations': 0
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_multi_start_uses_time_budget(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'multi_start', 'time_limit': 0.2, 'workers': 1
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['workers'] == 1 and response.data['starts'] >= 1
+        assert response.data['convergence'][-1]['km'] == pytest.approx(response.data['total_km'], abs=0.01)
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'multi_start', 'workers': 0
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # multi_start needs a deadline: time_limit=0 is a 400, not a solver error
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'multi_start', 'time_limit': 0
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_fleet_mode_assigns_one_batch_per_vehicle(self):
+        self.create_deliveries(quantity=2)
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'vehicle_count': 2, 'vehicle_capacity': 6
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['algorithm'] == 'cvrp'
+        assert len(response.data['batch_ids']) == 2
+        assert response.data['unassigned'] == []
+        batch_ids = set(Delivery.objects.values_list('route_batch_id', flat=True))
+        assert batch_ids == set(response.data['batch_ids'])
+
+    def test_vrptw_mode_uses_delivery_time_windows(self):
+        deliveries = self.create_deliveries()
+        late = deliveries[0]
+        late.time_window_start = time(14, 0)
+        late.time_window_end = time(15, 0)
+        late.save()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'vrptw', 'departure_time': '09:00'
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['infeasible'] == []
+        stops = response.data['routes'][0]['optimized_deliveries']
+        late_stop = next(stop for stop in stops if stop['id'] == late.id)
+        assert late_stop['arrival'] == '14:00'
+
+    @override_settings(ROUTE_SCHEDULE_PROFILES={
+        'speed_kmh': 40, 'service_minutes': 10,
+        'districts': {'Lefkoşa': {'speed_kmh': 15, 'service_minutes': 25}},
+        'hourly_speed_factor': {9: 0.5},
+    })
+    def test_vrptw_plan_matches_stored_schedule(self):
+        lefkosa = District.objects.create(name='Lefkoşa')
+        deliveries = self.create_deliveries()
+        for index, delivery in enumerate(deliveries):
+            if index % 2 == 0:
+                delivery.assignment.customer.district = lefkosa
+                delivery.assignment.customer.save()
+            if index in (1, 4):
+                delivery.time_window_start, delivery.time_window_end = time(10, 0), time(11, 30)
+                delivery.save()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'vrptw', 'departure_time': '09:00'
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        planned = {
+            stop['id']: stop['arrival_minutes']
+            for route in response.data['routes'] for stop in route['optimized_deliveries']
+        }
+        midnight = timezone.make_aware(datetime.combine(self.route_date, time.min))
+        stored = DeliveryRouteStop.objects.filter(delivery_id__in=planned).select_related('delivery')
+        assert stored.count() == len(planned)
+        for stop in stored:
+            arrival = (stop.estimated_arrival - midnight).total_seconds() / 60
+            assert arrival == pytest.approx(planned[stop.delivery_id], abs=0.5)
+            if stop.delivery.time_window_end:
+                assert arrival <= 11 * 60 + 30 + 0.5
+
+    def test_multi_depot_mode_routes_from_nearest_depot(self):
+        girne_depot = DepotLocation.objects.create(
+            name='Girne Şube', latitude=Decimal('35.3387'), longitude=Decimal('33.3176')
+        )
+        deliveries = self.create_deliveries()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'multi_depot': True, 'algorithm': 'two_opt'
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['delivery_count'] == len(deliveries)
+        assert {d['depot']['id'] for d in response.data['depots']} == {self.depot.id, girne_depot.id}
+        # (35.3323, 33.3184) is in Girne
+        assert Delivery.objects.get(id=deliveries[1].id).depot_id == girne_depot.id
+        assert Delivery.objects.get(id=deliveries[0].id).depot_id == self.depot.id
+
+    def test_haversine_distances_are_not_cached(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {'date': str(self.route_date)}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert not DistanceCacheEntry.objects.exists()
+
+
+@pytest.mark.django_db
+@override_settings(BACKGROUND_JOBS_MODE='worker')
+class TestOptimizationJobs(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.optimize_url = reverse('delivery-route-optimize')
+
+    def job_url(self, job_id, cancel=False):
+        name = 'delivery-route-cancel-job' if cancel else 'delivery-route-job-status'
+        return reverse(name, kwargs={'job_id': job_id})
+
+    def test_async_optimize_returns_job_and_result_is_polled(self):
+        deliveries = self.create_deliveries()
+        self.authenticate_admin()
+
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'algorithm': 'or_opt', 'async': True
+        }, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job_id = response.data['job_id']
+        assert response.data['status'] == 'PENDING'
+        assert Delivery.objects.filter(route_batch_id__isnull=False).count() == 0
+
+        assert run_job(job_id)
+
+        response = self.client.get(self.job_url(job_id))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'SUCCEEDED'
+        assert response.data['progress'] == 1.0
+        assert response.data['result']['delivery_count'] == len(deliveries)
+        assert response.data['best_objective'] == pytest.approx(response.data['result']['total_km'], abs=0.01)
+        assert sorted(response.data['checkpoint']) == sorted(d.id for d in deliveries)
+        assert DeliveryRoute.objects.filter(batch_id=response.data['result']['batch_id']).exists()
+
+    def test_validation_errors_are_returned_before_enqueueing(self):
+        self.authenticate_admin()
+        response = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'async': True
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not BackgroundJob.objects.exists()
+
+    def test_jobs_accept_longer_time_limit(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+
+        body = {'date': str(self.route_date), 'algorithm': 'multi_start', 'time_limit': 120}
+        assert self.client.post(self.optimize_url, body, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(self.optimize_url, {**body, 'async': True}, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        response = self.client.post(self.optimize_url, {**body, 'time_limit': 3600, 'async': True}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_cancel_pending_job(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+        job_id = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'async': True
+        }, format='json').data['job_id']
+
+        response = self.client.post(self.job_url(job_id, cancel=True))
+        assert response.data['status'] == 'CANCELLED'
+        assert not run_job(job_id)
+        assert self.client.post(self.job_url(job_id, cancel=True)).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_job_with_dead_runner_is_marked_failed(self):
+        self.create_deliveries()
+        self.authenticate_admin()
+        job_id = self.client.post(self.optimize_url, {
+            'date': str(self.route_date), 'async': True
+        }, format='json').data['job_id']
+        # Claimed by a runner that then died without reporting progress
+        BackgroundJob.objects.filter(pk=job_id).update(status='RUNNING', updated_at=timezone.now())
+        assert self.client.get(self.job_url(job_id)).data['status'] == 'RUNNING'
+
+        BackgroundJob.objects.filter(pk=job_id).update(updated_at=timezone.now() - timedelta(hours=1))
+        response = self.client.get(self.job_url(job_id))
+        assert response.data['status'] == 'FAILED'
+        assert response.data['error']
+        assert run_pending_jobs() == 0
+
+    def test_unknown_job_is_404(self):
+        self.authenticate_admin()
+        assert self.client.get(self.job_url(999)).status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestRoutePersistence(RouteAPITestCase):
+    def optimize(self, deliveries, **options):
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in deliveries]
+        optimizer = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude))
+        return optimizer.optimize(data, 'two_opt', **options)
+
+    def test_routes_and_stops_are_written(self):
+        deliveries = self.create_deliveries()
+        result = self.optimize(deliveries)
+
+        [route] = save_optimized_routes([result], self.depot, self.route_date, departure_minutes=9 * 60)
+
+        route.refresh_from_db()
+        assert route.batch_id == result['batch_id']
+        assert route.depot == self.depot
+        assert float(route.total_distance_km) == pytest.approx(result['total_km'], abs=0.01)
+        stops = list(route.stops.order_by('stop_order'))
+        assert [stop.delivery_id for stop in stops] == [d['id'] for d in result['optimized_deliveries']]
+        arrivals = [stop.estimated_arrival for stop in stops]
+        assert arrivals == sorted(arrivals)
+        assert timezone.localtime(arrivals[0]).hour >= 9
+        assert route.total_duration_min > 0
+        assert set(Delivery.objects.values_list('route_batch_id', flat=True)) == {result['batch_id']}
+
+    def test_route_polyline_is_stored_and_served(self):
+        deliveries = self.create_deliveries()
+        result = self.optimize(deliveries)
+        [route] = save_optimized_routes([result], self.depot, self.route_date)
+
+        expected = [(float(self.depot.latitude), float(self.depot.longitude))] + [
+            (d['lat'], d['lng']) for d in result['optimized_deliveries']
+        ]
+        assert decode_polyline(route.route_polyline) == pytest.approx(expected)
+
+        self.authenticate_admin()
+        response = self.client.get(reverse('delivery-route-detail', kwargs={'pk': route.pk}))
+        assert response.data['route_polyline'] == route.route_polyline
+
+    def test_query_count_does_not_grow_with_stops(self):
+        coords = [(35.15 + i * 0.002, 33.30 + (i * 7 % 40) * 0.003) for i in range(60)]
+        deliveries = self.create_deliveries(coords)
+        result = self.optimize(deliveries)
+
+        # Persistence (9) + schedule pipeline: stop load, version bump (2) and 3 bulk updates
+        with self.assertNumQueries(15):
+            save_optimized_routes([result], self.depot, self.route_date)
+        assert DeliveryRouteStop.objects.count() == 60
+
+    def test_reoptimizing_replaces_previous_routes(self):
+        deliveries = self.create_deliveries()
+        first = self.optimize(deliveries)
+        save_optimized_routes([first], self.depot, self.route_date)
+
+        second = self.optimize(deliveries, vehicle_count=2)
+        save_optimized_routes(second['routes'], self.depot, self.route_date)
+
+        batch_ids = set(DeliveryRoute.objects.values_list('batch_id', flat=True))
+        assert batch_ids == {route['batch_id'] for route in second['routes'] if route['optimized_deliveries']}
+        assert DeliveryRouteStop.objects.count() == len(deliveries)
+
+
+@pytest.mark.django_db
+@override_settings(ROUTE_SCHEDULE_PROFILES={'speed_kmh': 60, 'service_minutes': 10})
+class TestRouteSchedule(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.deliveries = self.create_deliveries()
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in self.deliveries]
+        result = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude)).optimize(data)
+        [self.route] = save_optimized_routes([result], self.depot, self.route_date, departure_minutes=9 * 60)
+        self.authenticate_admin()
+
+    def stops(self):
+        return list(self.route.stops.select_related('delivery').order_by('stop_order'))
+
+    def test_arrivals_are_cumulative(self):
+        stops = self.stops()
+        previous = timezone.localtime(self.route.planned_departure)
+        for stop in stops:
+            # 60 km/h: one minute per km, plus 10 minutes service at the previous stop
+            expected = float(stop.distance_from_previous_km) + (10 if stop.stop_order > 1 else 0)
+            gap = (stop.estimated_arrival - previous).total_seconds() / 60
+            assert gap == pytest.approx(expected, abs=0.01)
+            assert stop.delivery.eta_minutes == round((stop.estimated_arrival - self.route.planned_departure).total_seconds() / 60)
+            previous = stop.estimated_arrival
+
+    def test_time_window_causes_waiting(self):
+        last = self.stops()[-1]
+        last.delivery.time_window_start = time(15, 0)
+        last.delivery.time_window_end = time(16, 0)
+        last.delivery.save()
+
+        response = self.client.post(
+            reverse('delivery-route-schedule', kwargs={'pk': self.route.pk}), {}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['stops'][-1]['arrival'] == '15:00'
+
+    def test_schedule_endpoint_with_new_departure(self):
+        url = reverse('delivery-route-schedule', kwargs={'pk': self.route.pk})
+        before = self.client.get(url).data['stops']
+
+        after = self.client.post(url, {'departure_time': '10:00'}, format='json').data['stops']
+
+        for old, new in zip(before, after):
+            assert (new['estimated_arrival'] - old['estimated_arrival']).total_seconds() == pytest.approx(3600, abs=1)
+
+    def test_delay_only_touches_downstream_stops(self):
+        stops = self.stops()
+        delayed = stops[2]
+        before = {stop.id: stop.estimated_arrival for stop in stops}
+
+        response = self.client.post(
+            reverse('delivery-route-delay', kwargs={'pk': self.route.pk}),
+            {'delivery_id': delayed.delivery_id, 'delay_minutes': 20}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['stop_order'] for row in response.data['updated_stops']] == [s.stop_order for s in stops[2:]]
+        for stop in self.stops():
+            shift = (stop.estimated_arrival - before[stop.id]).total_seconds() / 60
+            assert shift == pytest.approx(20 if stop.stop_order >= 3 else 0, abs=0.01)
+
+    def test_delay_for_unknown_delivery(self):
+        response = self.client.post(
+            reverse('delivery-route-delay', kwargs={'pk': self.route.pk}),
+            {'delivery_id': 999999, 'delay_minutes': 5}, format='json'
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_rejects_unbounded_delay(self):
+        url = reverse('delivery-route-delay', kwargs={'pk': self.route.pk})
+        delivery_id = self.stops()[0].delivery_id
+        for delay in ('nan', 'inf', '-inf', 1e12, 24 * 60 + 1, 'x'):
+            response = self.client.post(url, {'delivery_id': delivery_id, 'delay_minutes': delay}, format='json')
+            assert response.status_code == status.HTTP_400_BAD_REQUEST, delay
+
+
+@pytest.mark.django_db
+@override_settings(ROUTE_SCHEDULE_PROFILES={'speed_kmh': 60, 'service_minutes': 10})
+class TestIncrementalRouteChanges(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        *self.deliveries, self.late = self.create_deliveries()
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in self.deliveries]
+        result = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude)).optimize(data, 'or_opt')
+        [self.route] = save_optimized_routes([result], self.depot, self.route_date, departure_minutes=9 * 60)
+        self.authenticate_admin()
+
+    def post(self, name, delivery):
+        return self.client.post(
+            reverse(f'delivery-route-{name}', kwargs={'pk': self.route.pk}), {'delivery_id': delivery.id}, format='json'
+        )
+
+    def assert_route_consistent(self):
+        stops = list(self.route.stops.select_related('delivery').order_by('stop_order'))
+        assert [stop.stop_order for stop in stops] == list(range(1, len(stops) + 1))
+        assert [stop.delivery.delivery_order for stop in stops] == list(range(1, len(stops) + 1))
+        arrivals = [stop.estimated_arrival for stop in stops]
+        assert arrivals == sorted(arrivals)
+        self.route.refresh_from_db()
+        total = sum(float(stop.distance_from_previous_km) for stop in stops)
+        assert float(self.route.total_distance_km) == pytest.approx(total, abs=0.05)
+        return stops
+
+    def test_insert_stop_at_cheapest_position(self):
+        response = self.post('insert-stop', self.late)
+
+        assert response.status_code == status.HTTP_200_OK
+        stops = self.assert_route_consistent()
+        assert len(stops) == 6
+        self.late.refresh_from_db()
+        assert self.late.route_batch_id == self.route.batch_id
+        assert stops[response.data['stop_order'] - 1].delivery_id == self.late.id
+        # Stops before the change keep their rows untouched
+        untouched = {stop.delivery_id for stop in stops[:response.data['stop_order'] - 1]}
+        assert not untouched & set(response.data['updated_delivery_ids'])
+
+    def test_polyline_follows_the_new_order(self):
+        self.post('insert-stop', self.late)
+
+        stops = self.route.stops.select_related('delivery__assignment__customer').order_by('stop_order')
+        self.route.refresh_from_db()
+        points = decode_polyline(self.route.route_polyline)
+        assert points[1:] == pytest.approx([
+            (float(s.delivery.customer.address_lat), float(s.delivery.customer.address_lng)) for s in stops
+        ])
+
+    def test_remove_stop_closes_the_gap(self):
+        stops = list(self.route.stops.order_by('stop_order'))
+        removed = stops[2].delivery
+
+        response = self.post('remove-stop', removed)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(self.assert_route_consistent()) == 4
+        removed.refresh_from_db()
+        assert removed.route_batch_id is None
+        assert response.data['removed_km'] >= 0
+        assert stops[0].delivery_id not in response.data['updated_delivery_ids']
+
+    def test_completed_stops_do_not_move(self):
+        stops = list(self.route.stops.order_by('stop_order'))
+        Delivery.objects.filter(id__in=[stop.delivery_id for stop in stops[:3]]).update(status='DELIVERED')
+
+        response = self.post('insert-stop', self.late)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['stop_order'] > 3
+        after = list(self.route.stops.order_by('stop_order'))
+        assert [s.delivery_id for s in after[:3]] == [s.delivery_id for s in stops[:3]]
+        assert self.post('remove-stop', Delivery.objects.get(id=stops[0].delivery_id)).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_invalid_changes_are_rejected(self):
+        on_route = self.route.stops.first().delivery
+        assert self.post('insert-stop', on_route).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.post('remove-stop', self.late).status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(
+            reverse('delivery-route-insert-stop', kwargs={'pk': self.route.pk}), {'delivery_id': 999999}, format='json'
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_insert_respects_the_scheduled_date(self):
+        Delivery.objects.filter(pk=self.late.pk).update(scheduled_date=self.route_date + timedelta(days=1))
+        assert self.post('insert-stop', self.late).status_code == status.HTTP_400_BAD_REQUEST
+        assert not self.route.stops.filter(delivery=self.late).exists()
+
+        # An unscheduled delivery is planned for the route's day
+        Delivery.objects.filter(pk=self.late.pk).update(scheduled_date=None)
+        assert self.post('insert-stop', self.late).status_code == status.HTTP_200_OK
+        self.late.refresh_from_db()
+        assert self.late.scheduled_date == self.route.date
+
+
+@pytest.mark.django_db
+class TestRouteBundle(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        *self.deliveries, self.late = self.create_deliveries()
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in self.deliveries]
+        result = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude)).optimize(data, 'or_opt')
+        [self.route] = save_optimized_routes([result], self.depot, self.route_date, departure_minutes=9 * 60)
+        self.url = reverse('delivery-route-bundle', kwargs={'pk': self.route.pk})
+        self.authenticate_admin()
+
+    def bundle(self, since_version=None):
+        params = {} if since_version is None else {'since_version': since_version}
+        response = self.client.get(self.url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return response.data
+
+    def test_full_bundle_from_one_stop_query(self):
+        # Route, then its stops joined with delivery / customer / product
+        with self.assertNumQueries(2):
+            data = self.bundle()
+
+        stops = list(self.route.stops.order_by('stop_order'))
+        assert data['order'] == [stop.delivery_id for stop in stops]
+        assert [stop['seq'] for stop in data['stops']] == list(range(1, 6))
+        first = data['stops'][0]
+        assert first['product'] == self.product_fridge.name and first['qty'] == 1
+        assert first['eta'] is not None and first['lat'] is not None
+        assert data['polyline'] == self.route.route_polyline
+
+    def test_missing_store_coordinates_fall_back_to_depot(self):
+        self.route.store_lat = self.route.store_lng = None
+        assert route_bundle(self.route)['depot']['lat'] == float(self.depot.latitude)
+
+        self.route.depot = None
+        depot = route_bundle(self.route)['depot']
+        assert depot['lat'] is None and depot['lng'] is None
+
+    def test_unchanged_route_sends_no_stops(self):
+        version = self.bundle()['version']
+        data = self.bundle(version)
+        assert data['changed'] is False and data['stops'] == []
+        assert 'polyline' not in data and 'order' not in data
+
+    def test_delta_after_insert_and_delay(self):
+        version = self.bundle()['version']
+        inserted = self.client.post(
+            reverse('delivery-route-insert-stop', kwargs={'pk': self.route.pk}), {'delivery_id': self.late.id},
+            format='json'
+        ).data
+
+        data = self.bundle(version)
+        assert data['version'] > version
+        assert self.late.id in data['order'] and 'polyline' in data
+        changed = {stop['id'] for stop in data['stops']}
+        assert self.late.id in changed
+        assert changed <= set(inserted['updated_delivery_ids'])
+
+        version = data['version']
+        last = data['order'][-1]
+        self.client.post(
+            reverse('delivery-route-delay', kwargs={'pk': self.route.pk}),
+            {'delivery_id': last, 'delay_minutes': 15}, format='json'
+        )
+        data = self.bundle(version)
+        assert [stop['id'] for stop in data['stops']] == [last]
+        assert 'polyline' not in data
+
+    def test_status_change_marks_stop(self):
+        version = self.bundle()['version']
+        delivery = self.route.stops.order_by('stop_order').first().delivery
+        response = self.client.patch(
+            reverse('delivery-detail', kwargs={'pk': delivery.pk}), {'status': 'DELIVERED'}, format='json'
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        data = self.bundle(version)
+        assert [(stop['id'], stop['status']) for stop in data['stops']] == [(delivery.id, 'DELIVERED')]
+
+    def test_invalid_since_version(self):
+        response = self.client.get(self.url, {'since_version': 'x'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestDistanceCache:
+    LATS = [35.1856, 35.1900, 35.3323, 35.2100]
+    LNGS = [33.3823, 33.3850, 33.3184, 33.3500]
+
+    def test_second_call_is_served_from_cache(self):
+        provider = CachedDistanceProvider()
+        first = provider.matrix(self.LATS, self.LNGS)
+        assert provider.computed_pairs == 12  # diagonal is never computed
+        assert DistanceCacheEntry.objects.count() == 12
+
+        second = provider.matrix(self.LATS, self.LNGS)
+        assert provider.computed_pairs == 0
+        assert np.allclose(first, second)
+        assert np.allclose(second, haversine_matrix(self.LATS, self.LNGS))
+
+    def test_only_pairs_with_new_stop_are_computed(self):
+        provider = CachedDistanceProvider()
+        provider.matrix(self.LATS[:3], self.LNGS[:3])
+
+        matrix = provider.matrix(self.LATS, self.LNGS)
+        assert provider.computed_pairs == 6  # new stop to/from the 3 known points
+        assert np.allclose(matrix, haversine_matrix(self.LATS, self.LNGS))
+
+    def test_only_road_distances_are_cached(self, tmp_path):
+        from .test_route_optimizer import OSM_FIXTURE
+
+        with override_settings(ROAD_NETWORK_PATH=None):
+            assert isinstance(get_distance_provider(), HaversineDistanceProvider)
+
+        path = tmp_path / 'kktc.osm'
+        path.write_text(OSM_FIXTURE, encoding='utf-8')
+        with override_settings(ROAD_NETWORK_PATH=str(path)):
+            provider = get_distance_provider()
+            assert isinstance(provider, CachedDistanceProvider)
+            assert isinstance(provider.base, RoadNetworkDistanceProvider)
+            with override_settings(ROUTE_DISTANCE_CACHE_ENABLED=False):
+                assert isinstance(get_distance_provider(), RoadNetworkDistanceProvider)
+
+    def test_purge_removes_old_entries(self):
+        CachedDistanceProvider().matrix(self.LATS, self.LNGS)
+        old = list(DistanceCacheEntry.objects.order_by('id').values_list('id', flat=True)[:5])
+        DistanceCacheEntry.objects.filter(id__in=old).update(created_at=timezone.now() - timedelta(days=100))
+
+        out = StringIO()
+        call_command('purge_distance_cache', stdout=out)
+        assert '5 mesafe kaydı silindi' in out.getvalue()
+        assert DistanceCacheEntry.objects.count() == 7
+        assert purge_stale(timedelta(days=90)) == 0
@@ -0,0 +1,557 @@
+"""
+Unit tests for the route optimization service and its benchmark suite (no database needed).
+"""
+import json
+import os
+import random
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from products.services.route_optimizer import (
+    RouteOptimizer, SearchBudget, haversine_distance, haversine_matrix,
+    nearest_neighbor_tour, path_length, two_opt, or_opt, savings_routes,
+    assign_depots, optimize_multi_depot, MatrixDistanceProvider, schedule_arrivals,
+    cheapest_insertion, insert_stop, remove_stop, repair_window, HaversineDistanceProvider,
+    multi_start_search, randomized_nearest_neighbor_tour, TravelModel,
+)
+from products.services.polyline import decode_polyline, encode_polyline, route_polyline
+from products.services.road_network import RoadGraph, RoadNetworkDistanceProvider
+from products.services.route_benchmark import compare_to_baseline, make_instance, run_benchmark
+
+LEFKOSA = (35.1856, 33.3823)
+GAZIMAGUSA = (35.1264, 33.9384)
+
+
+def make_deliveries(count, seed=7, spread=0.25):
+    """Random deliveries around Lefkoşa."""
+    rng = random.Random(seed)
+    return [
+        {
+            'id': i + 1,
+            'lat': LEFKOSA[0] + rng.uniform(-spread, spread),
+            'lng': LEFKOSA[1] + rng.uniform(-spread, spread),
+        }
+        for i in range(count)
+    ]
+
+
+class TestHaversineMatrix:
+    def test_matches_scalar_haversine(self):
+        deliveries = make_deliveries(5)
+        lats = [d['lat'] for d in deliveries]
+        lngs = [d['lng'] for d in deliveries]
+        matrix = haversine_matrix(lats, lngs)
+
+        assert matrix.shape == (5, 5)
+        assert np.allclose(np.diag(matrix), 0)
+        for i in range(5):
+            for j in range(5):
+                expected = haversine_distance(lats[i], lngs[i], lats[j], lngs[j])
+                assert matrix[i, j] == pytest.approx(expected, abs=0.01)
+
+    def test_rectangular_matrix(self):
+        matrix = haversine_matrix([35.0, 35.1], [33.0, 33.1], [35.2], [33.2])
+        assert matrix.shape == (2, 1)
+
+
+class TestLocalSearch:
+    def test_nearest_neighbor_visits_every_node_once(self):
+        matrix = RouteOptimizer(*LEFKOSA).distance_matrix(make_deliveries(30))
+        tour = nearest_neighbor_tour(matrix)
+        assert tour[0] == 0
+        assert sorted(tour) == list(range(31))
+
+    def test_two_opt_and_or_opt_never_worse_than_nearest_neighbor(self):
+        matrix = RouteOptimizer(*LEFKOSA).distance_matrix(make_deliveries(60))
+        start = nearest_neighbor_tour(matrix)
+        baseline = path_length(matrix, start)
+
+        improved_2opt = two_opt(matrix, start)
+        improved_oropt = or_opt(matrix, start)
+
+        assert sorted(improved_2opt) == sorted(start)
+        assert sorted(improved_oropt) == sorted(start)
+        assert improved_2opt[0] == 0 and improved_oropt[0] == 0
+        assert path_length(matrix, improved_2opt) < baseline
+        assert path_length(matrix, improved_oropt) <= path_length(matrix, improved_2opt) + 1e-6
+
+    def test_two_opt_removes_crossing(self):
+        # Points on a line visited out of order: 0 -> 2 -> 1 -> 3
+        points = np.array([0.0, 1.0, 2.0, 3.0])
+        matrix = np.abs(points[:, None] - points[None, :])
+        assert two_opt(matrix, [0, 2, 1, 3]) == [0, 1, 2, 3]
+
+    def test_progress_callback_can_cancel_search(self):
+        matrix = RouteOptimizer(*LEFKOSA).distance_matrix(make_deliveries(80))
+        start = nearest_neighbor_tour(matrix)
+
+        def on_progress(budget):
+            budget.cancel()
+
+        budget = SearchBudget(on_progress=on_progress, progress_interval=0)
+        tour = or_opt(matrix, start, budget)
+
+        assert budget.cancelled and budget.iterations == 1
+        assert sorted(tour) == sorted(start)
+        assert path_length(matrix, tour) <= path_length(matrix, start)
+
+    def test_iteration_cap_is_respected(self):
+        matrix = RouteOptimizer(*LEFKOSA).distance_matrix(make_deliveries(60))
+        budget = SearchBudget(max_iterations=3)
+        or_opt(matrix, nearest_neighbor_tour(matrix), budget)
+        assert budget.iterations <= 3
+
+
+class TestRouteOptimizer:
+    def test_nearest_neighbor_result_shape(self):
+        optimizer = RouteOptimizer(*LEFKOSA)
+        result = optimizer.optimize_deliveries(make_deliveries(10))
+
+        assert result['algorithm'] == 'nearest_neighbor'
+        assert result['batch_id'].startswith('ROUTE-')
+        assert [d['order'] for d in result['optimized_deliveries']] == list(range(1, 11))
+        assert result['improvement_km'] == 0
+        assert result['total_km'] == pytest.approx(
+            sum(d['distance_from_previous'] for d in result['optimized_deliveries']), abs=0.05
+        )
+
+    @pytest.mark.parametrize('algorithm', ['two_opt', 'or_opt'])
+    def test_improvement_reported_against_baseline(self, algorithm):
+        optimizer = RouteOptimizer(*LEFKOSA)
+        result = optimizer.optimize_deliveries(make_deliveries(40), algorithm=algorithm)
+
+        assert result['total_km'] <= result['baseline_km']
+        assert result['improvement_km'] == pytest.approx(result['baseline_km'] - result['total_km'], abs=0.02)
+        assert result['improvement_pct'] > 0
+
+    def test_unknown_algorithm_raises(self):
+        with pytest.raises(ValueError):
+            RouteOptimizer(*LEFKOSA).optimize_deliveries(make_deliveries(3), algorithm='genetic')
+
+    def test_empty_input(self):
+        result = RouteOptimizer(*LEFKOSA).optimize_deliveries([], algorithm='or_opt')
+        assert result['optimized_deliveries'] == []
+        assert result['total_km'] == 0
+
+
+class TestFleetOptimization:
+    def test_savings_respects_capacity_and_fleet_size(self):
+        deliveries = make_deliveries(30)
+        matrix = RouteOptimizer(*LEFKOSA).distance_matrix(deliveries)
+        demands = np.array([0.0] + [2.0] * 30)
+
+        routes, unassigned = savings_routes(matrix, demands, vehicle_count=4, capacity=16)
+
+        assert len(routes) <= 4
+        assert unassigned == []
+        assert sorted(node for route in routes for node in route) == list(range(1, 31))
+        assert all(demands[route].sum() <= 16 for route in routes)
+
+    def test_fleet_result_has_batch_per_vehicle(self):
+        deliveries = make_deliveries(40)
+        for delivery in deliveries:
+            delivery['demand'] = 1 + delivery['id'] % 3
+
+        result = RouteOptimizer(*LEFKOSA).optimize_fleet(deliveries, vehicle_count=3, vehicle_capacity=40)
+
+        batch_ids = [route['batch_id'] for route in result['routes']]
+        assert len(set(batch_ids)) == len(batch_ids) == 3
+        assert all(route['load'] <= 40 for route in result['routes'])
+        served = [d['id'] for route in result['routes'] for d in route['optimized_deliveries']]
+        assert sorted(served) == list(range(1, 41))
+        assert result['total_km'] <= result['construction_km'] + 0.01
+
+    def test_oversized_and_overflow_stops_are_reported(self):
+        deliveries = make_deliveries(6)
+        for delivery in deliveries:
+            delivery['demand'] = 3
+        deliveries[0]['demand'] = 50  # bigger than any truck
+
+        result = RouteOptimizer(*LEFKOSA).optimize_fleet(deliveries, vehicle_count=1, vehicle_capacity=9)
+
+        unassigned_ids = {d['id'] for d in result['unassigned']}
+        assert 1 in unassigned_ids
+        assert len(result['routes'][0]['optimized_deliveries']) == 3
+        assert len(unassigned_ids) == 3
+
+
+class TestTimeWindows:
+    def test_arrivals_respect_windows(self):
+        deliveries = make_deliveries(30, seed=11)
+        for index, delivery in enumerate(deliveries):
+            if index % 2 == 0:
+                start = 9 * 60 + (index % 4) * 120
+                delivery['window_start'], delivery['window_end'] = start, start + 90
+
+        result = RouteOptimizer(*LEFKOSA).optimize_time_windows(deliveries, vehicle_count=3)
+
+        routed = [d for route in result['routes'] for d in route['optimized_deliveries']]
+        assert len(routed) + len(result['infeasible']) == 30
+        for delivery in routed:
+            if delivery.get('window_end') is not None:
+                assert delivery['window_start'] <= delivery['arrival_minutes'] <= delivery['window_end']
+        for route in result['routes']:
+            arrivals = [d['arrival_minutes'] for d in route['optimized_deliveries']]
+            assert arrivals == sorted(arrivals)
+
+    def test_unreachable_window_is_reported_not_dropped(self):
+        deliveries = make_deliveries(5)
+        # Window closes before the truck can possibly get there
+        deliveries[2]['window_start'], deliveries[2]['window_end'] = 0, 60
+
+        result = RouteOptimizer(*LEFKOSA).optimize_time_windows(deliveries, departure_minutes=9 * 60)
+
+        assert [d['id'] for d in result['infeasible']] == [3]
+        assert len(result['routes'][0]['optimized_deliveries']) == 4
+
+    def test_shift_end_limits_route(self):
+        deliveries = make_deliveries(20)
+        result = RouteOptimizer(*LEFKOSA).optimize_time_windows(
+            deliveries, departure_minutes=9 * 60, shift_end_minutes=10 * 60
+        )
+        routed = result['routes'][0]['optimized_deliveries']
+        assert routed and result['infeasible']
+        assert all(d['arrival_minutes'] <= 600 for d in routed)
+
+    def test_travel_model_arrivals_match_schedule(self):
+        deliveries = make_deliveries(24, seed=3)
+        for index, delivery in enumerate(deliveries):
+            delivery['district'] = 'Lefkoşa' if index % 2 else 'Girne'
+            if index % 3 == 0:
+                start = 9 * 60 + (index % 4) * 60
+                delivery['window_start'], delivery['window_end'] = start, start + 75
+        model = TravelModel(40, 10, {'Lefkoşa': {'speed_kmh': 25, 'service_minutes': 15}}, {8: 0.6, 9: 0.7})
+
+        result = RouteOptimizer(*LEFKOSA).optimize_time_windows(
+            deliveries, vehicle_count=3, departure_minutes=8 * 60 + 30, travel_model=model
+        )
+
+        assert result['routes']
+        for route in result['routes']:
+            stops = route['optimized_deliveries']
+            districts = [d['district'] for d in stops]
+            arrivals, _ = schedule_arrivals(
+                [d['distance_from_previous'] for d in stops], 8 * 60 + 30,
+                speeds_kmh=[model.speed_for(d) for d in districts],
+                service_minutes=[model.service_for(d) for d in districts],
+                ready=[d.get('window_start', np.nan) for d in stops],
+                hourly_speed_factor=model.hourly_speed_factor,
+            )
+            assert [d['arrival_minutes'] for d in stops] == pytest.approx(list(arrivals), abs=0.5)
+            for delivery, arrival in zip(stops, arrivals):
+                if delivery.get('window_end') is not None:
+                    assert arrival <= delivery['window_end'] + 0.5
+
+
+class TestScheduleArrivals:
+    def test_matches_sequential_simulation(self):
+        rng = random.Random(5)
+        distances = [rng.uniform(1, 15) for _ in range(40)]
+        ready = [rng.choice([np.nan, 600.0, 720.0, 900.0]) for _ in range(40)]
+        speeds = [rng.choice([30.0, 40.0]) for _ in range(40)]
+
+        arrivals, legs = schedule_arrivals(distances, 540, speeds, 10, ready)
+
+        clock = 540.0
+        for i, distance in enumerate(distances):
+            clock += distance / speeds[i] * 60
+            if not np.isnan(ready[i]):
+                clock = max(clock, ready[i])
+            assert arrivals[i] == pytest.approx(clock)
+            clock += 10
+
+    def test_rush_hour_slows_legs_departing_in_that_hour(self):
+        factor = np.ones(24)
+        factor[9] = 0.5
+        arrivals, legs = schedule_arrivals([20, 20], 540, 40, 0, hourly_speed_factor=factor)
+        # First leg leaves at 09:00 (half speed), second at 10:00 (normal)
+        assert list(legs) == pytest.approx([60, 30])
+        assert list(arrivals) == pytest.approx([600, 630])
+
+
+class TestMultiDepot:
+    DEPOTS = [
+        {'id': 1, 'name': 'Lefkoşa', 'lat': LEFKOSA[0], 'lng': LEFKOSA[1]},
+        {'id': 2, 'name': 'Gazimağusa', 'lat': GAZIMAGUSA[0], 'lng': GAZIMAGUSA[1]},
+    ]
+
+    def island_deliveries(self):
+        west = make_deliveries(10, seed=1, spread=0.05)
+        east = make_deliveries(10, seed=2, spread=0.05)
+        for index, delivery in enumerate(east):
+            delivery['id'] = 100 + index
+            delivery['lat'] += GAZIMAGUSA[0] - LEFKOSA[0]
+            delivery['lng'] += GAZIMAGUSA[1] - LEFKOSA[1]
+        return west + east
+
+    def test_nearest_assignment(self):
+        assignment = assign_depots(self.island_deliveries(), self.DEPOTS)
+        assert list(assignment) == [0] * 10 + [1] * 10
+
+    def test_balanced_assignment_caps_depot_share(self):
+        deliveries = make_deliveries(20, spread=0.05)  # all next to Lefkoşa
+        assignment = assign_depots(deliveries, self.DEPOTS, strategy='balanced')
+        assert (assignment == 0).sum() == 12  # 20 / 2 * DEPOT_BALANCE_SLACK
+
+    @pytest.mark.parametrize('parallel', [True, False])
+    def test_each_depot_optimized_separately(self, parallel):
+        result = optimize_multi_depot(
+            self.island_deliveries(), self.DEPOTS, algorithm='or_opt', parallel=parallel
+        )
+
+        by_depot = {r['depot']['id']: r for r in result['depots']}
+        assert set(by_depot) == {1, 2}
+        assert {d['id'] for d in by_depot[2]['optimized_deliveries']} == set(range(100, 110))
+        assert by_depot[1]['batch_id'] != by_depot[2]['batch_id']
+        assert result['total_km'] == pytest.approx(by_depot[1]['total_km'] + by_depot[2]['total_km'], abs=0.01)
+
+    def test_shared_matrix_provider_slices_by_coordinate(self):
+        deliveries = self.island_deliveries()
+        lats, lngs = [d['lat'] for d in deliveries], [d['lng'] for d in deliveries]
+        full = haversine_matrix(lats, lngs)
+        provider = MatrixDistanceProvider(lats, lngs, full)
+
+        sub = provider.matrix(lats[3:6], lngs[3:6], lats[:2], lngs[:2])
+        assert np.allclose(sub, full[3:6, :2])
+
+
+class TestBenchmark:
+    def test_instances_are_reproducible(self):
+        first = make_instance(30, seed=3, time_windows=True, capacity=True)
+        second = make_instance(30, seed=3, time_windows=True, capacity=True)
+        assert first == second
+        assert first['options']['vehicle_capacity'] == 40
+        assert any('window_start' in d for d in first['deliveries'])
+
+    def test_runs_every_algorithm(self):
+        rows = run_benchmark(sizes=[12], time_limit=1, measure_memory=True)
+        assert {row['algorithm'] for row in rows} == {'nearest_neighbor', 'two_opt', 'or_opt', 'cvrp', 'vrptw'}
+        assert all(row['served'] + row['unserved'] == 12 for row in rows)
+        assert all(row['peak_kb'] > 0 for row in rows)
+
+    def test_regressions_are_reported(self):
+        rows = run_benchmark(sizes=[12], variants=['plain'], time_limit=1, measure_memory=False)
+        assert compare_to_baseline(rows, rows) == []
+
+        worse = [dict(row, km=row['km'] * 1.1) for row in rows]
+        assert len(compare_to_baseline(worse, rows)) == len(rows)
+
+    def test_command_writes_json(self):
+        out = StringIO()
+        call_command('benchmark_routes', '--sizes', '8', '--variants', 'plain', '--no-memory', '--json', stdout=out)
+        assert len(json.loads(out.getvalue())) == 3
+
+
+OSM_FIXTURE = """<?xml version='1.0' encoding='UTF-8'?>
+<osm version="0.6">
+  <node id="1" lat="35.000" lon="33.000"/>
+  <node id="2" lat="35.000" lon="33.100"/>
+  <node id="3" lat="35.100" lon="33.100"/>
+  <node id="4" lat="35.100" lon="33.000"/>
+  <node id="5" lat="35.050" lon="33.050"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="primary"/>
+  </way>
+  <way id="11">
+    <nd ref="3"/><nd ref="4"/><nd ref="1"/>
+    <tag k="highway" v="residential"/><tag k="oneway" v="yes"/>
+  </way>
+  <way id="12">
+    <nd ref="1"/><nd ref="5"/>
+    <tag k="highway" v="footway"/>
+  </way>
+</osm>
+"""
+
+
+class TestRoadNetwork:
+    @pytest.fixture
+    def osm_path(self, tmp_path):
+        path = tmp_path / 'kktc.osm'
+        path.write_text(OSM_FIXTURE, encoding='utf-8')
+        return str(path)
+
+    def test_graph_is_cached_next_to_extract(self, osm_path):
+        graph = RoadGraph.from_file(osm_path)
+        assert graph.node_count == 4  # footway node is not routable
+        assert os.path.exists(osm_path + '.graph.npz')
+
+        cached = RoadGraph.from_file(osm_path)
+        assert np.array_equal(cached.lats, graph.lats)
+
+    def test_road_distance_follows_the_roads(self, osm_path):
+        provider = RoadNetworkDistanceProvider(RoadGraph.from_file(osm_path))
+        # Corner 1 -> corner 3: two sides of the square, not the diagonal
+        matrix = provider.matrix([35.0, 35.1], [33.0, 33.1])
+        two_sides = haversine_distance(35.0, 33.0, 35.0, 33.1) + haversine_distance(35.0, 33.1, 35.1, 33.1)
+        assert matrix[0, 1] == pytest.approx(two_sides, rel=1e-3)
+        assert matrix[0, 1] > haversine_distance(35.0, 33.0, 35.1, 33.1)
+
+    def test_one_way_streets_make_matrix_asymmetric(self, osm_path):
+        provider = RoadNetworkDistanceProvider(RoadGraph.from_file(osm_path))
+        # 4 -> 1 is direct on the one-way street, 1 -> 4 goes round the square
+        matrix = provider.matrix([35.1, 35.0], [33.0, 33.0])
+        assert matrix[1, 0] > 2.5 * matrix[0, 1]
+
+    def test_pluggable_into_route_optimizer(self, osm_path):
+        provider = RoadNetworkDistanceProvider(RoadGraph.from_file(osm_path))
+        optimizer = RouteOptimizer(35.0, 33.0, distance_provider=provider)
+        deliveries = [{'id': 1, 'lat': 35.1, 'lng': 33.0}, {'id': 2, 'lat': 35.1, 'lng': 33.1},
+                      {'id': 3, 'lat': 35.0, 'lng': 33.1}]
+        result = optimizer.optimize_deliveries(deliveries, algorithm='two_opt')
+        # Anticlockwise against the one-way street is impossible: 3 -> 2 -> 1
+        assert [d['id'] for d in result['optimized_deliveries']] == [3, 2, 1]
+
+    def test_geometry_follows_the_roads(self, osm_path):
+        provider = RoadNetworkDistanceProvider(RoadGraph.from_file(osm_path))
+        # 1 -> 3 must go via corner 2 (4 -> 1 is one-way the other way)
+        points = decode_polyline(route_polyline(provider, [35.0, 35.1], [33.0, 33.1]))
+        assert points[0] == (35.0, 33.0)
+        assert (35.0, 33.1) in points
+        assert points[-1] == (35.1, 33.1)
+
+    def test_local_search_on_asymmetric_matrix(self):
+        rng = np.random.default_rng(3)
+        matrix = rng.uniform(1, 20, size=(40, 40))
+        np.fill_diagonal(matrix, 0)
+        start = nearest_neighbor_tour(matrix)
+
+        for improve in (two_opt, or_opt):
+            budget = SearchBudget()
+            tour = improve(matrix, start, budget)
+            assert sorted(tour) == sorted(start)
+            assert path_length(matrix, tour) <= path_length(matrix, start)
+            # The incumbent's reported objective is its true (directional) length
+            assert budget.best_objective == pytest.approx(path_length(matrix, tour))
+
+
+class TestIncrementalChanges:
+    @pytest.fixture
+    def instance(self):
+        rng = np.random.default_rng(11)
+        points = rng.uniform([35.1, 33.2], [35.35, 33.5], size=(41, 2))
+        matrix = haversine_matrix(points[:, 0], points[:, 1])
+        # Optimized tour over the first 40 stops; node 40 is the late addition
+        tour = or_opt(matrix[:40, :40], nearest_neighbor_tour(matrix[:40, :40]))
+        return matrix, tour
+
+    def test_cheapest_insertion_matches_brute_force(self, instance):
+        matrix, tour = instance
+        position, added = cheapest_insertion(matrix, tour, 40)
+        brute = [
+            path_length(matrix, tour[:k] + [40] + tour[k:]) - path_length(matrix, tour)
+            for k in range(1, len(tour) + 1)
+        ]
+        assert added == pytest.approx(min(brute))
+        assert position == 1 + int(np.argmin(brute))
+
+    def test_insert_then_remove(self, instance):
+        matrix, tour = instance
+        inserted = insert_stop(matrix, tour, 40)
+        assert sorted(inserted) == list(range(41))
+        assert inserted[0] == 0
+        position, added = cheapest_insertion(matrix, tour, 40)
+        assert path_length(matrix, inserted) <= path_length(matrix, tour) + added + 1e-9
+
+        removed = remove_stop(matrix, inserted, inserted[10])
+        assert sorted(removed) == sorted(set(inserted) - {inserted[10]})
+        assert path_length(matrix, removed) <= path_length(matrix, inserted)
+
+    def test_repair_only_touches_the_window(self, instance):
+        matrix, tour = instance
+        shuffled = list(tour)
+        shuffled[18:23] = shuffled[18:23][::-1]
+        repaired = repair_window(matrix, shuffled, 20, radius=4)
+        # Positions outside 16..24 (and the anchors 15, 25) are untouched
+        assert repaired[:16] == shuffled[:16]
+        assert repaired[25:] == shuffled[25:]
+        assert path_length(matrix, repaired) <= path_length(matrix, shuffled)
+
+    def test_completed_prefix_stays_fixed(self, instance):
+        matrix, tour = instance
+        inserted = insert_stop(matrix, tour, 40, first_position=30)
+        assert inserted[:30] == tour[:30]
+        assert 40 in inserted[30:]
+
+
+class TestMultiStart:
+    @pytest.fixture
+    def matrix(self):
+        return RouteOptimizer(*LEFKOSA).distance_matrix(make_deliveries(80, seed=3))
+
+    def test_randomized_starts_differ(self, matrix):
+        tours = [randomized_nearest_neighbor_tour(matrix, np.random.default_rng(seed)) for seed in (1, 2)]
+        for tour in tours:
+            assert tour[0] == 0 and sorted(tour) == list(range(81))
+        assert tours[0] != tours[1]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_best_of_many_starts(self, matrix, workers):
+        single = path_length(matrix, or_opt(matrix, nearest_neighbor_tour(matrix)))
+        budget = SearchBudget(time_limit=0.5)
+        tour, stats = multi_start_search(matrix, budget, workers=workers)
+
+        assert sorted(tour) == list(range(81)) and tour[0] == 0
+        # Start 0 is the greedy tour, so it never loses to a single local search
+        assert path_length(matrix, tour) <= single + 1e-6
+        assert stats['workers'] == workers and stats['starts'] > workers
+        curve = [point['km'] for point in stats['convergence']]
+        assert curve == sorted(curve, reverse=True)
+        assert curve[-1] == pytest.approx(path_length(matrix, tour), abs=1e-3)
+        assert budget.elapsed_ms < 1500
+
+    def test_cancel_between_starts(self, matrix):
+        def on_progress(budget):
+            budget.cancel()
+
+        budget = SearchBudget(time_limit=5, on_progress=on_progress, progress_interval=0)
+        tour, stats = multi_start_search(matrix, budget, workers=1)
+        assert budget.cancelled and stats['starts'] == 1
+        assert sorted(tour) == list(range(81))
+
+    def test_iteration_cap_applies_per_start(self, matrix):
+        budget = SearchBudget(time_limit=0.3, max_iterations=5)
+        tour, stats = multi_start_search(matrix, budget, workers=1)
+        # the summed moves pass the cap, but only the time limit ends the search
+        assert budget.iterations > 5 and stats['starts'] > 1
+        assert budget.elapsed_ms >= 290
+
+    def test_needs_time_limit(self, matrix):
+        with pytest.raises(ValueError):
+            multi_start_search(matrix, SearchBudget(max_iterations=10))
+
+    def test_optimizer_reports_convergence(self):
+        result = RouteOptimizer(*LEFKOSA).optimize(
+            make_deliveries(30), 'multi_start', time_limit=0.2, workers=1
+        )
+        assert result['algorithm'] == 'multi_start'
+        assert result['total_km'] <= result['baseline_km']
+        assert result['starts'] >= 1 and result['convergence']
+
+
+class TestPolyline:
+    def test_reference_example(self):
+        # Example from the Google polyline algorithm documentation
+        points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        encoded = encode_polyline(points)
+        assert encoded == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+        assert decode_polyline(encoded) == points
+
+    def test_round_trip_and_size(self):
+        rng = np.random.default_rng(5)
+        # Road-like geometry: small steps from point to point
+        walk = np.array([35.18, 33.38]) + np.cumsum(rng.normal(0, 0.002, size=(200, 2)), axis=0)
+        points = [tuple(p) for p in np.round(walk, 5)]
+        encoded = encode_polyline(points)
+        assert decode_polyline(encoded) == pytest.approx(points)
+        assert len(encoded) < len(json.dumps(points)) / 3
+
+    def test_straight_segments_without_road_network(self):
+        lats, lngs = [35.18, 35.33, 35.19], [33.38, 33.31, 33.36]
+        points = decode_polyline(route_polyline(HaversineDistanceProvider(), lats, lngs))
+        assert points == list(zip(lats, lngs))
+        assert encode_polyline([]) == '' and decode_polyline('') == []
@@ -0,0 +1,111 @@
+"""
+Tests for what-if route comparison and committing a compared plan.
+"""
+from datetime import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import Delivery, DeliveryRoute, DepotLocation
+from products.services.route_optimizer import compare_scenarios
+from .test_route_api import RouteAPITestCase
+
+
+class TestRouteComparison(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.url = reverse('delivery-route-compare')
+        self.deliveries = self.create_deliveries()
+        self.other_depot = DepotLocation.objects.create(
+            name='Girne Depo', latitude=Decimal('35.3364'), longitude=Decimal('33.3199')
+        )
+
+    def compare(self, **body):
+        body.setdefault('date', str(self.route_date))
+        body.setdefault('time_limit', 0.2)
+        body.setdefault('scenarios', [
+            {'label': 'NN', 'algorithm': 'nearest_neighbor'},
+            {'label': 'Or-opt', 'algorithm': 'or_opt'},
+            {'label': '2 araç', 'algorithm': 'cvrp', 'vehicle_count': 2},
+            {'label': 'Girne', 'algorithm': 'two_opt', 'depot_id': self.other_depot.id},
+        ])
+        return self.client.post(self.url, body, format='json')
+
+    def commit_url(self, plan_id):
+        return reverse('delivery-route-commit-plan', kwargs={'plan_id': plan_id})
+
+    def test_compare_persists_nothing(self):
+        self.authenticate_admin()
+        response = self.compare()
+
+        assert response.status_code == status.HTTP_200_OK
+        plans = {plan['label']: plan for plan in response.data['scenarios']}
+        assert list(plans) == ['NN', 'Or-opt', '2 araç', 'Girne']
+        assert plans['Or-opt']['total_km'] <= plans['NN']['total_km']
+        assert plans['2 araç']['vehicles_used'] == 2
+        assert plans['Girne']['depot']['id'] == self.other_depot.id
+        for plan in plans.values():
+            assert plan['feasible'] and plan['duration_minutes'] > 0
+            assert sorted(i for route in plan['routes'] for i in route) == sorted(d.id for d in self.deliveries)
+        assert response.data['best_plan_id'] in {plan['plan_id'] for plan in plans.values()}
+
+        assert not DeliveryRoute.objects.exists()
+        assert not Delivery.objects.filter(route_batch_id__isnull=False).exists()
+
+    def test_commit_chosen_plan_once(self):
+        self.authenticate_admin()
+        plan = self.compare().data['scenarios'][2]
+
+        response = self.client.post(self.commit_url(plan['plan_id']))
+        assert response.status_code == status.HTTP_200_OK
+        assert DeliveryRoute.objects.count() == 2
+        assert sorted(response.data['route_ids']) == sorted(DeliveryRoute.objects.values_list('id', flat=True))
+        stops = [list(DeliveryRoute.objects.get(pk=pk).stops.order_by('stop_order').values_list('delivery_id', flat=True))
+                 for pk in response.data['route_ids']]
+        assert sorted(stops) == sorted(plan['routes'])
+
+        assert self.client.post(self.commit_url(plan['plan_id'])).status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_stale_plan_is_rejected(self):
+        self.authenticate_admin()
+        plan_id = self.compare().data['scenarios'][0]['plan_id']
+        Delivery.objects.filter(pk=self.deliveries[0].pk).update(status='DELIVERED')
+
+        response = self.client.post(self.commit_url(plan_id))
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not DeliveryRoute.objects.exists()
+
+    def test_invalid_requests(self):
+        self.authenticate_admin()
+        assert self.compare(scenarios=[]).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.compare(scenarios=[{'algorithm': 'magic'}]).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.compare(scenarios=[{'vehicle_count': 0}]).status_code == status.HTTP_400_BAD_REQUEST
+        assert self.compare(scenarios=[{'depot_id': 999999}]).status_code == status.HTTP_404_NOT_FOUND
+        assert self.compare(date='07.01.2026').status_code == status.HTTP_400_BAD_REQUEST
+        assert self.client.post(self.commit_url('0' * 32)).status_code == status.HTTP_400_BAD_REQUEST
+
+        self.authenticate_customer()
+        assert self.compare().status_code == status.HTTP_403_FORBIDDEN
+
+    def test_summary_flags_missed_time_windows(self):
+        data = [
+            {'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng),
+             'window_start': None, 'window_end': None}
+            for d in self.deliveries
+        ]
+        data[-1]['window_end'] = 9 * 60 + 1  # 09:01, unreachable with a 09:00 departure
+        depot = {'id': self.depot.id, 'lat': float(self.depot.latitude), 'lng': float(self.depot.longitude)}
+        options = {'departure_minutes': time(9).hour * 60}
+        scenarios = [
+            {'depot': 0, 'algorithm': 'nearest_neighbor', 'options': options},
+            {'depot': 0, 'algorithm': 'vrptw', 'options': options},
+        ]
+
+        nearest, windows = compare_scenarios(data, [depot], scenarios, parallel=False)
+        assert nearest['summary']['late_deliveries'] == [data[-1]['id']]
+        assert not nearest['summary']['feasible']
+        assert windows['summary']['unrouted_deliveries'] == [data[-1]['id']]
+        assert 'order' not in data[0]  # input dicts are left untouched
@@ -0,0 +1,118 @@
+"""
+Tests for the grid-cell spatial index and the nearby endpoints.
+"""
+import random
+from decimal import Decimal
+
+import numpy as np
+from django.urls import reverse
+from rest_framework import status
+
+from products.models import CustomUser, Delivery, DepotLocation, ProductAssignment
+from products.services.route_optimizer import haversine_distance
+from products.services.spatial_index import (
+    MAX_PREFILTER_CELLS, cell_for, cells_for_bbox, points_in_polygon, rebuild_geo_cells, within_polygon,
+    within_radius
+)
+from .conftest import APITestCase
+
+CENTER = (35.1856, 33.3823)  # Lefkoşa
+
+
+class TestSpatialIndex(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        rng = random.Random(7)
+        cls.points = [
+            (round(CENTER[0] + rng.uniform(-0.15, 0.15), 6), round(CENTER[1] + rng.uniform(-0.15, 0.15), 6))
+            for _ in range(40)
+        ]
+        cls.customers = [
+            CustomUser.objects.create(
+                username=f'geo_customer_{index}', role='customer',
+                address_lat=Decimal(str(lat)), address_lng=Decimal(str(lng))
+            )
+            for index, (lat, lng) in enumerate(cls.points)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+
+    def test_geo_cell_maintained_on_save(self):
+        customer = self.customers[0]
+        self.assertEqual(customer.geo_cell, cell_for(*self.points[0]))
+
+        customer.address_lat, customer.address_lng = Decimal('35.3400'), Decimal('33.3200')
+        customer.save()
+        customer.refresh_from_db()
+        self.assertEqual(customer.geo_cell, cell_for(35.34, 33.32))
+
+        depot = DepotLocation.objects.create(name='Girne Depo', latitude=Decimal('35.3364'), longitude=Decimal('33.3182'))
+        self.assertEqual(depot.geo_cell, cell_for(35.3364, 33.3182))
+
+        # Delivery created by the ProductAssignment signal copies the customer coordinates
+        ProductAssignment.objects.create(customer=customer, product=self.product_fridge)
+        self.assertEqual(Delivery.objects.get(assignment__customer=customer).geo_cell, customer.geo_cell)
+
+    def test_radius_query_matches_brute_force(self):
+        radius_km = 8
+        expected = sorted(
+            (haversine_distance(*CENTER, lat, lng), customer.pk)
+            for customer, (lat, lng) in zip(self.customers, self.points)
+            if haversine_distance(*CENTER, lat, lng) <= radius_km
+        )
+        found = within_radius(CustomUser.objects.all(), *CENTER, radius_km)
+        self.assertEqual([c.pk for c in found], [pk for _, pk in expected])
+        self.assertAlmostEqual(found[0].distance_to_point_km, expected[0][0], places=3)
+
+    def test_polygon_query(self):
+        # Triangle covering the south-west half of the sample area
+        polygon = [(35.03, 33.23), (35.34, 33.23), (35.03, 33.54)]
+        found = {c.pk for c in within_polygon(CustomUser.objects.all(), polygon)}
+        lats, lngs = np.array(self.points).T
+        inside = points_in_polygon(lats, lngs, polygon)
+        self.assertEqual(found, {c.pk for c, keep in zip(self.customers, inside) if keep})
+        self.assertTrue(0 < len(found) < len(self.customers))
+
+    def test_rebuild_after_queryset_update(self):
+        CustomUser.objects.filter(pk=self.customers[0].pk).update(address_lat=Decimal('35.0000'))
+        self.assertEqual(rebuild_geo_cells(CustomUser), 1)
+        self.assertEqual(
+            CustomUser.objects.get(pk=self.customers[0].pk).geo_cell, cell_for(35.0, self.points[0][1])
+        )
+        self.assertEqual(rebuild_geo_cells(CustomUser), 0)
+
+    def test_large_area_skips_cell_prefilter(self):
+        self.assertIsNone(cells_for_bbox(34.0, 32.0, 36.0, 35.0))
+        self.assertLessEqual(len(cells_for_bbox(*CENTER, CENTER[0] + 0.1, CENTER[1] + 0.1)), MAX_PREFILTER_CELLS)
+
+    def test_deliveries_nearby_endpoint(self):
+        for customer in self.customers[:10]:
+            ProductAssignment.objects.create(customer=customer, product=self.product_fridge)
+        Delivery.objects.filter(assignment__customer=self.customers[0]).update(status='DELIVERED')
+
+        self.authenticate_admin()
+        response = self.client.get(
+            reverse('delivery-nearby'), {'lat': CENTER[0], 'lng': CENTER[1], 'radius_km': 50, 'status': 'WAITING'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 9)
+        distances = [row['distance_to_point_km'] for row in response.data['results']]
+        self.assertEqual(distances, sorted(distances))
+
+        response = self.client.get(reverse('delivery-nearby'), {'lat': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_customers_nearby_endpoint(self):
+        self.authenticate_seller()
+        response = self.client.get(reverse('customer-nearby'), {'bbox': '35.0,33.2,35.4,33.6', 'limit': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+
+        self.authenticate_customer()
+        response = self.client.get(reverse('customer-nearby'), {'lat': CENTER[0], 'lng': CENTER[1]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
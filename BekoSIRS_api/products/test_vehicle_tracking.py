@@ -0,0 +1,161 @@
+"""
+Tests for vehicle GPS ping ingestion, live tracking and downsampling.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from products.models import Delivery, VehiclePing
+from products.services.route_optimizer import RouteOptimizer
+from products.services.route_persistence import save_optimized_routes
+from products.services.vehicle_tracking import ping_buffer
+from .test_route_api import RouteAPITestCase
+
+BUFFER = {'max_rows': 5, 'max_age_seconds': 3600, 'flush_timer': False}
+
+
+@override_settings(BACKGROUND_JOBS_MODE='sync', VEHICLE_PING_BUFFER=BUFFER)
+class TestVehicleTracking(RouteAPITestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.deliveries = self.create_deliveries()
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in self.deliveries]
+        result = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude)).optimize(data)
+        [self.route] = save_optimized_routes([result], self.depot, self.route_date)
+        self.url = reverse('delivery-route-pings', kwargs={'pk': self.route.pk})
+
+    def tearDown(self):
+        ping_buffer.flush()
+        super().tearDown()
+
+    def pings(self, start, count, step=timedelta(seconds=5)):
+        return [
+            {'lat': 35.19 + i * 0.0001, 'lng': 33.38, 't': (start + i * step).isoformat(), 'speed': 40}
+            for i in range(count)
+        ]
+
+    def test_pings_are_buffered_and_bulk_written(self):
+        self.authenticate_admin()
+        now = timezone.now()
+        batch = self.pings(now, 3)[::-1]  # out of order
+
+        response = self.client.post(self.url, {'pings': batch}, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['accepted'] == 3 and response.data['flushed'] == 0
+        assert response.data['position']['lat'] == batch[0]['lat']
+        assert not VehiclePing.objects.exists()
+
+        response = self.client.post(self.url, {'pings': self.pings(now + timedelta(minutes=1), 3)}, format='json')
+        assert response.data['flushed'] == 6
+        assert VehiclePing.objects.filter(route=self.route).count() == 6
+
+        # A late batch of older pings does not move the truck back
+        response = self.client.post(self.url, {'pings': self.pings(now - timedelta(hours=1), 1)}, format='json')
+        assert response.data['position']['recorded_at'] > now
+
+    def test_invalid_batches(self):
+        self.authenticate_admin()
+        assert self.client.post(self.url, {'pings': []}, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        bad = {'pings': [{'lat': 'x', 'lng': 33.3}]}
+        assert self.client.post(self.url, bad, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        far = {'pings': [{'lat': 135, 'lng': 33.3}]}
+        assert self.client.post(self.url, far, format='json').status_code == status.HTTP_400_BAD_REQUEST
+        missing = reverse('delivery-route-pings', kwargs={'pk': 999999})
+        response = self.client.post(missing, {'pings': self.pings(timezone.now(), 1)}, format='json')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_customer_tracks_delivery_from_cache(self):
+        delivery = self.deliveries[0]
+        Delivery.objects.filter(pk=delivery.pk).update(status='OUT_FOR_DELIVERY')
+        self.authenticate_admin()
+        self.client.post(self.url, {'pings': self.pings(timezone.now(), 2)}, format='json')
+
+        self.client.force_authenticate(user=delivery.customer)
+        track_url = reverse('delivery-track', kwargs={'pk': delivery.pk})
+        response = self.client.get(track_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == 'OUT_FOR_DELIVERY'
+        assert response.data['position']['route_id'] == self.route.pk
+
+        with self.assertNumQueries(0):
+            assert self.client.get(track_url).data['position'] is not None
+
+        # Other customers cannot see it
+        self.authenticate_customer()
+        assert self.client.get(track_url).status_code == status.HTTP_404_NOT_FOUND
+
+    def test_status_change_refreshes_tracking(self):
+        delivery = self.deliveries[0]
+        self.authenticate_admin()
+        track_url = reverse('delivery-track', kwargs={'pk': delivery.pk})
+        assert self.client.get(track_url).data['position'] is None
+
+        self.client.post(self.url, {'pings': self.pings(timezone.now(), 1)}, format='json')
+        self.client.patch(reverse('delivery-detail', kwargs={'pk': delivery.pk}), {'status': 'OUT_FOR_DELIVERY'},
+                          format='json')
+        assert self.client.get(track_url).data['position'] is not None
+
+    def test_downsample_old_pings(self):
+        old = timezone.now() - timedelta(days=10)
+        VehiclePing.objects.bulk_create(
+            VehiclePing(route=self.route, recorded_at=old + timedelta(seconds=10 * i), lat=35.19, lng=33.38)
+            for i in range(60)
+        )
+        VehiclePing.objects.bulk_create(
+            VehiclePing(route=self.route, recorded_at=timezone.now() - timedelta(seconds=i), lat=35.19, lng=33.38)
+            for i in range(20)
+        )
+
+        out = StringIO()
+        call_command('downsample_vehicle_pings', '--older-than-days', '7', '--interval', '60', stdout=out)
+
+        old_left = VehiclePing.objects.filter(recorded_at__lt=timezone.now() - timedelta(days=7)).count()
+        assert old_left in (10, 11)  # one per minute (the first minute may be split)
+        assert VehiclePing.objects.count() == old_left + 20
+        assert f'{80 - old_left - 20} konum silindi' in out.getvalue()
+
+    def test_pings_of_route_deleted_by_reoptimization_are_dropped(self):
+        self.authenticate_admin()
+        now = timezone.now()
+        assert self.client.post(self.url, {'pings': self.pings(now, 3)}, format='json').data['flushed'] == 0
+
+        # Re-optimizing moves every stop to a new route and deletes the emptied one
+        data = [{'id': d.id, 'lat': float(d.customer.address_lat), 'lng': float(d.customer.address_lng)}
+                for d in self.deliveries]
+        result = RouteOptimizer(float(self.depot.latitude), float(self.depot.longitude)).optimize(data)
+        [new_route] = save_optimized_routes([result], self.depot, self.route_date)
+        assert new_route.pk != self.route.pk
+
+        # The cached lookup is gone: the old route no longer accepts pings
+        assert self.client.post(self.url, {'pings': self.pings(now, 1)}, format='json').status_code == 404
+
+        new_url = reverse('delivery-route-pings', kwargs={'pk': new_route.pk})
+        response = self.client.post(new_url, {'pings': self.pings(now, 3)}, format='json')
+        assert response.data['flushed'] == 3
+        assert VehiclePing.objects.filter(route=new_route).count() == 3
+        assert VehiclePing.objects.count() == 3
+
+    @override_settings(BACKGROUND_JOBS_MODE='worker', VEHICLE_PING_BUFFER={'max_rows': 500, 'max_age_seconds': 10})
+    def test_idle_buffer_is_flushed_without_thread_jobs(self):
+        self.authenticate_admin()
+        response = self.client.post(self.url, {'pings': self.pings(timezone.now(), 2)}, format='json')
+        assert response.data['flushed'] == 0
+
+        # No more pings arrive: the buffer's own timer is armed for max_age_seconds
+        timer = ping_buffer.timer
+        assert timer is not None and timer.interval == 10
+        timer.cancel()
+        # fire it here (the test database is not shared with other threads)
+        with mock.patch('products.services.vehicle_tracking.connections'):
+            timer.function()
+        assert len(ping_buffer) == 0 and ping_buffer.timer is None
+        assert VehiclePing.objects.filter(route=self.route).count() == 2
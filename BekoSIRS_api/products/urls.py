@@ -56,6 +56,9 @@ from products.views.customer_views import (
     CustomerManagementViewSet,
 )
 
+# Notification push stream (async view, SSE)
+from products.views.stream_views import notification_stream
+
 # Router ile ViewSet'leri kaydediyoruz
 router = DefaultRouter()
 router.register(r'products', ProductViewSet, basename='product')
@@ -88,6 +91,9 @@ router.register(r'depots', DepotLocationViewSet, basename='depot')
 router.register(r'customers', CustomerManagementViewSet, basename='customer')
 
 urlpatterns = [
+    # Router'daki notifications/{pk}/ rotasından önce gelmeli
+    path("notifications/stream/", notification_stream, name="notification-stream"),
+
     # Router üzerinden gelen tüm endpointler
     path('', include(router.urls)),
     path("my-products/", my_products_direct, name="my-products"),
@@ -19,6 +19,7 @@ from products.serializers import (
     ViewHistorySerializer, ReviewSerializer, ReviewCreateSerializer,
     NotificationSerializer, RecommendationSerializer
 )
+from products.permissions import IsSeller
 
 
 class WishlistViewSet(viewsets.ModelViewSet):
@@ -216,6 +217,19 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Notification.objects.filter(user=self.request.user).order_by('-created_at')
 
+    def perform_update(self, serializer):
+        """Keep the unread counter in step with is_read / type edits."""
+        from products.services.notification_counters import notification_changed, notification_state
+
+        previous = notification_state(serializer.instance)
+        notification_changed(previous, serializer.save())
+
+    def perform_destroy(self, instance):
+        from products.services.notification_counters import notification_deleted
+
+        instance.delete()
+        notification_deleted(instance)
+
     @action(detail=False, methods=['get'], url_path='all')
     def all_notifications(self, request):
         """
@@ -257,11 +271,15 @@ class NotificationViewSet(viewsets.ModelViewSet):
             title: string,
             message: string,
             notification_type: 'general' | 'price_drop' | 'restock' | 'recommendation',
-            target: 'all' | 'customers'
+            target: 'all' | 'customers',
+            async: false    # true: runs as a background job, returns 202 + job_id
         }
+        Recipients are streamed and inserted in fixed-size batches; progress of an
+        async send is polled with GET /api/notifications/send-bulk/jobs/{id}/.
         """
-        from products.models import CustomUser
-        
+        from products.services.jobs import enqueue_job, job_payload
+        from products.services.notification_fanout import send_bulk_notification
+
         user = request.user
         if user.role not in ['admin', 'seller']:
             return Response({'error': 'Yetkisiz erişim'}, status=status.HTTP_403_FORBIDDEN)
@@ -269,91 +287,120 @@ class NotificationViewSet(viewsets.ModelViewSet):
         title = request.data.get('title', '').strip()
         message = request.data.get('message', '').strip()
         notification_type = request.data.get('notification_type', 'general')
-        target = request.data.get('target', 'customers')
+        target = 'customers' if request.data.get('target', 'customers') == 'customers' else 'all'
         
         if not title or not message:
             return Response({'error': 'Başlık ve mesaj zorunludur'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Determine target users
-        if target == 'customers':
-            target_users = CustomUser.objects.filter(role='customer', notify_general=True)
-        else:  # all
-            target_users = CustomUser.objects.filter(notify_general=True)
-        
-        # Create notifications in bulk
-        notifications = [
-            Notification(
-                user=target_user,
-                notification_type=notification_type,
-                title=title,
-                message=message
-            )
-            for target_user in target_users
-        ]
-        
-        created = Notification.objects.bulk_create(notifications)
+
+        if str(request.data.get('async', False)).lower() in ('true', '1'):
+            job = enqueue_job('notification_bulk', {
+                'title': title,
+                'message': message,
+                'notification_type': notification_type,
+                'target': target,
+            }, user=user)
+            return Response(job_payload(job), status=status.HTTP_202_ACCEPTED)
+
+        count = send_bulk_notification(title, message, notification_type, target)
         
         return Response({
-            'success': f'{len(created)} kullanıcıya bildirim gönderildi',
-            'count': len(created)
+            'success': f'{count} kullanıcıya bildirim gönderildi',
+            'count': count
         })
 
+    @action(detail=False, methods=['get'], url_path=r'send-bulk/jobs/(?P<job_id>\d+)')
+    def send_bulk_job(self, request, job_id=None):
+        """GET /api/notifications/send-bulk/jobs/{id}/ - Progress of an async bulk send."""
+        from products.models import BackgroundJob
+        from products.services.jobs import check_stale, job_payload
+
+        if request.user.role not in ['admin', 'seller']:
+            return Response({'error': 'Yetkisiz erişim'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            job = BackgroundJob.objects.get(id=job_id, job_type='notification_bulk')
+        except BackgroundJob.DoesNotExist:
+            return Response({'error': 'İş bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(job_payload(check_stale(job)))
+
     @action(detail=False, methods=['get'], url_path='stats')
     def stats(self, request):
-        """GET /api/notifications/stats/ - Get notification statistics."""
+        """GET /api/notifications/stats/ - Get notification statistics (cached snapshot)."""
+        from products.services.notification_stats import notification_stats
+
         user = request.user
         if user.role not in ['admin', 'seller']:
             return Response({'error': 'Yetkisiz erişim'}, status=status.HTTP_403_FORBIDDEN)
         
-        total = Notification.objects.count()
-        read = Notification.objects.filter(is_read=True).count()
-        unread = Notification.objects.filter(is_read=False).count()
-        
-        by_type = {}
-        for notif_type in ['general', 'price_drop', 'restock', 'service_update', 'recommendation', 'warranty_expiry']:
-            by_type[notif_type] = Notification.objects.filter(notification_type=notif_type).count()
-        
-        return Response({
-            'total': total,
-            'read': read,
-            'unread': unread,
-            'by_type': by_type
-        })
+        return Response(notification_stats())
 
     @action(detail=False, methods=['get'], url_path='unread-count')
     def unread_count(self, request):
-        """GET /api/notifications/unread-count/ - Get unread count."""
-        count = Notification.objects.filter(user=request.user, is_read=False).count()
-        return Response({'count': count})
+        """GET /api/notifications/unread-count/ - Get unread count (served from the cached counter)."""
+        from products.services.notification_counters import unread_count
+
+        return Response({'count': unread_count(request.user.id)})
+
+    @action(detail=False, methods=['get'], url_path='poll')
+    def poll(self, request):
+        """
+        GET /api/notifications/poll/?after_id=120&timeout=5 - Long-poll for new notifications.
+        Answers at once if there are notifications newer than after_id, otherwise waits up
+        to timeout seconds (capped at NOTIFICATION_STREAM['long_poll_timeout'], as the wait
+        holds a sync worker) for a change. Returns {notifications, last_id, unread_count};
+        without after_id only notifications created from now on are returned.
+        GET /api/notifications/stream/ (ASGI server) pushes the same data as SSE.
+        """
+        from products.services.notification_stream import latest_id, long_poll, stream_config
+
+        limit = stream_config()['long_poll_timeout']
+        try:
+            after_id = request.query_params.get('after_id')
+            after_id = int(after_id) if after_id not in (None, '') else latest_id(request.user.id)
+            timeout = min(max(float(request.query_params.get('timeout', limit)), 0), limit)
+        except ValueError:
+            return Response({'error': 'after_id ve timeout sayı olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(long_poll(request.user.id, after_id, timeout))
 
     @action(detail=True, methods=['post'], url_path='read')
     def mark_as_read(self, request, pk=None):
         """POST /api/notifications/{id}/read/ - Mark as read."""
+        from products.services.notification_counters import notifications_read
+
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+            notifications_read(notification.user_id)
         return Response({'success': True})
 
     @action(detail=False, methods=['post'], url_path='read-all')
     def mark_all_read(self, request):
         """POST /api/notifications/read-all/ - Mark all as read."""
-        Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        from products.services.notification_counters import all_read
+
+        updated = Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        all_read(request.user.id, updated)
         return Response({'success': True})
 
     @action(detail=True, methods=['delete'], url_path='delete')
     def delete_notification(self, request, pk=None):
         """DELETE /api/notifications/{id}/delete/ - Delete a notification."""
+        from products.services.notification_counters import notification_deleted
+
         notification = self.get_object()
         # Admin can delete any, users can only delete their own
         if request.user.role not in ['admin', 'seller'] and notification.user != request.user:
             return Response({'error': 'Yetkisiz'}, status=status.HTTP_403_FORBIDDEN)
         notification.delete()
+        notification_deleted(notification)
         return Response({'success': True})
 
     @action(detail=False, methods=['delete'], url_path='clear-all')
     def clear_all(self, request):
         """DELETE /api/notifications/clear-all/ - Clear all user notifications."""
+        from products.services.notification_counters import cleared
+
         Notification.objects.filter(user=request.user).delete()
+        cleared(request.user.id)
         return Response({'success': True})
 
 
@@ -509,3 +556,25 @@ class CustomerManagementViewSet(viewsets.ModelViewSet):
             return CustomerUpdateSerializer
         return CustomerListSerializer
 
+    @action(detail=False, methods=['get'], permission_classes=[IsSeller])
+    def nearby(self, request):
+        """
+        GET /api/customers/nearby/?lat=35.19&lng=33.38&radius_km=5
+        Alan: lat/lng/radius_km, bbox=min_lat,min_lng,max_lat,max_lng veya
+        polygon=lat,lng;lat,lng;... (search filtresi geçerlidir).
+        """
+        from products.services.spatial_index import parse_area_params, query_area
+
+        try:
+            area = parse_area_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        customers = query_area(self.get_queryset(), area)
+        results = []
+        for customer, data in zip(customers, self.get_serializer(customers, many=True).data):
+            data['lat'] = float(customer.address_lat)
+            data['lng'] = float(customer.address_lng)
+            data['distance_to_point_km'] = getattr(customer, 'distance_to_point_km', None)
+            results.append(data)
+        return Response({'count': len(results), 'results': results})
@@ -141,10 +141,27 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             traceback.print_exc()
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def perform_update(self, serializer):
+        from products.services.delivery_status import sync_assignments
+        from products.services.route_bundle import mark_stops_changed
+        from products.services.vehicle_tracking import forget_deliveries
+
+        previous_status = serializer.instance.status
+        with transaction.atomic():
+            delivery = serializer.save()
+            # Satış kaydının durumu teslimatla aynı kalsın
+            if delivery.status != previous_status and delivery.assignment_id:
+                sync_assignments([delivery.assignment_id], delivery.status)
+            # Sürücü paketinde (bundle) bu durak değişmiş görünsün
+            mark_stops_changed([delivery.id])
+        forget_deliveries([delivery.id])
+
     def perform_destroy(self, instance):
         """
         Teslimat silindiğinde assignment durumunu geri al.
         """
+        from products.services.route_bundle import mark_stops_changed
+
         with transaction.atomic():
             # Check if assignment exists (it's optional in model)
             if hasattr(instance, 'assignment') and instance.assignment:
@@ -160,6 +177,7 @@ class DeliveryViewSet(viewsets.ModelViewSet):
                     # Assignment save fails (maybe user deleted?), log but continue
                     print(f"Error restoring assignment status: {e}")
             
+            mark_stops_changed([instance.id])
             instance.delete()
 
     @action(detail=False, methods=['get'])
@@ -205,11 +223,145 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             'scheduled_for_selected_date_count': scheduled_for_selected_date_count
         })
 
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def track(self, request, pk=None):
+        """
+        GET /api/deliveries/{id}/track/ - Teslimatım nerede?
+        Müşteri kendi teslimatını, personel tüm teslimatları görür. Yanıt önbellekten
+        verilir; araç konumu sadece teslimat yoldayken (OUT_FOR_DELIVERY) döner.
+        """
+        from products.services.vehicle_tracking import delivery_position
+
+        try:
+            tracking = delivery_position(int(pk), request.user)
+        except ValueError:
+            tracking = None
+        if tracking is None:
+            return Response({'error': 'Teslimat bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(tracking)
+
+    @action(detail=False, methods=['post'], url_path='bulk-status')
+    def bulk_status(self, request):
+        """
+        POST /api/deliveries/bulk-status/ - Birden çok teslimatın durumunu tek istekte değiştir.
+        Body: {updates: [{id: 1, status: "DELIVERED"}, ...]}
+           veya {delivery_ids: [1, 2, 3], status: "DELIVERED"}
+        Geçişler doğrulanır; biri bile geçersizse hiçbir değişiklik yapılmaz ve hatalar
+        teslimat bazında döner. Bağlı satış kayıtlarının durumu da güncellenir,
+        DELIVERED için delivered_at / delivered_by doldurulur.
+        """
+        from products.services.delivery_status import StatusTransitionError, bulk_transition
+
+        data = request.data
+        try:
+            if 'updates' in data:
+                pairs = [(int(item['id']), item['status']) for item in data['updates']]
+            else:
+                pairs = [(int(delivery_id), data['status']) for delivery_id in data.get('delivery_ids') or []]
+        except (TypeError, KeyError, ValueError):
+            return Response({'error': 'updates [{id, status}] veya delivery_ids ve status gereklidir'}, status=status.HTTP_400_BAD_REQUEST)
+
+        changes = {}
+        for delivery_id, target in pairs:
+            if changes.setdefault(delivery_id, target) != target:
+                return Response({'error': f'Teslimat {delivery_id} için birden fazla durum verildi'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = bulk_transition(changes, user=request.user)
+        except StatusTransitionError as exc:
+            return Response({'error': str(exc), 'errors': exc.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+
+    @action(detail=False, methods=['post'], url_path='plan-days')
+    def plan_days(self, request):
+        """
+        POST /api/deliveries/plan-days/ - Tarihsiz bekleyen teslimatları önümüzdeki günlere dağıt.
+        Body: {
+            days: 5,                  # planlama ufku (gün)
+            vehicle_capacity: 20,     # araç başına günlük adet
+            vehicles_per_day: 2,      # opsiyonel (default 1)
+            daily_capacities: [40, 40, 20],  # opsiyonel, gün bazında kapasite
+            start_date: "2026-01-08", # opsiyonel (default yarın)
+            dry_run: false            # true ise sadece plan döner, kayıt yapılmaz
+        }
+        Birbirine yakın müşteriler aynı güne toplanır; günlük kapasite ve zaman aralıkları aşılmaz.
+        """
+        from products.services.day_planner import plan_unscheduled_deliveries
+
+        data = request.data
+        try:
+            days = int(data.get('days', 5))
+            vehicles_per_day = int(data.get('vehicles_per_day', 1))
+            vehicle_capacity = float(data.get('vehicle_capacity', 0))
+            daily_capacities = [float(c) for c in data.get('daily_capacities') or []]
+        except (TypeError, ValueError):
+            return Response({'error': 'days, vehicles_per_day ve kapasiteler sayı olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= days <= 60 or vehicles_per_day < 1:
+            return Response({'error': 'days 1-60 arasında, vehicles_per_day pozitif olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+        if (daily_capacities and min(daily_capacities) < 0) or (not daily_capacities and vehicle_capacity <= 0):
+            return Response({'error': 'vehicle_capacity veya daily_capacities gerekli (pozitif)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        start_date = None
+        if data.get('start_date'):
+            try:
+                start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                return Response({'error': 'Geçersiz tarih formatı (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(plan_unscheduled_deliveries(
+            days=days,
+            vehicle_capacity=vehicle_capacity,
+            vehicles_per_day=vehicles_per_day,
+            start_date=start_date,
+            daily_capacities=daily_capacities or None,
+            dry_run=str(data.get('dry_run', False)).lower() in ('true', '1'),
+        ))
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        GET /api/deliveries/nearby/?lat=35.19&lng=33.38&radius_km=5&status=WAITING
+        Alan: lat/lng/radius_km, bbox=min_lat,min_lng,max_lat,max_lng veya
+        polygon=lat,lng;lat,lng;... (date ve status filtreleri geçerlidir).
+        Yarıçap sorgusunda sonuçlar yakından uzağa sıralanır.
+        """
+        from products.services.spatial_index import parse_area_params, query_area
+
+        try:
+            area = parse_area_params(request.query_params)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        deliveries = query_area(self.get_queryset(), area)
+        results = []
+        for delivery, data in zip(deliveries, self.get_serializer(deliveries, many=True).data):
+            data['lat'] = float(delivery.address_lat)
+            data['lng'] = float(delivery.address_lng)
+            data['distance_to_point_km'] = getattr(delivery, 'distance_to_point_km', None)
+            results.append(data)
+        return Response({'count': len(results), 'results': results})
+
 class DeliveryRouteViewSet(viewsets.ModelViewSet):
     """Teslimat rotası yönetimi ve optimizasyonu."""
     permission_classes = [IsAdminUser]
-    queryset = DeliveryRoute.objects.all()
+    queryset = DeliveryRoute.objects.prefetch_related(
+        'stops__delivery__assignment__customer', 'stops__delivery__assignment__product'
+    )
     serializer_class = DeliveryRouteSerializer
+
+    def perform_destroy(self, instance):
+        from products.services.vehicle_tracking import forget_routes
+
+        route_id = instance.pk
+        instance.delete()
+        forget_routes([route_id])
+
+    def get_queryset(self):
+        # Incremental changes load their own stops; skip the serializer prefetch
+        if self.action in ('insert_stop', 'remove_stop', 'bundle'):
+            return DeliveryRoute.objects.all()
+        return super().get_queryset()
     
     @action(detail=False, methods=['post'])
     def optimize(self, request):
@@ -219,54 +371,548 @@ class DeliveryRouteViewSet(viewsets.ModelViewSet):
             date: "2026-01-07",
             delivery_ids: [1, 2, 3],
             depot_id: 1,
-            algorithm: "nearest_neighbor"
+            algorithm: "nearest_neighbor" | "two_opt" | "or_opt" | "multi_start" | "cvrp" | "vrptw",
+            time_limit: 5,          # saniye (yerel arama için, opsiyonel)
+            workers: 4,             # multi_start: paralel süreç sayısı (opsiyonel, varsayılan en fazla 4)
+            max_iterations: 10000,  # opsiyonel (multi_start: başlangıç başına)
+            vehicle_count: 3,       # opsiyonel, >1 ise çok araçlı (CVRP)
+            vehicle_capacity: 12,   # opsiyonel, araç başına adet (ProductAssignment.quantity)
+            departure_time: "09:00",  # vrptw: depodan çıkış saati
+            shift_end: "18:00",       # vrptw: opsiyonel, son teslimat saati
+            multi_depot: false,       # true ise tüm depolar kullanılır (depot_id yok sayılır)
+            depot_strategy: "nearest", # multi_depot: "nearest" | "balanced"
+            async: false              # true ise iş kuyruğa alınır, 202 + job_id döner
         }
+        algorithm "cvrp" çok araçlı kapasiteli, "vrptw" teslimat zaman aralıklarına
+        uyan rotalama yapar. Zaman aralığına sığmayan teslimatlar "infeasible" olarak döner.
+        "multi_start" time_limit süresinin tamamını kullanır: farklı rastgele başlangıçlardan
+        paralel yerel aramalar yapar, en iyi rotayı ve yakınsama eğrisini ("convergence") döner.
+        multi_depot modunda her teslimat en yakın depoya atanır ve her depo ayrı bir
+        süreçte paralel optimize edilir; araç sayısı/kapasitesi depo başınadır.
+        async modunda ilerleme GET /api/delivery-routes/jobs/{id}/ ile izlenir.
+        """
+        from products.services.jobs import enqueue_job
+
+        params, error = self._parse_optimize_request(request.data)
+        if error:
+            return error
+
+        plan, error = self._prepare_optimization(params)
+        if error:
+            return error
+
+        if params['async']:
+            job = enqueue_job('route_optimize', params, user=request.user)
+            return Response(self._job_payload(job), status=status.HTTP_202_ACCEPTED)
+
+        return Response(self._execute_optimization(plan, params))
+
+    @action(detail=False, methods=['post'])
+    def compare(self, request):
+        """
+        POST /api/delivery-routes/compare/ - Farklı ayarları kaydetmeden karşılaştır (what-if).
+        Body: {
+            date: "2026-01-07",
+            delivery_ids: [1, 2, 3],   # opsiyonel
+            time_limit: 2,             # senaryolar için ortak ayarlar (optimize ile aynı alanlar)
+            scenarios: [
+                {label: "NN", algorithm: "nearest_neighbor"},
+                {label: "2 araç", algorithm: "cvrp", vehicle_count: 2},
+                {label: "B deposu", algorithm: "or_opt", depot_id: 2}
+            ]
+        }
+        Senaryolar aynı mesafe matrisi üzerinde paralel süreçlerde çözülür, hiçbir şey
+        kaydedilmez. Her senaryo için mesafe, süre, uygunluk ve plan_id döner; seçilen plan
+        POST /api/delivery-routes/plans/{plan_id}/commit/ ile kaydedilir.
         """
-        from products.services.route_optimizer import RouteOptimizer
         from products.models import DepotLocation
-        
-        date_str = request.data.get('date')
-        delivery_ids = request.data.get('delivery_ids', [])
-        depot_id = request.data.get('depot_id')
-        algorithm = request.data.get('algorithm', 'nearest_neighbor')
-        
+        from products.services.route_optimizer import RouteOptimizer
+        from products.services.route_scenarios import MAX_SCENARIOS, compare_plans
+        from products.services.route_schedule import ScheduleProfile
+
+        data = request.data
+        raw_scenarios = data.get('scenarios')
+        if not isinstance(raw_scenarios, list) or not raw_scenarios:
+            return Response({'error': 'scenarios boş olmayan bir liste olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(raw_scenarios) > MAX_SCENARIOS:
+            return Response({'error': f'En fazla {MAX_SCENARIOS} senaryo karşılaştırılabilir'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            route_date = datetime.strptime(data.get('date') or '', '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return Response({'error': 'Geçersiz tarih formatı (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        base = {key: value for key, value in data.items() if key != 'scenarios'}
+        profile = ScheduleProfile()
+        algorithms = RouteOptimizer.ALGORITHMS + RouteOptimizer.FLEET_ALGORITHMS
+        scenarios, depots, depot_index = [], [], {}
+        for number, raw in enumerate(raw_scenarios, start=1):
+            if not isinstance(raw, dict):
+                return Response({'error': f'Senaryo {number}: geçersiz senaryo'}, status=status.HTTP_400_BAD_REQUEST)
+            merged = {**base, **raw}
+            algorithm = merged.get('algorithm', 'nearest_neighbor')
+            if algorithm not in algorithms:
+                return Response({
+                    'error': f'Senaryo {number}: geçersiz algoritma: {algorithm}',
+                    'algorithms': list(algorithms)
+                }, status=status.HTTP_400_BAD_REQUEST)
+            options, error = self._parse_optimize_options(merged)
+            if error:
+                return Response({'error': f'Senaryo {number}: {error}'}, status=status.HTTP_400_BAD_REQUEST)
+            options['travel_model'] = profile
+
+            depot_id = merged.get('depot_id')
+            if depot_id not in depot_index:
+                try:
+                    depot = DepotLocation.objects.get(id=depot_id) if depot_id else DepotLocation.objects.get(is_default=True)
+                except (DepotLocation.DoesNotExist, TypeError, ValueError):
+                    return Response({'error': f'Senaryo {number}: depo bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+                depot_index[depot_id] = len(depots)
+                depots.append(depot)
+            scenarios.append({
+                'label': str(raw.get('label') or f'Senaryo {number}'),
+                'depot': depot_index[depot_id],
+                'algorithm': algorithm,
+                'options': options,
+            })
+
+        delivery_ids = self._parse_id_list(data.get('delivery_ids', []))
+        if delivery_ids is None:
+            return Response({'error': 'delivery_ids tam sayı listesi olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+        deliveries_data, missing_coords = self._load_deliveries_data(route_date, delivery_ids)
+        if missing_coords:
+            return Response({
+                'error': 'Bazı teslimatların koordinatı eksik',
+                'missing_coordinates': missing_coords
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if not deliveries_data:
+            return Response({'error': 'Optimize edilecek teslimat yok'}, status=status.HTTP_400_BAD_REQUEST)
+
+        plans = [self._plan_payload(plan) for plan in compare_plans(deliveries_data, depots, scenarios, route_date)]
+        feasible = [plan for plan in plans if plan['feasible']]
+        return Response({
+            'date': str(route_date),
+            'delivery_count': len(deliveries_data),
+            'best_plan_id': min(feasible, key=lambda plan: plan['total_km'])['plan_id'] if feasible else None,
+            'scenarios': plans,
+        })
+
+    @action(detail=False, methods=['post'], url_path=r'plans/(?P<plan_id>[0-9a-f]{32})/commit')
+    def commit_plan(self, request, plan_id=None):
+        """
+        POST /api/delivery-routes/plans/{plan_id}/commit/ - Karşılaştırmada seçilen planı kaydet.
+        Plan, teslimatları hâlâ o gün için bekliyorsa optimize ile aynı şekilde kaydedilir.
+        """
+        from products.services.route_scenarios import PlanError, commit_plan
+
+        try:
+            result, routes = commit_plan(plan_id)
+        except PlanError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = self._result_payload(result, result['depot'])
+        payload['route_ids'] = [route.id for route in routes]
+        return Response(payload)
+
+    @action(detail=True, methods=['get', 'post'], url_path='schedule')
+    def schedule(self, request, pk=None):
+        """
+        GET  /api/delivery-routes/{id}/schedule/ - Durak bazında tahmini varış saatleri.
+        POST /api/delivery-routes/{id}/schedule/ - { departure_time: "09:30" } ile yeniden hesapla.
+        """
+        from products.services.route_schedule import compute_schedules, schedule_payload
+
+        route = self.get_object()
+        if request.method == 'POST':
+            try:
+                departure_minutes = self._parse_minutes(request.data.get('departure_time'))
+            except (TypeError, ValueError):
+                return Response({'error': 'Geçersiz saat formatı (HH:MM)'}, status=status.HTTP_400_BAD_REQUEST)
+            stops = compute_schedules([route], departure_minutes)[route.pk]
+        else:
+            stops = route.stops.select_related('delivery').order_by('stop_order')
+
+        return Response({
+            'route_id': route.id,
+            'planned_departure': route.planned_departure,
+            'total_duration_min': route.total_duration_min,
+            'stops': schedule_payload(stops)
+        })
+
+    @action(detail=True, methods=['post'], url_path='delay')
+    def delay(self, request, pk=None):
+        """
+        POST /api/delivery-routes/{id}/delay/ - Gecikme bildir.
+        Body: { delivery_id: 12, delay_minutes: 25 }
+        Sadece gecikmeli durak ve sonrasındaki durakların ETA'sı güncellenir.
+        """
+        from products.services.route_schedule import MAX_DELAY_MINUTES, apply_delay, schedule_payload
+
+        route = self.get_object()
+        try:
+            delay_minutes = float(request.data.get('delay_minutes'))
+        except (TypeError, ValueError):
+            return Response({'error': 'delay_minutes sayı olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+        # nan/inf and huge values would overflow timedelta in apply_delay
+        if not math.isfinite(delay_minutes) or abs(delay_minutes) > MAX_DELAY_MINUTES:
+            return Response(
+                {'error': f'delay_minutes -{MAX_DELAY_MINUTES} ile {MAX_DELAY_MINUTES} dakika arasında olmalıdır'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            stop = route.stops.get(delivery_id=request.data.get('delivery_id'))
+        except (DeliveryRouteStop.DoesNotExist, ValueError):
+            return Response({'error': 'Teslimat bu rotada değil'}, status=status.HTTP_404_NOT_FOUND)
+
+        stops = apply_delay(route, stop, delay_minutes)
+        return Response({
+            'route_id': route.id,
+            'total_duration_min': route.total_duration_min,
+            'updated_stops': schedule_payload(stops)
+        })
+
+    @action(detail=True, methods=['get'])
+    def bundle(self, request, pk=None):
+        """
+        GET /api/delivery-routes/{id}/bundle/?since_version=7 - Sürücü uygulaması için rota paketi.
+        Sıralı duraklar, adres, telefon, ürün, ETA ve polyline tek yanıtta döner.
+        since_version verilirse sadece o sürümden sonra değişen duraklar (ve güncel
+        durak sırası "order") gönderilir; polyline sadece değiştiyse eklenir.
+        """
+        from products.services.route_bundle import route_bundle
+
+        since_version = request.query_params.get('since_version')
+        try:
+            since_version = int(since_version) if since_version not in (None, '') else None
+        except ValueError:
+            return Response({'error': 'since_version sayı olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(route_bundle(self.get_object(), since_version))
+
+    @action(detail=True, methods=['post'])
+    def pings(self, request, pk=None):
+        """
+        POST /api/delivery-routes/{id}/pings/ - Araç GPS konumlarını toplu gönder.
+        Body: { pings: [{lat: 35.19, lng: 33.38, t: "2026-01-07T10:15:02+03:00", speed: 42, heading: 90}, ...] }
+        Son konum önbelleğe yazılır; konumlar tamponlanıp toplu (bulk_create) kaydedilir.
+        """
+        from products.services.vehicle_tracking import PingError, record_pings, route_exists
+
+        try:
+            route_id = int(pk)
+        except ValueError:
+            route_id = None
+        if route_id is None or not route_exists(route_id):
+            return Response({'error': 'Rota bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            result = record_pings(route_id, request.data.get('pings'))
+        except PingError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'], url_path='insert-stop')
+    def insert_stop(self, request, pk=None):
+        """
+        POST /api/delivery-routes/{id}/insert-stop/ - Kayıtlı rotaya teslimat ekle.
+        Body: { delivery_id: 12 }
+        Teslimat en ucuz konuma eklenir ve çevresi yerel olarak iyileştirilir;
+        tüm gün yeniden optimize edilmez, sadece değişen kayıtlar güncellenir.
+        """
+        from products.services.route_incremental import RouteChangeError, insert_delivery
+
+        return self._change_route(request, insert_delivery, RouteChangeError)
+
+    @action(detail=True, methods=['post'], url_path='remove-stop')
+    def remove_stop(self, request, pk=None):
+        """
+        POST /api/delivery-routes/{id}/remove-stop/ - Teslimatı rotadan çıkar (iptal vb.).
+        Body: { delivery_id: 12 }
+        """
+        from products.services.route_incremental import RouteChangeError, remove_delivery
+
+        return self._change_route(request, remove_delivery, RouteChangeError)
+
+    def _change_route(self, request, change, error_class):
+        route = self.get_object()
+        try:
+            delivery = Delivery.objects.select_related('assignment__customer').get(
+                id=request.data.get('delivery_id')
+            )
+        except (Delivery.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Teslimat bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            return Response(change(route, delivery))
+        except error_class as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['get'], url_path=r'jobs/(?P<job_id>\d+)')
+    def job_status(self, request, job_id=None):
+        """
+        GET /api/delivery-routes/jobs/{id}/ - Arka plan optimizasyonunun durumu.
+        Çalıştıran süreci ölmüş (JOB_STALE_SECONDS boyunca ilerleme bildirmeyen) işler FAILED olur.
+        """
+        from products.models import BackgroundJob
+        from products.services.jobs import check_stale
+
+        try:
+            job = BackgroundJob.objects.get(id=job_id, job_type='route_optimize')
+        except BackgroundJob.DoesNotExist:
+            return Response({'error': 'İş bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(self._job_payload(check_stale(job)))
+
+    @action(detail=False, methods=['post'], url_path=r'jobs/(?P<job_id>\d+)/cancel')
+    def cancel_job(self, request, job_id=None):
+        """POST /api/delivery-routes/jobs/{id}/cancel/ - Çalışan optimizasyonu durdur (en iyi çözüm saklanır)."""
+        from products.models import BackgroundJob
+        from products.services.jobs import request_cancel
+
+        try:
+            job = BackgroundJob.objects.get(id=job_id, job_type='route_optimize')
+        except BackgroundJob.DoesNotExist:
+            return Response({'error': 'İş bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+        if job.is_finished:
+            return Response({'error': 'İş zaten tamamlandı'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self._job_payload(request_cancel(job)))
+
+    @staticmethod
+    def _job_payload(job):
+        from products.services.jobs import job_payload
+
+        return job_payload(job)
+
+    def _parse_optimize_request(self, data):
+        """
+        Optimize body'sini doğrula ve JSON olarak saklanabilir parametrelere çevir.
+        Returns: (params, error_response)
+        """
+        from products.services.route_optimizer import RouteOptimizer
+
+        date_str = data.get('date')
+        algorithm = data.get('algorithm', 'nearest_neighbor')
+        depot_strategy = data.get('depot_strategy', 'nearest')
+
         # Validation
         if not date_str:
-            return Response({'error': 'date zorunludur'}, status=status.HTTP_400_BAD_REQUEST)
-        
+            return None, Response({'error': 'date zorunludur'}, status=status.HTTP_400_BAD_REQUEST)
+
+        algorithms = RouteOptimizer.ALGORITHMS + RouteOptimizer.FLEET_ALGORITHMS
+        if algorithm not in algorithms:
+            return None, Response({
+                'error': f'Geçersiz algoritma: {algorithm}',
+                'algorithms': list(algorithms)
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if depot_strategy not in ('nearest', 'balanced'):
+            return None, Response({'error': 'depot_strategy "nearest" veya "balanced" olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+
+        delivery_ids = self._parse_id_list(data.get('delivery_ids', []))
+        if delivery_ids is None:
+            return None, Response({'error': 'delivery_ids tam sayı listesi olmalıdır'}, status=status.HTTP_400_BAD_REQUEST)
+
+        run_async = str(data.get('async', False)).lower() in ('true', '1')
+        options, error = self._parse_optimize_options(data, job=run_async)
+        if error:
+            return None, Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            route_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            datetime.strptime(date_str, '%Y-%m-%d')
         except ValueError:
-            return Response({'error': 'Geçersiz tarih formatı (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Get depot
-        if depot_id:
+            return None, Response({'error': 'Geçersiz tarih formatı (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return {
+            'date': date_str,
+            'delivery_ids': delivery_ids,
+            'depot_id': data.get('depot_id'),
+            'algorithm': algorithm,
+            'multi_depot': str(data.get('multi_depot', False)).lower() in ('true', '1'),
+            'depot_strategy': depot_strategy,
+            'async': run_async,
+            'options': options,
+        }, None
+
+    def _prepare_optimization(self, params):
+        """
+        Depo(lar)ı ve günün teslimatlarını yükle.
+        Returns: ({'depots': [...], 'deliveries': [...], 'route_date': date}, error_response)
+        """
+        from products.models import DepotLocation
+
+        # Get depot(s)
+        if params['multi_depot']:
+            depots = list(DepotLocation.objects.all())
+            if not depots:
+                return None, Response({'error': 'Tanımlı depo yok'}, status=status.HTTP_400_BAD_REQUEST)
+        elif params['depot_id']:
             try:
-                depot = DepotLocation.objects.get(id=depot_id)
+                depots = [DepotLocation.objects.get(id=params['depot_id'])]
             except DepotLocation.DoesNotExist:
-                return Response({'error': 'Depo bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
+                return None, Response({'error': 'Depo bulunamadı'}, status=status.HTTP_404_NOT_FOUND)
         else:
             # Get default depot
             try:
-                depot = DepotLocation.objects.get(is_default=True)
+                depots = [DepotLocation.objects.get(is_default=True)]
             except DepotLocation.DoesNotExist:
-                return Response({'error': 'Varsayılan depo bulunamadı. Lütfen depo seçin.'}, status=status.HTTP_400_BAD_REQUEST)
-        
+                return None, Response({'error': 'Varsayılan depo bulunamadı. Lütfen depo seçin.'}, status=status.HTTP_400_BAD_REQUEST)
+
         # Get deliveries
-        if delivery_ids:
-            deliveries = Delivery.objects.filter(
-                id__in=delivery_ids,
-                scheduled_date=route_date,
-                status='WAITING'
+        route_date = datetime.strptime(params['date'], '%Y-%m-%d').date()
+        deliveries_data, missing_coords = self._load_deliveries_data(route_date, params['delivery_ids'])
+
+        if not deliveries_data and not missing_coords:
+            return None, Response({'error': 'Optimize edilecek teslimat yok'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if missing_coords:
+            return None, Response({
+                'error': 'Bazı teslimatların koordinatı eksik',
+                'missing_coordinates': missing_coords
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return {'depots': depots, 'deliveries': deliveries_data, 'route_date': route_date}, None
+
+    def _execute_optimization(self, plan, params, context=None):
+        """
+        Optimizasyonu çalıştır ve rotaları kaydet. İptal edilen işlerde rotalar kaydedilmez.
+        context: arka plan işinde JobContext (ilerleme, checkpoint, iptal)
+        """
+        from products.services.route_optimizer import RouteOptimizer, optimize_multi_depot, result_routes
+        from products.services.distance_cache import get_distance_provider
+        from products.services.route_persistence import save_optimized_routes
+        from products.services.route_schedule import ScheduleProfile
+
+        deliveries_data, route_date = plan['deliveries'], plan['route_date']
+        options = dict(params['options'])
+        # Plan with the travel-time model the stored schedule is computed with
+        options['travel_model'] = ScheduleProfile()
+        distance_provider = get_distance_provider()
+        if context is not None:
+            options['on_progress'] = context.on_progress
+            context.map_solution = lambda solution: self._solution_ids(solution, deliveries_data)
+
+        if params['multi_depot']:
+            depots = plan['depots']
+            result = optimize_multi_depot(
+                deliveries_data,
+                [self._depot_info(d) for d in depots],
+                algorithm=params['algorithm'],
+                strategy=params['depot_strategy'],
+                distance_provider=distance_provider,
+                **options
             )
-        else:
-            deliveries = Delivery.objects.filter(
-                scheduled_date=route_date,
-                status='WAITING'
+            if not result['cancelled']:
+                depots_by_id = {d.id: d for d in depots}
+                with transaction.atomic():
+                    for depot_result in result['depots']:
+                        save_optimized_routes(
+                            result_routes(depot_result), depots_by_id[depot_result['depot']['id']],
+                            route_date, options['departure_minutes'], distance_provider
+                        )
+
+            payloads = [self._result_payload(r, r['depot']) for r in result['depots']]
+            return {
+                'success': True,
+                'multi_depot': True,
+                'algorithm': result['algorithm'],
+                'strategy': result['strategy'],
+                'total_km': result['total_km'],
+                'runtime_ms': result['runtime_ms'],
+                'cancelled': result['cancelled'],
+                'depots': payloads,
+                'delivery_count': sum(p['delivery_count'] for p in payloads)
+            }
+
+        # Optimize using service
+        depot = plan['depots'][0]
+        optimizer = RouteOptimizer(
+            depot_lat=float(depot.latitude),
+            depot_lng=float(depot.longitude),
+            distance_provider=distance_provider
+        )
+        result = optimizer.optimize(deliveries_data, params['algorithm'], **options)
+        if not result['cancelled']:
+            save_optimized_routes(
+                result_routes(result), depot, route_date, options['departure_minutes'], distance_provider
             )
-        
-        if not deliveries.exists():
-            return Response({'error': 'Optimize edilecek teslimat yok'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return self._result_payload(result, self._depot_info(depot))
+
+    @staticmethod
+    def _solution_ids(solution, deliveries_data):
+        """Solver incumbent (matris indeksleri) -> teslimat ID listesi / araç başına listeler."""
+        if solution and isinstance(solution[0], list):
+            return [[deliveries_data[i - 1]['id'] for i in route] for route in solution]
+        return [deliveries_data[i - 1]['id'] for i in solution if i > 0]
+
+    def _parse_optimize_options(self, data, job=False):
+        """
+        Body'deki solver parametrelerini ayrıştır.
+        job: arka plan işi için daha uzun time_limit kabul edilir
+        Returns: (options, error_message)
+        """
+        from products.services.route_optimizer import (
+            DEFAULT_TIME_LIMIT_SECONDS, DEFAULT_MAX_ITERATIONS, DEFAULT_DEPARTURE_MINUTES,
+            MAX_SYNC_TIME_LIMIT_SECONDS, MAX_JOB_TIME_LIMIT_SECONDS
+        )
+
+        try:
+            time_limit = float(data.get('time_limit', DEFAULT_TIME_LIMIT_SECONDS))
+            max_iterations = int(data.get('max_iterations', DEFAULT_MAX_ITERATIONS))
+        except (TypeError, ValueError):
+            return None, 'time_limit ve max_iterations sayı olmalıdır'
+
+        # SearchBudget treats 0 as "no deadline" and multi_start needs a deadline:
+        # never let a request run unbounded
+        max_time_limit = MAX_JOB_TIME_LIMIT_SECONDS if job else MAX_SYNC_TIME_LIMIT_SECONDS
+        if not 0 < time_limit <= max_time_limit:
+            return None, f'time_limit 0 ile {max_time_limit:g} saniye arasında olmalıdır'
+        if max_iterations < 1:
+            return None, 'max_iterations pozitif olmalıdır'
+
+        try:
+            vehicle_count = int(data.get('vehicle_count', 1))
+            vehicle_capacity = data.get('vehicle_capacity')
+            vehicle_capacity = float(vehicle_capacity) if vehicle_capacity not in (None, '') else None
+        except (TypeError, ValueError):
+            return None, 'vehicle_count ve vehicle_capacity sayı olmalıdır'
+
+        if vehicle_count < 1 or (vehicle_capacity is not None and vehicle_capacity <= 0):
+            return None, 'Araç sayısı ve kapasitesi pozitif olmalıdır'
+
+        try:
+            workers = data.get('workers')
+            workers = int(workers) if workers not in (None, '') else None
+        except (TypeError, ValueError):
+            return None, 'workers sayı olmalıdır'
+        if workers is not None and workers < 1:
+            return None, 'workers pozitif olmalıdır'
+
+        try:
+            departure_minutes = self._parse_minutes(data.get('departure_time'))
+            shift_end_minutes = self._parse_minutes(data.get('shift_end'))
+        except (TypeError, ValueError):
+            return None, 'Geçersiz saat formatı (HH:MM)'
+
+        return {
+            'time_limit': time_limit,
+            'max_iterations': max_iterations,
+            'vehicle_count': vehicle_count,
+            'vehicle_capacity': vehicle_capacity,
+            'departure_minutes': DEFAULT_DEPARTURE_MINUTES if departure_minutes is None else departure_minutes,
+            'shift_end_minutes': shift_end_minutes,
+            'workers': workers,
+        }, None
+
+    def _load_deliveries_data(self, route_date, delivery_ids=None):
+        """
+        Günün bekleyen teslimatlarını optimizer formatına çevir.
+        Returns: (deliveries_data, missing_coords)
+        """
+        deliveries = Delivery.objects.filter(
+            scheduled_date=route_date, status='WAITING'
+        ).select_related('assignment__customer__district', 'assignment__product')
+        if delivery_ids:
+            deliveries = deliveries.filter(id__in=delivery_ids)
         
         # Check for missing coordinates
         missing_coords = []
@@ -290,47 +936,104 @@ class DeliveryRouteViewSet(viewsets.ModelViewSet):
                     'lat': float(lat),
                     'lng': float(lng),
                     'customer_name': customer.first_name if customer else '',
-                    'product_name': delivery.assignment.product.name if delivery.assignment else ''
+                    'product_name': delivery.assignment.product.name if delivery.assignment else '',
+                    'demand': delivery.assignment.quantity if delivery.assignment else 1,
+                    'window_start': self._time_to_minutes(delivery.time_window_start),
+                    'window_end': self._time_to_minutes(delivery.time_window_end),
+                    'district': customer.district.name if customer and customer.district else None,
                 })
-        
-        if missing_coords:
-            return Response({
-                'error': 'Bazı teslimatların koordinatı eksik',
-                'missing_coordinates': missing_coords
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Optimize using service
-        optimizer = RouteOptimizer(
-            depot_lat=float(depot.latitude),
-            depot_lng=float(depot.longitude)
-        )
-        
-        result = optimizer.optimize_deliveries(deliveries_data, algorithm=algorithm)
-        
-        # Update delivery records
-        with transaction.atomic():
-            for optimized in result['optimized_deliveries']:
-                delivery = Delivery.objects.get(id=optimized['id'])
-                delivery.delivery_order = optimized['order']
-                delivery.distance_km = optimized['distance_from_previous']
-                delivery.route_batch_id = result['batch_id']
-                delivery.depot = depot
-                delivery.save()
-        
-        return Response({
+
+        return deliveries_data, missing_coords
+
+    @staticmethod
+    def _depot_info(depot):
+        return {
+            'id': depot.id,
+            'name': depot.name,
+            'lat': float(depot.latitude),
+            'lng': float(depot.longitude)
+        }
+
+    @staticmethod
+    def _result_payload(result, depot_info):
+        """Solver sonucunu API yanıtına çevir (tek rota veya araç başına rota)."""
+        if 'routes' in result:
+            return {
+                'success': True,
+                'algorithm': result['algorithm'],
+                'batch_ids': [route['batch_id'] for route in result['routes']],
+                'total_km': result['total_km'],
+                'vehicle_count': result['vehicle_count'],
+                'vehicle_capacity': result['vehicle_capacity'],
+                'runtime_ms': result['runtime_ms'],
+                'depot': depot_info,
+                'routes': result['routes'],
+                'unassigned': result.get('unassigned', []),
+                'infeasible': result.get('infeasible', []),
+                'cancelled': result.get('cancelled', False),
+                'delivery_count': sum(len(route['optimized_deliveries']) for route in result['routes'])
+            }
+
+        payload = {
             'success': True,
             'batch_id': result['batch_id'],
             'total_km': result['total_km'],
             'algorithm': result['algorithm'],
-            'depot': {
-                'id': depot.id,
-                'name': depot.name,
-                'lat': float(depot.latitude),
-                'lng': float(depot.longitude)
-            },
+            'baseline_km': result['baseline_km'],
+            'improvement_km': result['improvement_km'],
+            'improvement_pct': result['improvement_pct'],
+            'runtime_ms': result['runtime_ms'],
+            'depot': depot_info,
             'optimized_deliveries': result['optimized_deliveries'],
+            'cancelled': result.get('cancelled', False),
             'delivery_count': len(result['optimized_deliveries'])
-        })
+        }
+        if 'convergence' in result:
+            payload.update(starts=result['starts'], workers=result['workers'], convergence=result['convergence'])
+        return payload
+
+    @staticmethod
+    def _plan_payload(plan):
+        """Karşılaştırma sonucu: özet ve araç başına teslimat sırası."""
+        from products.services.route_optimizer import result_routes
+
+        result = plan['result']
+        return {
+            'plan_id': plan['plan_id'],
+            'label': plan['label'],
+            'algorithm': result['algorithm'],
+            'depot': result['depot'],
+            **result['summary'],
+            'runtime_ms': result['runtime_ms'],
+            'routes': [[stop['id'] for stop in route['optimized_deliveries']] for route in result_routes(result)],
+        }
+
+    @staticmethod
+    def _parse_id_list(value):
+        """[1, "2", ...] -> [1, 2, ...]; liste / tam sayı değilse None."""
+        if not isinstance(value, list):
+            return None
+        ids = []
+        for item in value:
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                return None
+            try:
+                ids.append(int(item))
+            except ValueError:
+                return None
+        return ids
+
+    @staticmethod
+    def _time_to_minutes(value):
+        """datetime.time -> gece yarısından itibaren dakika."""
+        return value.hour * 60 + value.minute if value else None
+
+    @staticmethod
+    def _parse_minutes(value):
+        """'HH:MM' -> dakika (boşsa None, hatalıysa ValueError)."""
+        if not value:
+            return None
+        return DeliveryRouteViewSet._time_to_minutes(datetime.strptime(value, '%H:%M').time())
 
     def _dist(self, lat1, lng1, lat2, lng2):
         # Haversine
@@ -340,3 +1043,12 @@ class DeliveryRouteViewSet(viewsets.ModelViewSet):
         a = math.sin(dLat/2) * math.sin(dLat/2) + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dLon/2) * math.sin(dLon/2)
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         return R * c
+
+
+def run_route_optimization_job(job, context):
+    """BackgroundJob handler for 'route_optimize' (see products.services.jobs)."""
+    view = DeliveryRouteViewSet()
+    plan, error = view._prepare_optimization(job.payload)
+    if error:
+        raise ValueError(error.data['error'])
+    return view._execute_optimization(plan, job.payload, context)
@@ -12,6 +12,7 @@ from django.http import HttpResponse
 
 from products.models import Product, Category, ProductOwnership, WishlistItem, Notification, ProductAssignment
 from products.serializers import ProductSerializer, CategorySerializer
+from products.permissions import IsSeller
 
 
 class ProductViewSet(viewsets.ModelViewSet):
@@ -22,6 +23,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ["list", "retrieve", "popular"]:
             return [AllowAny()]
+        if self.action == "bulk_stock":
+            return [IsSeller()]
         return [IsAuthenticated()]
 
     def get_queryset(self):
@@ -98,15 +101,43 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     def perform_update(self, serializer):
-        """Detect price changes and send notifications."""
+        """Detect price drops and restocks and send notifications."""
         instance = self.get_object()
         old_price = instance.price
+        old_stock = instance.stock
         new_price = serializer.validated_data.get('price', old_price)
         updated_instance = serializer.save()
 
         if new_price and new_price < old_price:
             self._send_price_drop_notifications(updated_instance, old_price, new_price)
 
+        from products.services.restock_notifier import is_restock, notify_restocked
+
+        if is_restock(old_stock, updated_instance.stock):
+            notify_restocked([updated_instance])
+
+    @action(detail=False, methods=['post'], url_path='bulk-stock')
+    def bulk_stock(self, request):
+        """
+        POST /api/products/bulk-stock/ - Birden çok ürünün stoğunu tek istekte güncelle.
+        Body: {items: [{id: 1, stock: 5}, ...]}
+        Satıcı ve admin kullanabilir. Stoğu 0'dan pozitife geçen ürünler için istek listesi
+        aboneleri bilgilendirilir.
+        """
+        from products.services.restock_notifier import StockUpdateError, update_stock
+
+        try:
+            changes = {int(item['id']): int(item['stock']) for item in request.data.get('items') or []}
+        except (TypeError, KeyError, ValueError):
+            return Response({'error': 'items [{id, stock}] gereklidir'}, status=status.HTTP_400_BAD_REQUEST)
+        if not changes:
+            return Response({'error': 'items [{id, stock}] gereklidir'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return Response(update_stock(changes))
+        except StockUpdateError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
     def _send_price_drop_notifications(self, product, old_price, new_price):
         """Send price drop notifications to wishlist users."""
         discount_percent = round((float(old_price) - float(new_price)) / float(old_price) * 100, 1)
@@ -131,7 +162,10 @@ class ProductViewSet(viewsets.ModelViewSet):
                 )
 
         if notifications:
+            from products.services.notification_counters import notifications_created
+
             Notification.objects.bulk_create(notifications)
+            notifications_created(notifications)
 
 
 class CategoryViewSet(viewsets.ModelViewSet):
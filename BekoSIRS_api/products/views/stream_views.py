@@ -0,0 +1,92 @@
+# products/views/stream_views.py
+"""
+Server-sent events stream of new notifications.
+
+A plain async Django view (DRF views are sync only): served by an ASGI
+server an open stream holds no worker thread. In production nginx routes
+this path to the uvicorn workers of deployment/bekosirs-stream.service, never
+to the sync gunicorn workers; clients without SSE use the short long-poll
+endpoint GET /api/v1/notifications/poll/ instead.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from products.services.notification_stream import (
+    MAX_EVENT_NOTIFICATIONS, await_change, current_version, latest_id, snapshot, stream_config
+)
+
+
+def _stream_user(request):
+    """JWT from the Authorization header or, for EventSource clients, the `token` query parameter."""
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _event(data, event_id) -> str:
+    return f"id: {event_id}\nevent: notifications\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def _events(user_id, after_id):
+    config = stream_config()
+    loop = asyncio.get_running_loop()
+    closes_at = loop.time() + config['max_stream_seconds']
+
+    yield f"retry: {int(config['poll_interval'] * 1000)}\n\n"
+    # Read the version before the data so no change in between is missed
+    version = await sync_to_async(current_version)(user_id)
+    changed = True
+    while True:
+        if changed:
+            result = await sync_to_async(snapshot)(user_id, after_id)
+            after_id = result['last_id']
+            yield _event(result, after_id)
+            if len(result['notifications']) == MAX_EVENT_NOTIFICATIONS:
+                continue  # more waiting: send the next page right away
+
+        remaining = closes_at - loop.time()
+        if remaining <= 0:
+            return  # EventSource reconnects and resumes from Last-Event-ID
+        changed = await await_change(user_id, version, min(config['heartbeat_seconds'], remaining))
+        if changed:
+            version = await sync_to_async(current_version)(user_id)
+        else:
+            yield ": keep-alive\n\n"
+
+
+async def notification_stream(request):
+    """
+    GET /api/notifications/stream/?after_id=120 - SSE stream of new notifications.
+    Sends a "notifications" event ({notifications, last_id, unread_count}) on connect and
+    whenever the user's notifications change; the event id is last_id, so reconnecting
+    EventSource clients resume through Last-Event-ID. Auth: Bearer header or ?token=.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Sadece GET desteklenir'}, status=405)
+
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'error': 'Kimlik doğrulama gerekli'}, status=401)
+
+    cursor = request.headers.get('Last-Event-ID') or request.GET.get('after_id')
+    try:
+        after_id = int(cursor) if cursor else await sync_to_async(latest_id)(user.id)
+    except ValueError:
+        return JsonResponse({'error': 'after_id sayı olmalıdır'}, status=400)
+
+    response = StreamingHttpResponse(_events(user.id, after_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: do not buffer the stream
+    return response